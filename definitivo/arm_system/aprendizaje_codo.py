@@ -6,6 +6,7 @@ import time
 import board
 import busio
 from adafruit_pca9685 import PCA9685
+from control.perfil_servo import PerfilServo
 import sys
 import tty
 import termios
@@ -19,6 +20,9 @@ PULSO_HOLD = 1850     # Compensa gravedad (ajusta si sigue bajando: 1900, 1950..
 PULSO_EXTENDER = 2200
 PULSO_CONTRAER = 1200
 
+# Duty cycles precalculados (evita recalcular en el bucle a 50Hz)
+PERFIL_CODO = PerfilServo('codo', CANAL_CODO, PULSO_NEUTRAL, PULSO_HOLD, {'extender': PULSO_EXTENDER, 'contraer': PULSO_CONTRAER})
+
 class ControlTeclado:
     def __init__(self):
         self.fd = sys.stdin.fileno()
@@ -36,10 +40,6 @@ class ControlTeclado:
             return sys.stdin.read(1)
         return None
 
-def aplicar_pulso(pca, canal, pulso_us):
-    duty_cycle = int(pulso_us / 20000 * 0xFFFF)
-    pca.channels[canal].duty_cycle = duty_cycle
-
 def main():
     print("="*60)
     print("🧠 APRENDIZAJE DEL CODO")
@@ -58,7 +58,7 @@ def main():
     print("  Q - GUARDAR y SALIR\n")
     input("Presiona ENTER...")
     
-    aplicar_pulso(pca, CANAL_CODO, PULSO_NEUTRAL)
+    PERFIL_CODO.aplicar(pca, 'neutral')
     
     tiempo_extender_total = 0.0
     tiempo_contraer_total = 0.0
@@ -80,14 +80,14 @@ def main():
                     if tecla == 'w':
                         if estado_actual != 'extender':
                             print("\r⬆️  EXTENDIENDO (M=marcar)    ", end='', flush=True)
-                            aplicar_pulso(pca, CANAL_CODO, PULSO_EXTENDER)
+                            PERFIL_CODO.aplicar(pca, 'extender')
                             estado_actual = 'extender'
                             tiempo_inicio_movimiento = time.time()
                     
                     elif tecla == 's':
                         if estado_actual != 'contraer':
                             print("\r⬇️  CONTRAYENDO (N=marcar)    ", end='', flush=True)
-                            aplicar_pulso(pca, CANAL_CODO, PULSO_CONTRAER)
+                            PERFIL_CODO.aplicar(pca, 'contraer')
                             estado_actual = 'contraer'
                             tiempo_inicio_movimiento = time.time()
                     
@@ -97,7 +97,7 @@ def main():
                             tiempo_extender_total = tiempo_movimiento
                             limite_extendido_marcado = True
                             print(f"\n✅ EXTENDIDO: {tiempo_movimiento:.2f}s")
-                            aplicar_pulso(pca, CANAL_CODO, PULSO_NEUTRAL)
+                            PERFIL_CODO.aplicar(pca, 'neutral')
                             estado_actual = 'detenido'
                     
                     elif tecla == 'n':
@@ -106,12 +106,12 @@ def main():
                             tiempo_contraer_total = tiempo_movimiento
                             limite_contraido_marcado = True
                             print(f"\n✅ CONTRAÍDO: {tiempo_movimiento:.2f}s")
-                            aplicar_pulso(pca, CANAL_CODO, PULSO_NEUTRAL)
+                            PERFIL_CODO.aplicar(pca, 'neutral')
                             estado_actual = 'detenido'
                     
                     elif tecla == 'q':
                         print("\n\n💾 Guardando...")
-                        aplicar_pulso(pca, CANAL_CODO, PULSO_NEUTRAL)
+                        PERFIL_CODO.aplicar(pca, 'neutral')
                         break
                 else:
                     if estado_actual != 'detenido':
@@ -120,7 +120,7 @@ def main():
                         elif estado_actual == 'contraer' and tiempo_inicio_movimiento:
                             tiempo_contraer_total += time.time() - tiempo_inicio_movimiento
                         print(f"\r⏹️  MANTENIENDO (compensa gravedad)        ", end='', flush=True)
-                        aplicar_pulso(pca, CANAL_CODO, PULSO_HOLD)  # Usa PULSO_HOLD en lugar de NEUTRAL
+                        PERFIL_CODO.aplicar(pca, 'hold')  # Usa PULSO_HOLD en lugar de NEUTRAL
                         estado_actual = 'detenido'
                         tiempo_inicio_movimiento = None
                 
@@ -151,7 +151,7 @@ def main():
         print("="*60)
     
     except KeyboardInterrupt:
-        aplicar_pulso(pca, CANAL_CODO, PULSO_NEUTRAL)
+        PERFIL_CODO.aplicar(pca, 'neutral')
 
 if __name__ == '__main__':
     main()
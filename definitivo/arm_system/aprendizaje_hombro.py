@@ -7,6 +7,7 @@ import time
 import board
 import busio
 from adafruit_pca9685 import PCA9685
+from control.perfil_servo import PerfilServo
 import sys
 import tty
 import termios
@@ -19,6 +20,9 @@ PULSO_NEUTRAL = 1700
 PULSO_SUBIR = 1200
 PULSO_BAJAR = 2200
 
+# Duty cycles precalculados (evita recalcular en el bucle a 50Hz)
+PERFIL_HOMBRO = PerfilServo('hombro', CANAL_HOMBRO, PULSO_NEUTRAL, None, {'subir': PULSO_SUBIR, 'bajar': PULSO_BAJAR})
+
 class ControlTeclado:
     def __init__(self):
         self.fd = sys.stdin.fileno()
@@ -37,11 +41,6 @@ class ControlTeclado:
             return sys.stdin.read(1)
         return None
 
-def aplicar_pulso(pca, canal, pulso_us):
-    """Aplicar pulso específico"""
-    duty_cycle = int(pulso_us / 20000 * 0xFFFF)
-    pca.channels[canal].duty_cycle = duty_cycle
-
 def main():
     print("="*60)
     print("🧠 APRENDIZAJE DEL HOMBRO")
@@ -64,7 +63,7 @@ def main():
     input("Presiona ENTER para comenzar...")
     
     # Detener al inicio
-    aplicar_pulso(pca, CANAL_HOMBRO, PULSO_NEUTRAL)
+    PERFIL_HOMBRO.aplicar(pca, 'neutral')
     
     # Variables de aprendizaje
     tiempo_inicio = time.time()
@@ -89,14 +88,14 @@ def main():
                     if tecla == 'w':
                         if estado_actual != 'subir':
                             print("\r⬆️  SUBIENDO... (presiona M cuando llegue arriba)    ", end='', flush=True)
-                            aplicar_pulso(pca, CANAL_HOMBRO, PULSO_SUBIR)
+                            PERFIL_HOMBRO.aplicar(pca, 'subir')
                             estado_actual = 'subir'
                             tiempo_inicio_movimiento = time.time()
                     
                     elif tecla == 's':
                         if estado_actual != 'bajar':
                             print("\r⬇️  BAJANDO... (presiona N cuando llegue abajo)    ", end='', flush=True)
-                            aplicar_pulso(pca, CANAL_HOMBRO, PULSO_BAJAR)
+                            PERFIL_HOMBRO.aplicar(pca, 'bajar')
                             estado_actual = 'bajar'
                             tiempo_inicio_movimiento = time.time()
                     
@@ -106,7 +105,7 @@ def main():
                             tiempo_subir_total = tiempo_movimiento
                             limite_superior_marcado = True
                             print(f"\n✅ LÍMITE SUPERIOR marcado: {tiempo_movimiento:.2f}s desde inicio")
-                            aplicar_pulso(pca, CANAL_HOMBRO, PULSO_NEUTRAL)
+                            PERFIL_HOMBRO.aplicar(pca, 'neutral')
                             estado_actual = 'detenido'
                         else:
                             print("\n⚠️  Debes estar SUBIENDO para marcar límite superior")
@@ -117,14 +116,14 @@ def main():
                             tiempo_bajar_total = tiempo_movimiento
                             limite_inferior_marcado = True
                             print(f"\n✅ LÍMITE INFERIOR marcado: {tiempo_movimiento:.2f}s desde inicio")
-                            aplicar_pulso(pca, CANAL_HOMBRO, PULSO_NEUTRAL)
+                            PERFIL_HOMBRO.aplicar(pca, 'neutral')
                             estado_actual = 'detenido'
                         else:
                             print("\n⚠️  Debes estar BAJANDO para marcar límite inferior")
                     
                     elif tecla == 'q':
                         print("\n\n💾 Guardando datos de aprendizaje...")
-                        aplicar_pulso(pca, CANAL_HOMBRO, PULSO_NEUTRAL)
+                        PERFIL_HOMBRO.aplicar(pca, 'neutral')
                         break
                 
                 else:
@@ -136,7 +135,7 @@ def main():
                             tiempo_bajar_total += time.time() - tiempo_inicio_movimiento
                         
                         print(f"\r⏹️  DETENIDO        ", end='', flush=True)
-                        aplicar_pulso(pca, CANAL_HOMBRO, PULSO_NEUTRAL)
+                        PERFIL_HOMBRO.aplicar(pca, 'neutral')
                         estado_actual = 'detenido'
                         tiempo_inicio_movimiento = None
                 
@@ -184,7 +183,7 @@ def main():
     
     except KeyboardInterrupt:
         print("\n\n⚠️  Interrupción")
-        aplicar_pulso(pca, CANAL_HOMBRO, PULSO_NEUTRAL)
+        PERFIL_HOMBRO.aplicar(pca, 'neutral')
 
 if __name__ == '__main__':
     main()
@@ -6,6 +6,7 @@ import time
 import board
 import busio
 from adafruit_pca9685 import PCA9685
+from control.perfil_servo import PerfilServo
 import sys
 import tty
 import termios
@@ -19,6 +20,9 @@ PULSO_HOLD = 1690     # Pulso de mantenimiento con compensación mínima
 PULSO_HORARIO = 1400  # INVERTIDO: W baja correctamente
 PULSO_ANTIHORARIO = 2000  # INVERTIDO: S sube correctamente
 
+# Duty cycles precalculados (evita recalcular en el bucle a 50Hz)
+PERFIL_MUNECA = PerfilServo('muneca', CANAL_MUNECA, PULSO_NEUTRAL, PULSO_HOLD, {'horario': PULSO_HORARIO, 'antihorario': PULSO_ANTIHORARIO})
+
 class ControlTeclado:
     def __init__(self):
         self.fd = sys.stdin.fileno()
@@ -36,10 +40,6 @@ class ControlTeclado:
             return sys.stdin.read(1)
         return None
 
-def aplicar_pulso(pca, canal, pulso_us):
-    duty_cycle = int(pulso_us / 20000 * 0xFFFF)
-    pca.channels[canal].duty_cycle = duty_cycle
-
 def main():
     print("="*60)
     print("🧠 APRENDIZAJE DE LA MUÑECA")
@@ -58,7 +58,7 @@ def main():
     print("  Q - GUARDAR y SALIR\n")
     input("Presiona ENTER...")
     
-    aplicar_pulso(pca, CANAL_MUNECA, PULSO_NEUTRAL)
+    PERFIL_MUNECA.aplicar(pca, 'neutral')
     
     tiempo_horario_total = 0.0
     tiempo_antihorario_total = 0.0
@@ -80,14 +80,14 @@ def main():
                     if tecla == 'w':
                         if estado_actual != 'horario':
                             print("\r🔄 HORARIO (M=marcar)    ", end='', flush=True)
-                            aplicar_pulso(pca, CANAL_MUNECA, PULSO_HORARIO)
+                            PERFIL_MUNECA.aplicar(pca, 'horario')
                             estado_actual = 'horario'
                             tiempo_inicio_movimiento = time.time()
                     
                     elif tecla == 's':
                         if estado_actual != 'antihorario':
                             print("\r🔄 ANTIHORARIO (N=marcar)    ", end='', flush=True)
-                            aplicar_pulso(pca, CANAL_MUNECA, PULSO_ANTIHORARIO)
+                            PERFIL_MUNECA.aplicar(pca, 'antihorario')
                             estado_actual = 'antihorario'
                             tiempo_inicio_movimiento = time.time()
                     
@@ -97,7 +97,7 @@ def main():
                             tiempo_horario_total = tiempo_movimiento
                             limite_horario_marcado = True
                             print(f"\n✅ HORARIO: {tiempo_movimiento:.2f}s")
-                            aplicar_pulso(pca, CANAL_MUNECA, PULSO_NEUTRAL)
+                            PERFIL_MUNECA.aplicar(pca, 'neutral')
                             estado_actual = 'detenido'
                     
                     elif tecla == 'n':
@@ -106,12 +106,12 @@ def main():
                             tiempo_antihorario_total = tiempo_movimiento
                             limite_antihorario_marcado = True
                             print(f"\n✅ ANTIHORARIO: {tiempo_movimiento:.2f}s")
-                            aplicar_pulso(pca, CANAL_MUNECA, PULSO_NEUTRAL)
+                            PERFIL_MUNECA.aplicar(pca, 'neutral')
                             estado_actual = 'detenido'
                     
                     elif tecla == 'q':
                         print("\n\n💾 Guardando...")
-                        aplicar_pulso(pca, CANAL_MUNECA, PULSO_NEUTRAL)
+                        PERFIL_MUNECA.aplicar(pca, 'neutral')
                         break
                 else:
                     if estado_actual != 'detenido':
@@ -120,7 +120,7 @@ def main():
                         elif estado_actual == 'antihorario' and tiempo_inicio_movimiento:
                             tiempo_antihorario_total += time.time() - tiempo_inicio_movimiento
                         print(f"\r⏹️  DETENIDO        ", end='', flush=True)
-                        aplicar_pulso(pca, CANAL_MUNECA, PULSO_HOLD)  # Usar PULSO_HOLD en vez de NEUTRAL
+                        PERFIL_MUNECA.aplicar(pca, 'hold')  # Usar PULSO_HOLD en vez de NEUTRAL
                         estado_actual = 'detenido'
                         tiempo_inicio_movimiento = None
                 
@@ -151,7 +151,7 @@ def main():
         print("="*60)
     
     except KeyboardInterrupt:
-        aplicar_pulso(pca, CANAL_MUNECA, PULSO_NEUTRAL)
+        PERFIL_MUNECA.aplicar(pca, 'neutral')
 
 if __name__ == '__main__':
     main()
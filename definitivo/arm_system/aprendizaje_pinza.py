@@ -6,6 +6,7 @@ import time
 import board
 import busio
 from adafruit_pca9685 import PCA9685
+from control.perfil_servo import PerfilServo
 import sys
 import tty
 import termios
@@ -18,6 +19,9 @@ PULSO_NEUTRAL = 1690  # Valor calibrado - detiene perfectamente
 PULSO_ABRIR = 2300    # Abre completamente en ~0.61s
 PULSO_CERRAR = 1100   # Cierra completamente en ~0.61s
 
+# Duty cycles precalculados (evita recalcular en el bucle a 50Hz)
+PERFIL_PINZA = PerfilServo('pinza', CANAL_PINZA, PULSO_NEUTRAL, None, {'abrir': PULSO_ABRIR, 'cerrar': PULSO_CERRAR})
+
 class ControlTeclado:
     def __init__(self):
         self.fd = sys.stdin.fileno()
@@ -35,10 +39,6 @@ class ControlTeclado:
             return sys.stdin.read(1)
         return None
 
-def aplicar_pulso(pca, canal, pulso_us):
-    duty_cycle = int(pulso_us / 20000 * 0xFFFF)
-    pca.channels[canal].duty_cycle = duty_cycle
-
 def main():
     print("="*60)
     print("🧠 APRENDIZAJE DE LA PINZA")
@@ -57,7 +57,7 @@ def main():
     print("  Q - GUARDAR y SALIR\n")
     input("Presiona ENTER...")
     
-    aplicar_pulso(pca, CANAL_PINZA, PULSO_NEUTRAL)
+    PERFIL_PINZA.aplicar(pca, 'neutral')
     
     tiempo_abrir_total = 0.0
     tiempo_cerrar_total = 0.0
@@ -79,14 +79,14 @@ def main():
                     if tecla == 'w':
                         if estado_actual != 'abrir':
                             print("\r🤏 ABRIENDO (M=marcar)    ", end='', flush=True)
-                            aplicar_pulso(pca, CANAL_PINZA, PULSO_ABRIR)
+                            PERFIL_PINZA.aplicar(pca, 'abrir')
                             estado_actual = 'abrir'
                             tiempo_inicio_movimiento = time.time()
                     
                     elif tecla == 's':
                         if estado_actual != 'cerrar':
                             print("\r✊ CERRANDO (N=marcar)    ", end='', flush=True)
-                            aplicar_pulso(pca, CANAL_PINZA, PULSO_CERRAR)
+                            PERFIL_PINZA.aplicar(pca, 'cerrar')
                             estado_actual = 'cerrar'
                             tiempo_inicio_movimiento = time.time()
                     
@@ -96,7 +96,7 @@ def main():
                             tiempo_abrir_total = tiempo_movimiento
                             limite_abierto_marcado = True
                             print(f"\n✅ ABIERTO: {tiempo_movimiento:.2f}s")
-                            aplicar_pulso(pca, CANAL_PINZA, PULSO_NEUTRAL)
+                            PERFIL_PINZA.aplicar(pca, 'neutral')
                             estado_actual = 'detenido'
                     
                     elif tecla == 'n':
@@ -105,12 +105,12 @@ def main():
                             tiempo_cerrar_total = tiempo_movimiento
                             limite_cerrado_marcado = True
                             print(f"\n✅ CERRADO: {tiempo_movimiento:.2f}s")
-                            aplicar_pulso(pca, CANAL_PINZA, PULSO_NEUTRAL)
+                            PERFIL_PINZA.aplicar(pca, 'neutral')
                             estado_actual = 'detenido'
                     
                     elif tecla == 'q':
                         print("\n\n💾 Guardando...")
-                        aplicar_pulso(pca, CANAL_PINZA, PULSO_NEUTRAL)
+                        PERFIL_PINZA.aplicar(pca, 'neutral')
                         break
                 else:
                     if estado_actual != 'detenido':
@@ -119,7 +119,7 @@ def main():
                         elif estado_actual == 'cerrar' and tiempo_inicio_movimiento:
                             tiempo_cerrar_total += time.time() - tiempo_inicio_movimiento
                         print(f"\r⏹️  DETENIDO        ", end='', flush=True)
-                        aplicar_pulso(pca, CANAL_PINZA, PULSO_NEUTRAL)
+                        PERFIL_PINZA.aplicar(pca, 'neutral')
                         estado_actual = 'detenido'
                         tiempo_inicio_movimiento = None
                 
@@ -150,7 +150,7 @@ def main():
         print("="*60)
     
     except KeyboardInterrupt:
-        aplicar_pulso(pca, CANAL_PINZA, PULSO_NEUTRAL)
+        PERFIL_PINZA.aplicar(pca, 'neutral')
 
 if __name__ == '__main__':
     main()
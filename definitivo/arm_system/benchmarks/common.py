@@ -0,0 +1,94 @@
+"""
+Shared helpers for the benchmark scripts: latency summaries, peak RSS and
+JSON result files that can be compared between commits.
+"""
+import os
+import json
+import time
+import platform
+import resource
+import subprocess
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+PERCENTILES = (50, 90, 95, 99)
+
+
+def summarize(samples) -> dict:
+    """latency distribution (seconds in, milliseconds out)"""
+    if len(samples) == 0:
+        return {'count': 0}
+    ms = np.asarray(samples, dtype=np.float64) * 1000.0
+    summary = {'count': int(ms.size), 'mean_ms': float(ms.mean()), 'min_ms': float(ms.min()),
+               'max_ms': float(ms.max()), 'std_ms': float(ms.std())}
+    for p, value in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+        summary[f'p{p}_ms'] = float(value)
+    return summary
+
+
+def peak_rss_mb() -> float:
+    """peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> dict:
+    """where a result was measured, so numbers from different machines are not mixed up"""
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def write_results(name: str, results: dict, path: str = None) -> str:
+    """write results as JSON (default: benchmarks/results/<name>-<revision>-<timestamp>.json)"""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        revision = results.get('environment', {}).get('revision') or 'norev'
+        path = os.path.join(RESULTS_DIR, f"{name}-{revision}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, default=float)
+    return path
+
+
+def load_results(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(base: dict, current: dict, keys=('fps', 'mean_ms', 'p50_ms', 'p99_ms', 'peak_rss_mb')) -> list:
+    """
+    relative change of every numeric field named in `keys`, matched by path
+
+    :return: [(path, base, current, change)] with change = current/base - 1
+    """
+    rows = []
+
+    def walk(a, b, path):
+        if isinstance(a, dict) and isinstance(b, dict):
+            for k in a:
+                if k in b:
+                    walk(a[k], b[k], f'{path}.{k}' if path else k)
+        elif path.rsplit('.', 1)[-1] in keys and isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            rows.append((path, a, b, (b / a - 1.0) if a else float('inf')))
+
+    walk(base, current, '')
+    return rows
+
+
+def print_comparison(rows):
+    for path, a, b, change in rows:
+        print(f"  {path:<60} {a:>10.2f} -> {b:>10.2f}  ({change:+.1%})")
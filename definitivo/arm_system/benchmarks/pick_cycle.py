@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+End-to-end pick-cycle benchmark of main.Robot on simulated hardware.
+
+Each cycle is sync → scan → select → pick → place, on a virtual clock:
+- servos and stepper use the simulated PCA9685/pins;
+- the camera is a scripted scene;
+- the VEX serial link answers every message with `current_angles`.
+
+Picked objects leave the scene, so a scene of N objects takes N cycles and
+each scan sees one object fewer.
+
+Per phase it reports simulated time (what the arm would take) and CPU time
+(what the orchestration costs on the Pi), plus objects handled per minute.
+Scenes are generated per --objects size or read from a JSON file:
+    [{"name": "mesa", "objects": [{"class": "apple", "confidence": 0.9, "angle": 45, "distance": 180}]}]
+
+Usage (from arm_system/):
+    python -m benchmarks.pick_cycle --objects 1 2 4 8 --repeat 5
+    python -m benchmarks.pick_cycle --scenes escenas.json --vision-results benchmarks/results/vision.json
+"""
+import json
+import time
+import random
+import argparse
+import logging as log
+from contextlib import contextmanager
+
+try:
+    from .common import summarize, environment, write_results, load_results, compare, print_comparison
+except ImportError:
+    from common import summarize, environment, write_results, load_results, compare, print_comparison
+
+from control.reloj import RelojVirtual
+from main import Robot
+
+PHASES = ('sync', 'scan', 'select', 'pick', 'place')
+SCENE_CLASSES = ('apple', 'orange', 'bottle', 'cup')
+DEFAULT_SCAN_LATENCY = 0.5      # s, camera capture + inference per scan
+DEFAULT_SERIAL_LATENCY = 0.005  # s, VEX round trip
+
+
+class SimulatedSerial:
+    """Stand-in for CommunicationManager: every message is answered with `current_angles`"""
+
+    def __init__(self, robot, latency: float = DEFAULT_SERIAL_LATENCY):
+        self.robot = robot
+        self.latency = latency
+        self.callbacks = {}
+        self.sent = 0
+
+    def register_callback(self, message_type: str, callback):
+        self.callbacks[message_type] = callback
+
+    def send_message(self, message_type: str, data: dict):
+        self.sent += 1
+        self.robot.reloj.dormir(self.latency)
+        callback = self.callbacks.get('current_angles')
+        if callback:
+            callback(self.robot.get_current_angles())
+        return True
+
+    def close(self):
+        pass
+
+
+class ScriptedRobot(Robot):
+    """Robot whose simulated scan returns the objects still in a scripted scene"""
+
+    def __init__(self, scene: list, scan_latency: float = DEFAULT_SCAN_LATENCY,
+                 serial_latency: float = DEFAULT_SERIAL_LATENCY, reloj=None):
+        super().__init__(reloj=reloj or RelojVirtual(), simulado=True)
+        self.scene = [dict(obj) for obj in scene]
+        self.scan_latency = scan_latency
+        self.serial_manager = SimulatedSerial(self, serial_latency)
+        self.serial_manager.register_callback('current_angles', self._on_current_angles)
+
+    def _simulate_detection(self):
+        self.reloj.dormir(self.scan_latency)
+        for obj in self.scene:
+            self._scan_callback(dict(obj, image_path='scripted'))
+        self.process_scan_results()
+
+    def remove_from_scene(self, selected: dict):
+        # scan_results keep the scene order (index is 1-based)
+        self.scene.pop(selected['index'] - 1)
+
+
+def select_target(scan_results: list) -> dict:
+    """highest-confidence object, as an operator would usually pick"""
+    return max(scan_results, key=lambda obj: obj['confidence'], default=None)
+
+
+def generate_scene(n_objects: int, rng: random.Random) -> list:
+    return [{
+        'class': rng.choice(SCENE_CLASSES),
+        'confidence': round(rng.uniform(0.5, 0.95), 2),
+        'angle': round(rng.uniform(0, 180), 1),
+        'distance': round(rng.uniform(150, 250)),
+    } for _ in range(n_objects)]
+
+
+def scan_latency_from_vision(path: str) -> float:
+    """per-scan latency (s) from a vision_pipeline result: p50 of decode + inference + postprocess"""
+    results = load_results(path)
+    stages = results['variants'][results['reference']]['stages']
+    return sum(stages[s]['p50_ms'] for s in ('decode', 'inference', 'postprocess')) / 1000.0
+
+
+class PhaseTimer:
+    """simulated, CPU and wall time per phase"""
+
+    def __init__(self, reloj):
+        self.reloj = reloj
+        self.samples = {phase: {'sim': [], 'cpu': [], 'wall': []} for phase in PHASES}
+
+    @contextmanager
+    def phase(self, name: str):
+        sim, cpu, wall = self.reloj.ahora(), time.process_time(), time.perf_counter()
+        try:
+            yield
+        finally:
+            samples = self.samples[name]
+            samples['sim'].append(self.reloj.ahora() - sim)
+            samples['cpu'].append(time.process_time() - cpu)
+            samples['wall'].append(time.perf_counter() - wall)
+
+
+def run_scene(scene: list, scan_latency: float, serial_latency: float, arm_speed: int) -> dict:
+    """clear one scene; returns per-phase samples and cycle times"""
+    reloj = RelojVirtual()
+    robot = ScriptedRobot(scene, scan_latency, serial_latency, reloj)
+    robot.arm_speed = arm_speed
+    timer = PhaseTimer(reloj)
+    cycles, handled, failures = [], 0, 0
+    try:
+        while robot.scene:
+            start = reloj.ahora()
+            with timer.phase('sync'):
+                robot.serial_manager.send_message('check_service', {})
+            with timer.phase('scan'):
+                robot.handle_scan_command()
+            with timer.phase('select'):
+                target = select_target(robot.scan_results)
+            if target is None:
+                break
+            with timer.phase('pick'):
+                picked = robot.execute_pick_sequence(target)
+            with timer.phase('place'):
+                placed = picked and robot.execute_place_sequence(target)
+            robot.remove_from_scene(target)
+            handled += bool(placed)
+            failures += not placed
+            cycles.append(reloj.ahora() - start)
+    finally:
+        robot.robot_controller.close()
+    return {'samples': timer.samples, 'cycles': cycles, 'handled': handled, 'failures': failures,
+            'serial_messages': robot.serial_manager.sent}
+
+
+def benchmark(scenes: dict, repeat: int, scan_latency: float, serial_latency: float, arm_speed: int) -> dict:
+    results = {}
+    for name, scene in scenes.items():
+        samples = {phase: {'sim': [], 'cpu': [], 'wall': []} for phase in PHASES}
+        cycles, handled, failures = [], 0, 0
+        wall_start = time.perf_counter()
+        for _ in range(repeat):
+            run = run_scene(scene, scan_latency, serial_latency, arm_speed)
+            for phase, kinds in run['samples'].items():
+                for kind, values in kinds.items():
+                    samples[phase][kind].extend(values)
+            cycles.extend(run['cycles'])
+            handled += run['handled']
+            failures += run['failures']
+        sim_total = sum(cycles)
+        cpu_total = sum(sum(kinds['cpu']) for kinds in samples.values())
+        results[name] = {
+            'objects': len(scene),
+            'runs': repeat,
+            'cycles': len(cycles),
+            'handled': handled,
+            'failures': failures,
+            'objects_per_min': handled / sim_total * 60 if sim_total > 0 else 0.0,
+            'cycle': summarize(cycles),
+            'cpu_per_cycle_ms': cpu_total / len(cycles) * 1000 if cycles else 0.0,
+            'phases': {phase: {kind: summarize(values) for kind, values in kinds.items()}
+                       for phase, kinds in samples.items()},
+            'wall_s': time.perf_counter() - wall_start,
+        }
+    return results
+
+
+def print_report(results: dict):
+    print("=" * 78)
+    print(f"🤖 PICK CYCLE  (scan {results['scan_latency_s'] * 1000:.0f}ms, arm {results['arm_speed']} steps/s)")
+    print("=" * 78)
+    header = ' '.join(f'{p:>13}' for p in PHASES)
+    print(f"  {'scene':<12} {'obj/min':>7} {'cycle s':>8} {'cpu ms':>7}  sim s / cpu ms per phase")
+    print(f"  {'':<38}{header}")
+    for name, r in results['scenes'].items():
+        phases = ' '.join(f"{r['phases'][p]['sim'].get('mean_ms', 0) / 1000:>6.2f}/{r['phases'][p]['cpu'].get('mean_ms', 0):<6.2f}"
+                          for p in PHASES)
+        print(f"  {name:<12} {r['objects_per_min']:>7.2f} {r['cycle'].get('mean_ms', 0) / 1000:>8.2f} "
+              f"{r['cpu_per_cycle_ms']:>7.2f}  {phases}")
+    print("=" * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scan → select → pick → place on simulated hardware")
+    parser.add_argument('--objects', type=int, nargs='+', default=[1, 2, 4, 8], help="generated scene sizes")
+    parser.add_argument('--scenes', help="JSON file with scripted scenes (replaces --objects)")
+    parser.add_argument('--repeat', type=int, default=3, help="times each scene is cleared")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scan-latency', type=float, default=DEFAULT_SCAN_LATENCY, help="s per scan (camera + inference)")
+    parser.add_argument('--vision-results', help="take the scan latency from a vision_pipeline JSON result")
+    parser.add_argument('--serial-latency', type=float, default=DEFAULT_SERIAL_LATENCY)
+    parser.add_argument('--arm-speed', type=int, default=1000, help="stepper steps/s")
+    parser.add_argument('--output', help="JSON result path (default benchmarks/results/)")
+    parser.add_argument('--compare', help="previous JSON result to compare against")
+    args = parser.parse_args()
+
+    # per-move logging (and the deprecated mover_base warnings) would dominate the CPU figures
+    log.getLogger().setLevel(log.CRITICAL)
+
+    if args.scenes:
+        with open(args.scenes) as f:
+            scenes = {s.get('name', f'scene{i}'): s['objects'] for i, s in enumerate(json.load(f))}
+    else:
+        rng = random.Random(args.seed)
+        scenes = {f'{n}_objects': generate_scene(n, rng) for n in args.objects}
+    scan_latency = scan_latency_from_vision(args.vision_results) if args.vision_results else args.scan_latency
+
+    results = {
+        'benchmark': 'pick_cycle',
+        'environment': environment(),
+        'scan_latency_s': scan_latency,
+        'serial_latency_s': args.serial_latency,
+        'arm_speed': args.arm_speed,
+        'scenes': benchmark(scenes, args.repeat, scan_latency, args.serial_latency, args.arm_speed),
+    }
+    print_report(results)
+    print(f"results: {write_results('pick_cycle', results, args.output)}")
+    if args.compare:
+        print("changes vs", args.compare)
+        print_comparison(compare(load_results(args.compare), results,
+                                 keys=('objects_per_min', 'mean_ms', 'p99_ms', 'cpu_per_cycle_ms')))
+
+
+if __name__ == '__main__':
+    main()
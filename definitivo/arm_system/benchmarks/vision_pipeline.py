@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the vision pipeline on recorded footage.
+
+Frames from a directory of images or an MJPEG recording (e.g. the output of
+`rpicam-vid --codec mjpeg -o clip.mjpeg`) are replayed through the same
+stages as test_detection_web.py: JPEG decode, YOLO inference,
+post-processing and the JPEG re-encode of the web stream. Each model variant
+runs in its own process so its peak RSS is not inflated by the others.
+
+Reported per variant: FPS, per-stage latency distribution, peak RSS and
+detection agreement against the first variant (the reference). The decode
+latency at each libjpeg DCT scale (1, 1/2, 1/4, 1/8) is measured on the same
+frames; --reduced-decode adds variants that decode the inference frame at
+the reduced scale, as the capture path does.
+
+Usage (from arm_system/):
+    python -m benchmarks.vision_pipeline perception/vision/camera/objects_images
+    python -m benchmarks.vision_pipeline clip.mjpeg --imgsz 416 640 --repeat 3
+    python -m benchmarks.vision_pipeline clip.mjpeg --model n=models/yolo11n.pt --compare old.json
+    python -m benchmarks.vision_pipeline clip.mjpeg --imgsz 416 --reduced-decode
+"""
+import os
+import glob
+import time
+import argparse
+import logging as log
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+try:
+    from .common import summarize, peak_rss_mb, environment, write_results, load_results, compare, print_comparison
+except ImportError:
+    from common import summarize, peak_rss_mb, environment, write_results, load_results, compare, print_comparison
+
+ARM_SYSTEM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(ARM_SYSTEM, 'perception', 'vision', 'detection', 'models')
+DEFAULT_MODELS = {
+    'yolo11n_pt': os.path.join(MODELS_DIR, 'torch', 'yolo11n.pt'),
+    'yolo11s_ncnn': os.path.join(MODELS_DIR, 'yolo11s_ncnn_model'),
+}
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+TARGET_CLASSES = ('bottle', 'cup', 'cell phone', 'book')
+STAGES = ('decode', 'inference', 'postprocess', 'encode')
+DCT_FACTORS = (1, 2, 4, 8)
+JPEG_QUALITY = 75
+IOU_MATCH = 0.5
+
+
+# --- sources ---
+def split_mjpeg(data: bytes):
+    """yield the JPEG frames of an MJPEG byte stream (SOI/EOI scan, as in capture_frames)"""
+    start = data.find(b'\xff\xd8')
+    while start != -1:
+        end = data.find(b'\xff\xd9', start + 2)
+        if end == -1:
+            return
+        yield data[start:end + 2]
+        start = data.find(b'\xff\xd8', end + 2)
+
+
+def load_frames(source: str, max_frames: int = None) -> list:
+    """encoded frames from an image directory or an MJPEG file, kept in memory so disk I/O is not timed"""
+    if os.path.isdir(source):
+        paths = sorted(p for p in glob.glob(os.path.join(source, '*')) if p.lower().endswith(IMAGE_EXTENSIONS))
+        frames = []
+        for path in paths[:max_frames]:
+            with open(path, 'rb') as f:
+                frames.append(f.read())
+    else:
+        with open(source, 'rb') as f:
+            frames = list(split_mjpeg(f.read()))[:max_frames]
+    if not frames:
+        raise ValueError(f'no frames found in {source}')
+    return frames
+
+
+# --- pipeline stages ---
+def postprocess(result, names: dict, targets=TARGET_CLASSES, scale: int = 1):
+    """detections and best target of one YOLO result, like detection_thread() (boxes scaled by `scale`)"""
+    detections = []
+    best = None
+    boxes = result.boxes
+    if boxes is not None and len(boxes) > 0:
+        for box, conf, cls in zip(boxes.xyxy.cpu().numpy() * scale, boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy()):
+            x1, y1, x2, y2 = map(int, box)
+            detection = {'class': names[int(cls)], 'conf': float(conf), 'box': (x1, y1, x2, y2)}
+            detections.append(detection)
+            if detection['class'] in targets and (best is None or detection['conf'] > best['conf']):
+                best = detection
+    return detections, best
+
+
+def annotate_and_encode(cv2, frame, detections) -> bytes:
+    """draw boxes and encode for the MJPEG web stream"""
+    for det in detections:
+        x1, y1, x2, y2 = det['box']
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, f"{det['class']} {det['conf']:.2f}", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return buffer.tobytes()
+
+
+def decode_comparison(frames: list, repeat: int = 1, factors=DCT_FACTORS) -> dict:
+    """decode latency of the frames at each DCT scale factor, and the time saved against a full decode"""
+    from perception.vision.camera.decode import decode_jpeg
+
+    results = {}
+    clock = time.perf_counter
+    for factor in factors:
+        samples = []
+        for _ in range(repeat):
+            for data in frames:
+                t0 = clock()
+                frame = decode_jpeg(data, factor)
+                samples.append(clock() - t0)
+        results[str(factor)] = dict(summarize(samples), size=f'{frame.shape[1]}x{frame.shape[0]}')
+    full = results[str(factors[0])]['p50_ms']
+    for entry in results.values():
+        entry['saved_ms'] = full - entry['p50_ms']
+    return results
+
+
+def run_variant(name: str, model_path: str, source: str, imgsz: int, conf: float,
+                repeat: int = 1, warmup: int = 3, max_frames: int = None, reduced: bool = False) -> dict:
+    """
+    benchmark one model/imgsz variant (meant to run in a fresh process)
+
+    With `reduced` the inference frame is decoded at the largest DCT scale that still covers `imgsz`
+    and the encode stage includes the full-resolution decode of the displayed frame.
+    """
+    import cv2
+    from ultralytics import YOLO
+    from perception.vision.camera.decode import decode_jpeg, reduction_for
+
+    frames = load_frames(source, max_frames)
+    height, width = decode_jpeg(frames[0]).shape[:2]
+    reduction = reduction_for(width, height, imgsz) if reduced else 1
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    model = YOLO(model_path, task='detect')
+    load_s = time.perf_counter() - start
+
+    # first inferences include lazy initialisation (NCNN graph, torch kernels)
+    for data in frames[:warmup]:
+        model.predict(decode_jpeg(data, reduction), conf=conf, imgsz=imgsz, verbose=False)
+
+    samples = {stage: [] for stage in STAGES}
+    per_frame = []
+    clock = time.perf_counter
+    start = clock()
+    for iteration in range(repeat):
+        for data in frames:
+            t0 = clock()
+            frame = decode_jpeg(data, reduction)
+            t1 = clock()
+            result = model.predict(frame, conf=conf, imgsz=imgsz, verbose=False)[0]
+            t2 = clock()
+            detections, _ = postprocess(result, model.names, scale=reduction)
+            t3 = clock()
+            annotate_and_encode(cv2, decode_jpeg(data) if reduction > 1 else frame, detections)
+            t4 = clock()
+            samples['decode'].append(t1 - t0)
+            samples['inference'].append(t2 - t1)
+            samples['postprocess'].append(t3 - t2)
+            samples['encode'].append(t4 - t3)
+            if iteration == 0:
+                per_frame.append(detections)
+    elapsed = clock() - start
+
+    processed = len(frames) * repeat
+    return {
+        'name': name,
+        'model': os.path.relpath(model_path, ARM_SYSTEM),
+        'imgsz': imgsz,
+        'decode_reduction': reduction,
+        'conf': conf,
+        'frames': processed,
+        'fps': processed / elapsed if elapsed > 0 else 0.0,
+        'model_load_s': load_s,
+        'stages': {stage: summarize(values) for stage, values in samples.items()},
+        'peak_rss_mb': peak_rss_mb(),
+        'model_rss_mb': peak_rss_mb() - rss_before,
+        'detections_per_frame': sum(map(len, per_frame)) / len(per_frame),
+        'detections': per_frame,
+    }
+
+
+# --- agreement ---
+def iou(a, b) -> float:
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_detections(reference: list, candidate: list, threshold: float = IOU_MATCH):
+    """greedy same-class matching by IoU, highest confidence first; returns matched IoUs"""
+    unmatched = sorted(candidate, key=lambda d: -d['conf'])
+    ious = []
+    for ref in sorted(reference, key=lambda d: -d['conf']):
+        best, best_iou = None, threshold
+        for det in unmatched:
+            if det['class'] == ref['class']:
+                overlap = iou(ref['box'], det['box'])
+                if overlap >= best_iou:
+                    best, best_iou = det, overlap
+        if best is not None:
+            unmatched.remove(best)
+            ious.append(best_iou)
+    return ious
+
+
+def agreement(reference: list, candidate: list) -> dict:
+    """
+    per-frame detection agreement of `candidate` with `reference`
+
+    f1 treats the reference as ground truth; best_target_agreement is the share
+    of frames where both pick the same target class (or both pick none).
+    """
+    matched = ref_total = cand_total = same_target = 0
+    ious = []
+    for ref_frame, cand_frame in zip(reference, candidate):
+        frame_ious = match_detections(ref_frame, cand_frame)
+        ious.extend(frame_ious)
+        matched += len(frame_ious)
+        ref_total += len(ref_frame)
+        cand_total += len(cand_frame)
+        ref_best = max((d for d in ref_frame if d['class'] in TARGET_CLASSES), key=lambda d: d['conf'], default=None)
+        cand_best = max((d for d in cand_frame if d['class'] in TARGET_CLASSES), key=lambda d: d['conf'], default=None)
+        same_target += (ref_best and ref_best['class']) == (cand_best and cand_best['class'])
+    frames = min(len(reference), len(candidate))
+    precision = matched / cand_total if cand_total else 1.0
+    recall = matched / ref_total if ref_total else 1.0
+    return {
+        'frames': frames,
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'mean_iou': sum(ious) / len(ious) if ious else 0.0,
+        'best_target_agreement': same_target / frames if frames else 0.0,
+    }
+
+
+def run(source: str, models: dict, imgsizes, conf: float, repeat: int, warmup: int,
+        max_frames: int = None, isolate: bool = True, reduced_decode: bool = False) -> dict:
+    variants = [(f'{name}@{imgsz}', path, imgsz, False) for name, path in models.items() for imgsz in imgsizes]
+    if reduced_decode:
+        variants += [(f'{name}/dct', path, imgsz, True) for name, path, imgsz, _ in variants]
+    results = {}
+    for name, path, imgsz, reduced in variants:
+        log.info(f"benchmarking {name} ({path})")
+        args = (name, path, source, imgsz, conf, repeat, warmup, max_frames, reduced)
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                results[name] = pool.submit(run_variant, *args).result()
+        else:
+            results[name] = run_variant(*args)
+
+    reference = variants[0][0]
+    agreements = {name: agreement(results[reference]['detections'], result['detections'])
+                  for name, result in results.items() if name != reference}
+    frames = load_frames(source, max_frames)
+    return {
+        'benchmark': 'vision_pipeline',
+        'environment': environment(),
+        'source': os.path.abspath(source),
+        'frames': len(frames),
+        'repeat': repeat,
+        'reference': reference,
+        'decode': decode_comparison(frames, repeat),
+        'variants': results,
+        'agreement': agreements,
+    }
+
+
+def print_report(results: dict):
+    print("=" * 78)
+    print(f"📷 VISION PIPELINE  ({results['frames']} frames x {results['repeat']}, reference {results['reference']})")
+    print("=" * 78)
+    print(f"  {'variant':<22} {'fps':>6} " + ' '.join(f'{s + " p50/p99":>19}' for s in STAGES[:3]) + f" {'rss MB':>7}")
+    for name, r in results['variants'].items():
+        stages = ' '.join(f"{r['stages'][s]['p50_ms']:>8.1f}/{r['stages'][s]['p99_ms']:<8.1f}ms" for s in STAGES[:3])
+        print(f"  {name:<22} {r['fps']:>6.1f} {stages} {r['peak_rss_mb']:>7.0f}")
+    for name, a in results['agreement'].items():
+        print(f"  agreement {name:<22} f1={a['f1']:.2f} iou={a['mean_iou']:.2f} "
+              f"target={a['best_target_agreement']:.0%}")
+    for factor, d in results['decode'].items():
+        print(f"  decode 1/{factor:<3} {d['size']:>10} p50 {d['p50_ms']:>6.2f}ms  saved {d['saved_ms']:>6.2f}ms/frame")
+    print("=" * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of decode → inference → post-processing → encode")
+    parser.add_argument('source', help="directory of images or MJPEG recording")
+    parser.add_argument('--model', action='append', metavar='NAME=PATH',
+                        help="model variant (repeatable); default: yolo11n .pt and yolo11s NCNN")
+    parser.add_argument('--imgsz', type=int, nargs='+', default=[416])
+    parser.add_argument('--conf', type=float, default=0.45)
+    parser.add_argument('--repeat', type=int, default=1, help="passes over the frames")
+    parser.add_argument('--warmup', type=int, default=3, help="untimed frames before measuring")
+    parser.add_argument('--max-frames', type=int)
+    parser.add_argument('--in-process', action='store_true', help="do not isolate variants in subprocesses")
+    parser.add_argument('--reduced-decode', action='store_true',
+                        help="also run every variant with the inference frame decoded at reduced DCT scale")
+    parser.add_argument('--output', help="JSON result path (default benchmarks/results/)")
+    parser.add_argument('--compare', help="previous JSON result to compare against")
+    args = parser.parse_args()
+
+    log.basicConfig(level=log.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    models = dict(m.split('=', 1) for m in args.model) if args.model else DEFAULT_MODELS
+    models = {name: os.path.abspath(path) for name, path in models.items()}
+
+    results = run(args.source, models, args.imgsz, args.conf, args.repeat, args.warmup,
+                  args.max_frames, isolate=not args.in_process, reduced_decode=args.reduced_decode)
+    print_report(results)
+    print(f"results: {write_results('vision_pipeline', results, args.output)}")
+    if args.compare:
+        print("changes vs", args.compare)
+        print_comparison(compare(load_results(args.compare), results))
+
+
+if __name__ == '__main__':
+    main()
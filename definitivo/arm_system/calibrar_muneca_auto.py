@@ -6,14 +6,10 @@ import time
 import board
 import busio
 from adafruit_pca9685 import PCA9685
+from control.perfil_servo import aplicar_pulso
 
 CANAL_MUNECA = 2
 
-def aplicar_pulso(pca, canal, pulso_us):
-    duty_cycle = int(pulso_us / 20000 * 0xFFFF)
-    pca.channels[canal].duty_cycle = duty_cycle
-    print(f"  Aplicado: {pulso_us}µs", flush=True)
-
 def main():
     print("="*60)
     print("🔍 CALIBRACIÓN AUTOMÁTICA MUÑECA")
@@ -7,6 +7,7 @@ import time
 import board
 import busio
 from adafruit_pca9685 import PCA9685
+from control.perfil_servo import aplicar_pulso
 import sys
 import tty
 import termios
@@ -31,10 +32,6 @@ class ControlTeclado:
             return sys.stdin.read(1)
         return None
 
-def aplicar_pulso(pca, canal, pulso_us):
-    duty_cycle = int(pulso_us / 20000 * 0xFFFF)
-    pca.channels[canal].duty_cycle = duty_cycle
-
 def main():
     print("="*60)
     print("🎯 CALIBRACIÓN INTERACTIVA MUÑECA")
@@ -6,6 +6,7 @@ import time
 import board
 import busio
 from adafruit_pca9685 import PCA9685
+from control.perfil_servo import duty_desde_pulso
 
 print("="*60)
 print("🔧 CALIBRACIÓN DE SERVOS - Modo Simple")
@@ -61,9 +62,8 @@ print("\n🔄 Enviando pulso neutral 1500µs...")
 print("   Ajusta el trimmer AHORA hasta que el servo se detenga\n")
 
 try:
-    # Calcular duty cycle para 1500µs (pulso neutral)
-    # Fórmula: duty_cycle = (pulso_us / 20000) * 0xFFFF
-    duty = int(1500 / 20000 * 0xFFFF)
+    # Duty cycle para 1500µs (pulso neutral)
+    duty = duty_desde_pulso(1500)
     
     while True:
         pca.channels[canal].duty_cycle = duty
@@ -42,8 +42,7 @@ print("Probando pulsos...\n")
 
 # Probar diferentes pulsos
 for pulso in range(1400, 1601, 10):  # De 1400 a 1600 en pasos de 10
-    duty = int(pulso / 20000 * 0xFFFF)
-    robot.controlador_servo.pca.channels[canal].duty_cycle = duty
+    robot.controlador_servo.aplicar_pulso_canal(canal, pulso)
     
     print(f"Pulso: {pulso}µs - ¿Se detuvo? Esperando 2s...")
     time.sleep(2)
@@ -60,8 +59,7 @@ for pulso in range(1400, 1601, 10):  # De 1400 a 1600 en pasos de 10
         break
 
 # Detener
-duty = int(1500 / 20000 * 0xFFFF)
-robot.controlador_servo.pca.channels[canal].duty_cycle = duty
+robot.controlador_servo.aplicar_pulso_canal(canal, 1500)
 
 robot.cerrar()
 
@@ -3,16 +3,20 @@ import sys
 import json
 import time
 import serial
+import numpy as np
 import logging as log
+from functools import cached_property
 from typing import Dict, Any, Optional
 from threading import Thread, Event
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from perception.vision.camera.main import CameraManager
-from perception.vision.image_processing import ImageProcessor
+from telemetry.metrics import METRICS
+from telemetry.event_log import EVENTS
+from telemetry.startup import STARTUP
 
 log.basicConfig(level=log.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+
 class CommunicationManager:
     def __init__(self, port: str='/dev/ttyACM1', baudrate: int = 115200, camera_index: int = 0):
         """
@@ -22,6 +26,7 @@ class CommunicationManager:
         """
         self.port = port
         self.baudrate = baudrate
+        self.camera_index = camera_index
         self.message_end = b'\n'
         
         self.serial_port: Optional[serial.Serial] = None
@@ -39,6 +44,9 @@ class CommunicationManager:
         
         # callbacks
         self.callbacks = {}
+
+        # send time of the last request per message type (serial round-trip metric)
+        self._sent_at: Dict[str, float] = {}
         
         # states
         self.movement_status: Dict[str, Dict[str, Any]] = {}
@@ -46,21 +54,70 @@ class CommunicationManager:
         self.safety_status: Dict[str, Any] = {}
         self.scan_data = None
         
-        self.camera = CameraManager(camera_index=camera_index)
-        self.object_detect_model = ImageProcessor(confidence_threshold=0.45)
-                
+        # camera, model and range estimator are created on the first detection (see camera):
+        # serial-only use never opens the camera or loads YOLO
+        self.vision = None
+
+    @cached_property
+    def camera(self):
+        """shared camera of the vision daemon when it is running, else this process's own"""
+        with STARTUP.phase('camera'):
+            from perception.vision.service.client import connect_vision
+            self.vision = connect_vision()
+            if self.vision is not None:
+                from perception.vision.service.adapters import ServiceCamera
+                return ServiceCamera(self.vision)
+            from perception.vision.camera.main import CameraManager
+            return CameraManager(camera_index=self.camera_index)
+
+    @cached_property
+    def object_detect_model(self):
+        camera = self.camera
+        with STARTUP.phase('detection model'):
+            from perception.vision.image_processing import ImageProcessor
+            if self.vision is not None:
+                # the daemon already ran its model on the frames the camera returns
+                from perception.vision.service.adapters import ServiceDetectionModel
+                return ImageProcessor(confidence_threshold=0.45, detection=ServiceDetectionModel(camera))
+            return ImageProcessor(confidence_threshold=0.45)
+
+    @cached_property
+    def detection_accumulator(self):
+        """burst of low-resolution inferences fused per `detected` event"""
+        from perception.vision.detection_accumulator import DetectionAccumulator
+        return DetectionAccumulator(self.object_detect_model.detection, self._capture_burst_frame)
+
+    @cached_property
+    def _burst_reduction(self) -> int:
+        # the burst frames are decoded straight at (about) the burst inference size instead of full resolution
+        from perception.vision.camera.decode import reduction_for
+        return reduction_for(self.camera.width, self.camera.height, self.detection_accumulator.imgsz)
+
+    @cached_property
+    def range_estimator(self):
+        """object range from the box size, fused with the VEX base_distance reading of the scan event"""
+        from perception.vision.camera.calibration import load_calibration
+        from perception.vision.range_estimator import RangeEstimator
+        calibration = load_calibration()
+        return (RangeEstimator.from_calibration(calibration) if calibration is not None
+                else RangeEstimator(image_size=(self.camera.width, self.camera.height)))
+
+    def _capture_burst_frame(self):
+        return self.camera.capture_image(save=False, reduction=self._burst_reduction)[0]
+
     def connect(self) -> bool:
         """serial connection"""
         if self.is_connected:
             return True
         
         try:
-            self.serial_port = serial.Serial(
-                port=self.port, 
-                baudrate=self.baudrate,
-                timeout=10,
-                write_timeout=10
-            )
+            with STARTUP.phase('serial'):
+                self.serial_port = serial.Serial(
+                    port=self.port, 
+                    baudrate=self.baudrate,
+                    timeout=10,
+                    write_timeout=10
+                )
             self.is_connected = True
             
             # read loop
@@ -83,6 +140,9 @@ class CommunicationManager:
             self.serial_port.close()
             self.is_connected = False
             log.info('Serial connection closed')
+        if self.vision is not None:
+            self.vision.close()
+            self.vision = None
             
     def send_message(self, message_type: str, data: dict) -> bool:
         """
@@ -100,7 +160,11 @@ class CommunicationManager:
                 'data': data,
             }
             encoded_message = json.dumps(message).encode() + self.message_end
-            self.serial_port.write(encoded_message)
+            EVENTS.record('serial', 'tx', message)
+            with METRICS.time('serial_write'):
+                self.serial_port.write(encoded_message)
+            if METRICS.enabled:
+                self._sent_at[message_type] = time.perf_counter()
             return True
         except Exception as e:
             print(f"Error enviando mensaje: {e}")
@@ -134,6 +198,11 @@ class CommunicationManager:
         try:
             msg_type = message.get('type', '').lower()
             data = message.get('data', {})
+            EVENTS.record('serial', 'rx', message)
+
+            sent_at = self._sent_at.pop(msg_type, None)
+            if sent_at is not None:
+                METRICS.observe('serial_round_trip', time.perf_counter() - sent_at, {'type': msg_type})
 
             if msg_type == 'check_service':
                 state = data.get('state')
@@ -167,6 +236,9 @@ class CommunicationManager:
             elif msg_type == 'current_angles':
                 self.current_angles = message.get('data', {})
                 self.angles_event.set()
+                # feed the joint state estimator (closed loop control)
+                if self.callbacks.get('current_angles'):
+                    self.callbacks['current_angles'](self.current_angles)
                 
         except Exception as e:
             log.error(f'error process message: {e}')
@@ -174,25 +246,25 @@ class CommunicationManager:
     def _handle_object_detection(self, data: dict):
         """object detect in real time"""
         try:
-            # 1. capture image
-            img_path = self.camera.capture_image()
-            if not img_path:
-                log.error("camera could not be captured")
-                return
-            
-            # 2. YOLO detection
-            image, yolo_result = self.object_detect_model.read_image_path(img_path, draw_results=True, save_drawn_img=True)
-            if yolo_result is None:
+            # 1. capture a short burst and fuse the detections
+            with METRICS.time('scan_detection'):
+                fused = self.detection_accumulator.observe()
+            if fused is None:
                 log.info("no detections.")
                 return
-            
+
+            # 2. keep the last frame with the fused detection drawn (queued, not written here)
+            img_path = self._save_detection_image(fused)
+
             # 3. update data
             data.update({
-                'class': yolo_result['class'],
-                'confidence': yolo_result['confidence'],
+                'class': self.object_detect_model.object_class(fused['class']),
+                'confidence': fused['confidence'],
+                'frames': fused['frames'],
                 'timestamp': time.time(),
                 'image_path': img_path
             })
+            data.update(self._estimate_range(fused, data.get('distance')))
             
             # 4. notify the central system
             if self.callbacks.get('scan_service'):
@@ -201,6 +273,21 @@ class CommunicationManager:
         except Exception as e:
             log.error(f"error in object detection: {str(e)}")
             
+    def _estimate_range(self, fused: dict, sensor_mm: Optional[float]) -> dict:
+        """distance of the fused detection: box size prior + VEX base_distance (kept as sensor_distance)"""
+        frame = fused['frame']
+        distance, sigma = self.range_estimator.estimate([fused['box']], [fused['class']],
+                                                        (frame.shape[1], frame.shape[0]))
+        distance, sigma = self.range_estimator.fuse(distance, sigma, sensor_mm)
+        if not np.isfinite(distance[0]):
+            return {}
+        return {'distance': float(distance[0]), 'distance_sigma': float(sigma[0]), 'sensor_distance': sensor_mm}
+
+    def _save_detection_image(self, fused: dict) -> str:
+        # drawn in memory, written by the background frame writer
+        self.object_detect_model._draw_detection(fused['frame'], fused)
+        return self.object_detect_model._save_drawn_image(fused['frame'])
+
     def get_scan_data(self, timeout: float = 30.0) -> list:
         if self.scan_complete_event.wait(timeout):
             self.scan_complete_event.clear()
@@ -0,0 +1,207 @@
+"""
+Servicio central de control a frecuencia fija.
+
+Los productores (web, visión, CLI) no mueven los servos directamente: envían
+consignas con BucleControl.enviar(), que solo encola y vuelve al instante.
+Un único hilo hace tick a frecuencia fija (200Hz por defecto) con planificación
+por deadline monotónico, aplica las consignas pendientes, detiene los
+movimientos cuyo tiempo terminó y escribe todos los cambios en una sola ráfaga
+I2C. El servicio publica duración de tick, jitter y overruns.
+"""
+import threading
+import logging as log
+from collections import deque, namedtuple
+
+try:
+    from .reloj import RELOJ_REAL
+except ImportError:
+    from control.reloj import RELOJ_REAL
+
+try:
+    from ..telemetry.metrics import METRICS
+except ImportError:
+    from telemetry.metrics import METRICS
+
+# Consigna de movimiento temporizado para un servo
+Consigna = namedtuple('Consigna', ['nombre', 'direccion', 'duracion', 'velocidad', 'origen', 'instante'])
+
+# Marca interna de parada de emergencia en la cola de entrada
+_PARADA = object()
+
+
+class MetricasBucle:
+    """Contadores del bucle: ticks, overruns, duración y jitter (segundos)"""
+
+    def __init__(self, historial=1000):
+        self.ticks = 0
+        self.overruns = 0
+        self.consignas = 0
+        self.duracion_total = 0.0
+        self.duracion_max = 0.0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+        self._duraciones = deque(maxlen=historial)
+
+    def registrar(self, duracion: float, jitter: float, overrun: bool):
+        self.ticks += 1
+        self.overruns += overrun
+        self.duracion_total += duracion
+        self.duracion_max = max(self.duracion_max, duracion)
+        self.jitter_total += jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+        self._duraciones.append(duracion)
+
+    def como_dict(self) -> dict:
+        ticks = max(self.ticks, 1)
+        recientes = sorted(self._duraciones)
+        p99 = recientes[int(0.99 * (len(recientes) - 1))] if recientes else 0.0
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'consignas': self.consignas,
+            'duracion_media_ms': self.duracion_total / ticks * 1000,
+            'duracion_max_ms': self.duracion_max * 1000,
+            'duracion_p99_ms': p99 * 1000,
+            'jitter_medio_ms': self.jitter_total / ticks * 1000,
+            'jitter_max_ms': self.jitter_max * 1000,
+        }
+
+
+class BucleControl:
+    """Bucle de control a frecuencia fija que ejecuta las consignas de los productores"""
+
+    def __init__(self, controlador_servo, frecuencia_hz: float = 200.0, reloj=None):
+        """
+        Args:
+            controlador_servo: ControladorServo sobre el que se aplican las consignas
+            frecuencia_hz: frecuencia del tick
+            reloj: Reloj (por defecto el del controlador de servos)
+        """
+        self.controlador_servo = controlador_servo
+        self.periodo = 1.0 / frecuencia_hz
+        self.reloj = reloj or getattr(controlador_servo, 'reloj', RELOJ_REAL)
+        self.metricas = MetricasBucle()
+
+        # deque.append/popleft son atómicos: los productores no toman ningún lock
+        self._entrada = deque()
+        # nombre -> (direccion, velocidad, instante_fin); solo lo toca el hilo del bucle
+        self._activos = {}
+        self._tareas = []
+        self._hilo = None
+        self._parar = threading.Event()
+
+    # --- productores ---
+    def enviar(self, nombre: str, direccion: int, duracion: float, velocidad: float = 0.5, origen: str = ''):
+        """Encolar una consigna (no bloquea). Sustituye al movimiento activo del mismo servo."""
+        self._entrada.append(Consigna(nombre, direccion, duracion, velocidad, origen, self.reloj.ahora()))
+
+    def detener_todo(self):
+        """Parada inmediata: descarta consignas pendientes y aplica hold a todos los servos
+
+        El hold lo escribe el hilo del bucle en su siguiente tick (un periodo como mucho): si lo
+        escribiera el hilo que pide la parada, el tick en curso podría sobrescribirlo con un
+        movimiento y dejar un servo continuo girando. Sin bucle en marcha se escribe aquí.
+        """
+        if self._hilo is not None and self._hilo.is_alive():
+            self._entrada.append(_PARADA)
+        else:
+            self._entrada.clear()
+            self._activos.clear()
+            self.controlador_servo.detener_todos()
+
+    def agregar_tarea(self, tarea):
+        """Registrar un callable `tarea(dt)` que se ejecuta en cada tick (p. ej. lazo cerrado)"""
+        self._tareas.append(tarea)
+
+    def ocupado(self, nombre: str = None) -> bool:
+        """True si el servo (o cualquiera) tiene movimiento activo o pendiente"""
+        if nombre is None:
+            return bool(self._activos or self._entrada)
+        return nombre in self._activos or any(
+            c is not _PARADA and c.nombre == nombre for c in list(self._entrada))
+
+    def esperar(self, nombre: str = None, timeout: float = 10.0) -> bool:
+        """Bloquear al productor hasta que el movimiento termine"""
+        limite = self.reloj.ahora() + timeout
+        while self.reloj.ahora() < limite:
+            if not self.ocupado(nombre):
+                return True
+            self.reloj.dormir(self.periodo)
+        return False
+
+    # --- bucle ---
+    def tick(self, ahora: float = None):
+        """Un ciclo del bucle: consignas nuevas, expiraciones y una escritura por lotes"""
+        ahora = self.reloj.ahora() if ahora is None else ahora
+        comandos = {}
+
+        while self._entrada:
+            consigna = self._entrada.popleft()
+            if consigna is _PARADA:
+                self._entrada.clear()
+                self._activos.clear()
+                # hold en todos los servos, no solo en los que tenían movimiento activo
+                comandos = {nombre: (0, 0.0) for nombre in self.controlador_servo.perfiles}
+                continue
+            self.metricas.consignas += 1
+            # Espera en cola: del productor (p. ej. detección) al tick que aplica la consigna
+            METRICS.observe('command_queue_latency', ahora - consigna.instante, {'origin': consigna.origen or 'none'})
+            if consigna.direccion == 0 or consigna.duracion <= 0:
+                self._activos.pop(consigna.nombre, None)
+                comandos[consigna.nombre] = (0, 0.0)
+            else:
+                self._activos[consigna.nombre] = (consigna.direccion, consigna.velocidad, ahora + consigna.duracion)
+                comandos[consigna.nombre] = (consigna.direccion, consigna.velocidad)
+                self._registrar(consigna)
+
+        for nombre, (_, _, fin) in list(self._activos.items()):
+            if ahora >= fin:
+                del self._activos[nombre]
+                comandos[nombre] = (0, 0.0)
+
+        if comandos:
+            with METRICS.time('command_dispatch', {'origin': 'control_loop'}):
+                self.controlador_servo.fijar_velocidades(comandos)
+
+        for tarea in self._tareas:
+            tarea(self.periodo)
+
+    def _registrar(self, consigna):
+        telemetria = getattr(self.controlador_servo, 'telemetria', None)
+        perfil = self.controlador_servo.perfiles.get(consigna.nombre)
+        if telemetria is not None and perfil is not None:
+            telemetria.record_move(perfil.canal, consigna.direccion * consigna.velocidad, consigna.duracion)
+
+    def iniciar(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, name='bucle_control', daemon=True)
+        self._hilo.start()
+        log.info(f"[BucleControl] iniciado a {1.0 / self.periodo:.0f}Hz")
+
+    def detener(self):
+        self._parar.set()
+        if self._hilo:
+            self._hilo.join(timeout=1.0)
+        self.controlador_servo.detener_todos()
+
+    def _bucle(self):
+        siguiente = self.reloj.ahora()
+        while not self._parar.is_set():
+            inicio = self.reloj.ahora()
+            jitter = max(0.0, inicio - siguiente)
+            try:
+                self.tick(inicio)
+            except Exception as e:
+                log.error(f"[BucleControl] error en tick: {e}")
+            fin = self.reloj.ahora()
+
+            siguiente += self.periodo
+            overrun = fin > siguiente
+            self.metricas.registrar(fin - inicio, jitter, overrun)
+            if overrun:
+                # Deadline perdido: saltar los ticks atrasados en lugar de encadenarlos
+                siguiente = fin
+            else:
+                self.reloj.dormir(siguiente - fin)
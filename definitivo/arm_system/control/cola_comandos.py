@@ -0,0 +1,133 @@
+"""
+Cola de comandos por articulación con fusión.
+
+Los sliders de las interfaces web mandan un /move por cada pequeño ajuste.
+En lugar de encolar cada uno como un movimiento completo, ColaComandos
+mantiene como mucho un comando pendiente por articulación:
+  - un comando nuevo compatible con el pendiente se fusiona con él
+    (p. ej. dos empujes en la misma dirección = un movimiento más largo),
+  - uno incompatible cancela al pendiente (y al que está en curso) y ocupa su lugar.
+Así el brazo sigue la última intención del operador en lugar de vaciar un
+backlog que lo mantiene moviéndose después de soltar el slider.
+"""
+import threading
+
+from .ejecutor_movimientos import PENDIENTE
+
+ENCOLADO = 'encolado'
+FUSIONADO = 'fusionado'
+SUSTITUIDO = 'sustituido'
+
+
+def fusionar_tiempo(tiempo_max: float):
+    """Política para comandos {'direction', 'time'}: misma dirección suma tiempos, opuesta no fusiona"""
+    def fusionar(pendiente, nuevo):
+        if pendiente['direction'] != nuevo['direction']:
+            return None
+        return dict(pendiente, time=min(tiempo_max, pendiente['time'] + nuevo['time']))
+    return fusionar
+
+
+def fusionar_ultimo(pendiente, nuevo):
+    """Política para objetivos absolutos (ángulos): el último comando sustituye al pendiente"""
+    return nuevo
+
+
+class ColaComandos:
+    """Comandos por articulación sobre un EjecutorMovimientos, con fusión de pendientes"""
+
+    def __init__(self, ejecutor, ejecutar, fusionar=fusionar_ultimo, tipo='move'):
+        """
+        Args:
+            ejecutor: EjecutorMovimientos compartido
+            ejecutar: callable `ejecutar(articulacion, comando, trabajo) -> (exito, mensaje)`
+            fusionar: callable `fusionar(pendiente, nuevo)` que devuelve el comando fusionado
+                      o None si el nuevo debe sustituir al pendiente
+            tipo: tipo de los trabajos creados
+        """
+        self.ejecutor = ejecutor
+        self.ejecutar = ejecutar
+        self.fusionar = fusionar
+        self.tipo = tipo
+        self._pendientes = {}
+        self._en_curso = {}
+        # _lock protege el estado (lo toman estadisticas() y el hilo del ejecutor); _envio serializa
+        # los enviar() y se mantiene mientras se encola en el ejecutor, que publica eventos de forma
+        # síncrona y sus suscriptores pueden llamar a estadisticas()
+        self._lock = threading.Lock()
+        self._envio = threading.Lock()
+        self.recibidos = 0
+        self.fusionados = 0
+        self.sustituidos = 0
+        self.ejecutados = 0
+
+    def enviar(self, articulacion: str, comando: dict):
+        """Encolar o fusionar un comando
+
+        Returns:
+            (trabajo, acción) con acción ENCOLADO, FUSIONADO o SUSTITUIDO
+        """
+        with self._envio:
+            with self._lock:
+                self.recibidos += 1
+                pendiente = self._pendientes.get(articulacion)
+                if pendiente is not None and not pendiente.cancelado:
+                    fusionado = self.fusionar(pendiente.datos, comando)
+                    if fusionado is not None:
+                        pendiente.datos = fusionado
+                        self.fusionados += 1
+                        return pendiente, FUSIONADO
+
+                accion = ENCOLADO
+                for anterior in (pendiente, self._en_curso.get(articulacion)):
+                    if anterior is None or anterior.cancelado:
+                        continue
+                    if anterior is pendiente or self.fusionar(anterior.datos, comando) is None:
+                        anterior.cancelar()
+                        self.sustituidos += 1
+                        accion = SUSTITUIDO
+                if self._pendientes.get(articulacion) is pendiente:
+                    self._pendientes.pop(articulacion, None)
+
+            # sin _lock: el ejecutor notifica a sus suscriptores desde este hilo
+            trabajo = self.ejecutor.enviar(self.tipo, lambda t: self._ejecutar(articulacion, t), datos=comando)
+
+            with self._lock:
+                # si el hilo del ejecutor ya lo empezó, no queda pendiente
+                if trabajo.estado == PENDIENTE:
+                    self._pendientes[articulacion] = trabajo
+            return trabajo, accion
+
+    def _ejecutar(self, articulacion, trabajo):
+        with self._lock:
+            if self._pendientes.get(articulacion) is trabajo:
+                del self._pendientes[articulacion]
+            self._en_curso[articulacion] = trabajo
+            comando = trabajo.datos
+        try:
+            return self.ejecutar(articulacion, comando, trabajo)
+        finally:
+            with self._lock:
+                if self._en_curso.get(articulacion) is trabajo:
+                    del self._en_curso[articulacion]
+                self.ejecutados += 1
+
+    def pendiente(self, articulacion: str) -> bool:
+        """True si hay otro comando esperando para la articulación"""
+        with self._lock:
+            trabajo = self._pendientes.get(articulacion)
+            return trabajo is not None and not trabajo.cancelado
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            profundidad = {nombre: 1 for nombre, t in self._pendientes.items() if not t.cancelado}
+            en_curso = {nombre: t.id for nombre, t in self._en_curso.items()}
+            return {
+                'depth': profundidad,
+                'executor_depth': self.ejecutor.pendientes(),
+                'running': en_curso,
+                'received': self.recibidos,
+                'coalesced': self.fusionados,
+                'superseded': self.sustituidos,
+                'executed': self.ejecutados
+            }
@@ -0,0 +1,192 @@
+"""
+Ejecutor único de trabajos de movimiento.
+
+Los servidores web no ejecutan movimientos dentro del handler: encolan un
+trabajo, devuelven su id al instante y siguen el progreso con eventos. Un
+solo hilo ejecuta los trabajos en orden, de modo que dos clientes nunca
+mueven el brazo a la vez. La parada de emergencia no pasa por la cola:
+cancela todos los trabajos y detiene los servos desde el hilo que la pide.
+"""
+import queue
+import threading
+import itertools
+import logging as log
+from collections import OrderedDict
+
+PENDIENTE = 'pendiente'
+EJECUTANDO = 'ejecutando'
+COMPLETADO = 'completado'
+ERROR = 'error'
+CANCELADO = 'cancelado'
+
+FINALES = (COMPLETADO, ERROR, CANCELADO)
+
+
+class Trabajo:
+    """Trabajo de movimiento con estado y progreso observables"""
+
+    def __init__(self, id_trabajo, tipo, funcion, ejecutor, datos=None):
+        self.id = id_trabajo
+        self.tipo = tipo
+        self.funcion = funcion
+        self.datos = datos
+        self.estado = PENDIENTE
+        self.progreso = 0.0
+        self.mensaje = ''
+        self._cancelado = threading.Event()
+        self._ejecutor = ejecutor
+
+    @property
+    def cancelado(self) -> bool:
+        return self._cancelado.is_set()
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    def reportar(self, progreso: float, mensaje: str = None):
+        """Publicar progreso (0.0-1.0) desde la función del trabajo"""
+        self.progreso = max(0.0, min(1.0, progreso))
+        if mensaje is not None:
+            self.mensaje = mensaje
+        self._ejecutor._publicar(self)
+
+    def como_dict(self) -> dict:
+        return {
+            'job_id': self.id,
+            'type': self.tipo,
+            'state': self.estado,
+            'progress': self.progreso,
+            'message': self.mensaje
+        }
+
+
+class EjecutorMovimientos:
+    """Cola de trabajos de movimiento atendida por un solo hilo"""
+
+    def __init__(self, detener=None, historial=100):
+        """
+        Args:
+            detener: callable que detiene el hardware en una parada de emergencia
+            historial: número de trabajos terminados que se conservan para consulta
+        """
+        self.detener = detener
+        self.historial = historial
+        self._cola = queue.Queue()
+        self._trabajos = OrderedDict()
+        self._lock = threading.Lock()
+        self._suscriptores = []
+        self._ids = itertools.count(1)
+        self._hilo = None
+
+    # --- suscripciones ---
+    def suscribir(self, callback):
+        """Registrar `callback(evento)`; se llama desde el hilo del ejecutor"""
+        with self._lock:
+            self._suscriptores.append(callback)
+
+    def desuscribir(self, callback):
+        with self._lock:
+            if callback in self._suscriptores:
+                self._suscriptores.remove(callback)
+
+    def _publicar(self, trabajo):
+        evento = trabajo.como_dict()
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for callback in suscriptores:
+            try:
+                callback(evento)
+            except Exception as e:
+                log.warning(f"[Ejecutor] error notificando evento: {e}")
+
+    # --- trabajos ---
+    def enviar(self, tipo: str, funcion, datos=None) -> Trabajo:
+        """Encolar `funcion(trabajo) -> (exito, mensaje)` y devolver el trabajo sin esperar
+
+        `datos` queda en trabajo.datos y puede modificarse hasta que el trabajo empiece.
+        """
+        trabajo = Trabajo(f"{next(self._ids)}", tipo, funcion, self, datos)
+        with self._lock:
+            self._trabajos[trabajo.id] = trabajo
+            self._purgar()
+        self._cola.put(trabajo)
+        self._publicar(trabajo)
+        self.iniciar()
+        return trabajo
+
+    def obtener(self, id_trabajo: str):
+        with self._lock:
+            return self._trabajos.get(id_trabajo)
+
+    def trabajos(self) -> list:
+        with self._lock:
+            return [t.como_dict() for t in self._trabajos.values()]
+
+    def pendientes(self) -> int:
+        """Trabajos en cola sin empezar"""
+        return self._cola.qsize()
+
+    def cancelar(self, id_trabajo: str) -> bool:
+        trabajo = self.obtener(id_trabajo)
+        if trabajo is None or trabajo.estado in FINALES:
+            return False
+        trabajo.cancelar()
+        return True
+
+    def parada_emergencia(self):
+        """Cancelar todos los trabajos y detener el hardware sin pasar por la cola"""
+        with self._lock:
+            activos = [t for t in self._trabajos.values() if t.estado not in FINALES]
+        for trabajo in activos:
+            trabajo.cancelar()
+        if self.detener is not None:
+            self.detener()
+        log.warning(f"[Ejecutor] parada de emergencia: {len(activos)} trabajos cancelados")
+
+    def _purgar(self):
+        terminados = [i for i, t in self._trabajos.items() if t.estado in FINALES]
+        for id_trabajo in terminados[:max(0, len(self._trabajos) - self.historial)]:
+            del self._trabajos[id_trabajo]
+
+    # --- hilo ---
+    def iniciar(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._hilo = threading.Thread(target=self._bucle, name='ejecutor_movimientos', daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            trabajo = self._cola.get()
+            if trabajo is None:
+                break
+            self._ejecutar(trabajo)
+
+    def _ejecutar(self, trabajo):
+        if trabajo.cancelado:
+            trabajo.estado = CANCELADO
+            trabajo.mensaje = 'Cancelado antes de empezar'
+            self._publicar(trabajo)
+            return
+
+        trabajo.estado = EJECUTANDO
+        self._publicar(trabajo)
+        try:
+            exito, mensaje = trabajo.funcion(trabajo)
+            if trabajo.cancelado:
+                trabajo.estado = CANCELADO
+            else:
+                trabajo.estado = COMPLETADO if exito else ERROR
+                if exito:
+                    trabajo.progreso = 1.0
+            trabajo.mensaje = mensaje
+        except Exception as e:
+            log.error(f"[Ejecutor] trabajo {trabajo.id} ({trabajo.tipo}) falló: {e}")
+            trabajo.estado = ERROR
+            trabajo.mensaje = str(e)
+        self._publicar(trabajo)
+
+    def detener_hilo(self):
+        if self._hilo and self._hilo.is_alive():
+            self._cola.put(None)
+            self._hilo.join(timeout=1.0)
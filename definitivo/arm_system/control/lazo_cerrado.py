@@ -0,0 +1,264 @@
+"""
+Control en lazo cerrado de los servos continuos.
+
+Los servos MG996R modificados no tienen encoder, así que la posición de cada
+articulación se estima fusionando:
+  - el modelo de movimiento (velocidad mandada × grados/segundo calibrados),
+  - los ángulos que reporta el VEX (mensaje `current_angles`: Inertial/Distance).
+
+El modelo avanza con cada movimiento mandado, también en lazo abierto
+(ControladorServo.observar). La corrección con marcadores vistos por la
+cámara no está implementada: la cámara de escaneo mira a la mesa y no ve los
+eslabones, así que no hay imágenes de las que medir los ángulos. Una fuente
+nueva solo necesita llamar a _corregir con su propia varianza.
+
+Con esa estimación, ControladorLazoCerrado ejecuta un bucle a frecuencia fija
+que lleva cada servo a su ángulo objetivo: velocidad máxima lejos del objetivo
+y frenado proporcional al acercarse, en lugar de movimientos a velocidad=0.5
+limitados por tiempo.
+"""
+import threading
+import logging as log
+
+try:
+    from .reloj import RELOJ_REAL
+except ImportError:
+    from control.reloj import RELOJ_REAL
+
+# Varianza de medida (grados²) de los ángulos del VEX
+VARIANZA_VEX = 1.0
+
+# Grados/segundo de cada articulación a velocidad=1.0 (estimados de los tiempos de servo_config.json)
+GRADOS_POR_SEGUNDO = {
+    'shoulder': 30.0,
+    'elbow': 35.0,
+    'wrist': 90.0,
+    'gripper': 120.0
+}
+
+
+def _envolver(angulo: float) -> float:
+    """Normalizar un ángulo a [-180, 180)"""
+    return (angulo + 180.0) % 360.0 - 180.0
+
+
+class EstimadorArticulacion:
+    """Filtro de Kalman 1D (ángulo) con el mando de velocidad como entrada"""
+
+    def __init__(self, angulo_inicial=0.0, varianza_inicial=100.0, ruido_proceso=0.5,
+                 ruido_movimiento=25.0, grados_por_segundo=60.0):
+        """
+        Args:
+            ruido_proceso: grados²/s de deriva aunque el servo esté parado
+            ruido_movimiento: grados²/s adicionales a velocidad 1.0 (incertidumbre del modelo)
+            grados_por_segundo: velocidad angular a velocidad=1.0
+        """
+        self.angulo = float(angulo_inicial)
+        self.varianza = float(varianza_inicial)
+        self.ruido_proceso = ruido_proceso
+        self.ruido_movimiento = ruido_movimiento
+        self.grados_por_segundo = grados_por_segundo
+
+    def predecir(self, dt: float, mando: float = 0.0):
+        """Propagar el estado `dt` segundos con mando de velocidad con signo (-1.0 a 1.0)"""
+        self.angulo += self.grados_por_segundo * mando * dt
+        self.varianza += (self.ruido_proceso + self.ruido_movimiento * abs(mando)) * dt
+
+    def corregir(self, medida: float, varianza: float):
+        """Incorporar una medida absoluta del ángulo"""
+        innovacion = _envolver(medida - self.angulo)
+        ganancia = self.varianza / (self.varianza + varianza)
+        self.angulo += ganancia * innovacion
+        self.varianza *= (1.0 - ganancia)
+
+
+class FusionArticulaciones:
+    """Estimación fusionada de todas las articulaciones (modelo + VEX)"""
+
+    def __init__(self, angulos_iniciales: dict, grados_por_segundo: dict = None, mapeo_vex: dict = None):
+        """
+        Args:
+            angulos_iniciales: {articulación: grados} de partida
+            grados_por_segundo: sobrescribe GRADOS_POR_SEGUNDO por articulación
+            mapeo_vex: {clave en current_angles: articulación} si el VEX usa otros nombres
+        """
+        velocidades = dict(GRADOS_POR_SEGUNDO, **(grados_por_segundo or {}))
+        self.estimadores = {
+            nombre: EstimadorArticulacion(angulo, grados_por_segundo=velocidades.get(nombre, 60.0))
+            for nombre, angulo in angulos_iniciales.items()
+        }
+        self.mapeo_vex = mapeo_vex or {}
+        self._lock = threading.Lock()
+
+    def predecir(self, dt: float, mandos: dict):
+        """Avanzar todas las articulaciones con {articulación: mando con signo}"""
+        with self._lock:
+            for nombre, estimador in self.estimadores.items():
+                estimador.predecir(dt, mandos.get(nombre, 0.0))
+
+    def actualizar_vex(self, datos: dict):
+        """Callback para el mensaje `current_angles` del VEX"""
+        self._corregir(datos, VARIANZA_VEX, self.mapeo_vex)
+
+    def _corregir(self, medidas: dict, varianza: float, mapeo: dict = None):
+        with self._lock:
+            for clave, valor in medidas.items():
+                nombre = (mapeo or {}).get(clave, clave)
+                estimador = self.estimadores.get(nombre)
+                if estimador is None:
+                    continue
+                try:
+                    estimador.corregir(float(valor), varianza)
+                except (TypeError, ValueError):
+                    log.warning(f"[LazoCerrado] medida inválida para {nombre}: {valor}")
+
+    def angulos(self) -> dict:
+        """Ángulos estimados actuales"""
+        with self._lock:
+            return {nombre: e.angulo for nombre, e in self.estimadores.items()}
+
+    def varianzas(self) -> dict:
+        with self._lock:
+            return {nombre: e.varianza for nombre, e in self.estimadores.items()}
+
+
+class ControladorLazoCerrado:
+    """Bucle de control a frecuencia fija que lleva cada servo a su ángulo objetivo"""
+
+    def __init__(self, controlador_servo, fusion: FusionArticulaciones, frecuencia_hz: float = 50.0,
+                 kp: float = 0.05, tolerancia: float = 2.0, velocidad_min: float = 0.1,
+                 velocidad_max: float = 1.0, signos: dict = None, reloj=None):
+        """
+        Args:
+            controlador_servo: ControladorServo que recibe los mandos
+            kp: velocidad (0-1) por grado de error; por encima de velocidad_max satura
+            tolerancia: error (grados) por debajo del cual se aplica el pulso hold
+            signos: {articulación: 1 o -1} dirección del servo que aumenta el ángulo
+        """
+        self.controlador_servo = controlador_servo
+        self.fusion = fusion
+        self.periodo = 1.0 / frecuencia_hz
+        self.kp = kp
+        self.tolerancia = tolerancia
+        self.velocidad_min = velocidad_min
+        self.velocidad_max = velocidad_max
+        self.signos = signos or {}
+        self.reloj = reloj or getattr(controlador_servo, 'reloj', RELOJ_REAL)
+
+        self.objetivos = {}
+        self._mandos = {}
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._activo = False
+        self._parar = threading.Event()
+
+    # --- objetivos ---
+    def fijar_objetivo(self, nombre: str, angulo: float):
+        """Fijar el ángulo objetivo de una articulación (no bloquea)"""
+        with self._lock:
+            self.objetivos[nombre] = float(angulo)
+
+    def liberar(self, nombre: str = None):
+        """Quitar el objetivo (una articulación o todas) y aplicar hold"""
+        with self._lock:
+            nombres = [nombre] if nombre else list(self.objetivos)
+            for n in nombres:
+                self.objetivos.pop(n, None)
+        self.controlador_servo.fijar_velocidades({n: (0, 0.0) for n in nombres})
+
+    def en_objetivo(self, nombre: str) -> bool:
+        with self._lock:
+            objetivo = self.objetivos.get(nombre)
+        if objetivo is None:
+            return True
+        return abs(_envolver(objetivo - self.fusion.angulos()[nombre])) <= self.tolerancia
+
+    def mover_a(self, nombre: str, angulo: float, timeout: float = 10.0) -> bool:
+        """Fijar objetivo y esperar a que la articulación llegue (requiere el bucle en marcha)
+
+        Sin hilo (RelojVirtual) cada espera ejecuta el tick que haría el bucle.
+        """
+        self.fijar_objetivo(nombre, angulo)
+        limite = self.reloj.ahora() + timeout
+        while self.reloj.ahora() < limite:
+            if self.en_objetivo(nombre):
+                return True
+            if self._activo and self._hilo is None:
+                self.paso()
+            self.reloj.dormir(self.periodo)
+        log.warning(f"[LazoCerrado] timeout llevando {nombre} a {angulo}°")
+        return False
+
+    # --- bucle ---
+    def paso(self, dt: float = None):
+        """Un tick de control: predecir, calcular mandos y escribirlos en una ráfaga"""
+        dt = self.periodo if dt is None else dt
+        # El estado avanza con los mandos aplicados durante el tick anterior
+        self.fusion.predecir(dt, self._mandos)
+
+        angulos = self.fusion.angulos()
+        with self._lock:
+            objetivos = dict(self.objetivos)
+
+        comandos = {}
+        mandos = {}
+        for nombre, objetivo in objetivos.items():
+            if nombre not in angulos:
+                continue
+            error = _envolver(objetivo - angulos[nombre])
+            if abs(error) <= self.tolerancia:
+                comandos[nombre] = (0, 0.0)
+                continue
+            velocidad = min(self.velocidad_max, max(self.velocidad_min, self.kp * abs(error)))
+            signo = self.signos.get(nombre, 1)
+            direccion = signo if error > 0 else -signo
+            comandos[nombre] = (direccion, velocidad)
+            mandos[nombre] = velocidad if error > 0 else -velocidad
+
+        if comandos:
+            self.controlador_servo.fijar_velocidades(comandos)
+        self._mandos = mandos
+
+    @property
+    def activo(self) -> bool:
+        if self._hilo is None:
+            return self._activo
+        return self._hilo.is_alive()
+
+    def iniciar(self):
+        """Arrancar el bucle en un hilo con planificación por deadline monotónico
+
+        Con RelojVirtual no se usa el hilo: la simulación llama a paso() directamente
+        (mover_a lo hace en cada espera).
+        """
+        if self.activo:
+            return
+        self._activo = True
+        if getattr(self.reloj, 'simulado', False):
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._activo = False
+        self._parar.set()
+        if self._hilo:
+            self._hilo.join(timeout=1.0)
+            self._hilo = None
+        self.liberar()
+
+    def _bucle(self):
+        siguiente = self.reloj.ahora()
+        anterior = siguiente
+        while not self._parar.is_set():
+            ahora = self.reloj.ahora()
+            self.paso(ahora - anterior if ahora > anterior else self.periodo)
+            anterior = ahora
+            siguiente += self.periodo
+            espera = siguiente - self.reloj.ahora()
+            if espera > 0:
+                self.reloj.dormir(espera)
+            else:
+                # Tick perdido: re-sincronizar en lugar de acumular retraso
+                siguiente = self.reloj.ahora()
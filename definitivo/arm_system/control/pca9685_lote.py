@@ -0,0 +1,126 @@
+"""
+Escritura por lotes de los registros LEDn del PCA9685.
+
+adafruit_pca9685 escribe cada canal en una transacción I2C independiente.
+Aquí se agrupan los canales modificados en ráfagas con auto-incremento
+(MODE1.AI, que la librería activa al fijar la frecuencia) y se mantiene una
+copia "sombra" de los registros para no reescribir canales sin cambios.
+"""
+import threading
+import logging as log
+
+try:
+    from ..telemetry.metrics import METRICS
+    from ..telemetry.event_log import EVENTS
+except ImportError:
+    from telemetry.metrics import METRICS
+    from telemetry.event_log import EVENTS
+
+# Registros del PCA9685 (datasheet NXP, sección 7.3)
+LED0_ON_L = 0x06
+ALL_LED_ON_L = 0xFA
+BYTES_POR_CANAL = 4
+BIT_COMPLETO = 0x1000  # bit 4 de LEDn_ON_H / LEDn_OFF_H: salida siempre ON / siempre OFF
+NUM_CANALES = 16
+
+# Canales sin cambios que se incluyen en una ráfaga para unir dos tramos
+# (4 bytes extra salen más baratos que una transacción I2C nueva)
+MAX_HUECO = 2
+
+
+def registros_desde_duty(duty_cycle: int) -> tuple:
+    """Convertir duty cycle de 16 bits a (ON, OFF) de 12 bits igual que adafruit_pca9685
+
+    Réplica del setter PWMChannel.duty_cycle de adafruit_pca9685 >= 3.4 (0xFFFF siempre ON,
+    < 0x10 siempre OFF, el resto sin los 4 bits bajos) para que un canal escrito por lotes
+    quede con los mismos registros que escrito con pca.channels[canal].duty_cycle.
+    """
+    if not 0 <= duty_cycle <= 0xFFFF:
+        raise ValueError(f"Duty cycle fuera de rango: {duty_cycle} (0-65535)")
+    if duty_cycle == 0xFFFF:
+        return (BIT_COMPLETO, 0)
+    if duty_cycle < 0x0010:
+        return (0, BIT_COMPLETO)
+    return (0, duty_cycle >> 4)
+
+
+def _bytes_canal(on: int, off: int) -> bytes:
+    return bytes((on & 0xFF, on >> 8, off & 0xFF, off >> 8))
+
+
+class EscritorLotePCA9685:
+    """Escritor por lotes con caché sombra de registros LEDn_ON/OFF"""
+
+    def __init__(self, pca, telemetria=None):
+        """
+        Args:
+            pca: PCA9685 (real o simulado) con i2c_device
+            telemetria: TelemetryRecorder opcional que recibe cada duty cycle mandado
+        """
+        self.pca = pca
+        self.telemetria = telemetria
+        self._sombra = {}  # canal -> (on, off) escrito por última vez
+        self._lock = threading.Lock()
+        self.transacciones = 0
+        self.canales_omitidos = 0
+
+    def invalidar(self, canal: int = None):
+        """Olvidar el valor sombra (p. ej. si alguien escribió el canal directamente)"""
+        with self._lock:
+            if canal is None:
+                self._sombra.clear()
+            else:
+                self._sombra.pop(canal, None)
+
+    def escribir(self, duties: dict):
+        """Escribir {canal: duty_cycle} en el mínimo número de ráfagas I2C
+
+        Los canales cuyo valor coincide con la sombra no se envían.
+        """
+        if self.telemetria is not None:
+            self.telemetria.record_pulses(duties)
+        with self._lock:
+            pendientes = {}
+            for canal, duty in duties.items():
+                registros = registros_desde_duty(int(duty))
+                if self._sombra.get(canal) == registros:
+                    self.canales_omitidos += 1
+                    continue
+                pendientes[canal] = registros
+
+            if not pendientes:
+                return
+            if EVENTS.enabled:
+                EVENTS.record('servo', 'write', {canal: duties[canal] for canal in pendientes})
+
+            for inicio, fin in self._tramos(sorted(pendientes)):
+                datos = bytearray((LED0_ON_L + BYTES_POR_CANAL * inicio,))
+                for canal in range(inicio, fin + 1):
+                    datos += _bytes_canal(*pendientes.get(canal, self._sombra.get(canal)))
+                self._enviar(datos)
+            self._sombra.update(pendientes)
+
+    def apagar_todos(self):
+        """Cortar la señal de los 16 canales en una sola escritura a ALL_LED (parada total)"""
+        with self._lock:
+            self._enviar(bytearray((ALL_LED_ON_L,)) + _bytes_canal(0, BIT_COMPLETO))
+            EVENTS.record('servo', 'off_all')
+            self._sombra = {canal: (0, BIT_COMPLETO) for canal in range(NUM_CANALES)}
+        log.info("[PCA9685] ALL_LED apagado: todos los canales sin pulso")
+
+    def _tramos(self, canales: list):
+        """Agrupar canales ordenados en tramos contiguos, cubriendo huecos cortos conocidos"""
+        inicio = fin = canales[0]
+        for canal in canales[1:]:
+            hueco = range(fin + 1, canal)
+            if len(hueco) <= MAX_HUECO and all(c in self._sombra for c in hueco):
+                fin = canal
+            else:
+                yield inicio, fin
+                inicio = fin = canal
+        yield inicio, fin
+
+    def _enviar(self, datos: bytearray):
+        with METRICS.time('i2c_write'), self.pca.i2c_device as i2c:
+            i2c.write(datos)
+        self.transacciones += 1
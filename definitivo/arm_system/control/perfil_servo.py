@@ -0,0 +1,141 @@
+"""
+Perfiles precompilados de servos continuos.
+
+Cada PerfilServo guarda los duty cycles ya calculados (neutral, hold, tabla de
+velocidades y pulsos con nombre) para que los bucles de control no repitan
+`int(pulso / 20000 * 0xFFFF)` ni búsquedas en diccionarios anidados en cada
+escritura. Lo comparten ControladorServo y los scripts de calibración.
+"""
+import json
+import os
+import logging as log
+
+PERIODO_US = 20000        # Periodo PWM a 50Hz
+RANGO_VELOCIDAD_US = 500  # Desplazamiento desde neutral a velocidad 1.0
+PASOS_TABLA = 20          # Resolución de la tabla de velocidades (0.05)
+
+RUTA_CONFIG = os.path.join(os.path.dirname(__file__), '..', 'servo_config.json')
+
+# Valores por defecto si no existe servo_config.json
+CONFIG_POR_DEFECTO = {
+    'shoulder': {'canal': 0, 'pulso_neutral': 1700, 'pulso_hold': 1700},
+    'elbow': {'canal': 1, 'pulso_neutral': 1720, 'pulso_hold': 1850},
+    'wrist': {'canal': 2, 'pulso_neutral': 1682, 'pulso_hold': 1800},
+    'gripper': {'canal': 3, 'pulso_neutral': 1690, 'pulso_hold': 1690}
+}
+
+
+def duty_desde_pulso(pulso_us: float) -> int:
+    """Convertir ancho de pulso (µs) a duty cycle de 16 bits del PCA9685"""
+    return int(pulso_us / PERIODO_US * 0xFFFF)
+
+
+def aplicar_pulso(pca, canal, pulso_us):
+    """Aplicar un pulso (µs) a un canal del PCA9685"""
+    pca.channels[canal].duty_cycle = duty_desde_pulso(pulso_us)
+
+
+class PerfilServo:
+    """Perfil compilado de un servo continuo con duty cycles precalculados"""
+
+    __slots__ = ('nombre', 'canal', 'pulso_neutral', 'pulso_hold',
+                 'duty_neutral', 'duty_hold', '_tabla', '_fijos')
+
+    def __init__(self, nombre, canal, pulso_neutral, pulso_hold=None, pulsos=None):
+        """
+        Args:
+            nombre: Nombre del servo ('shoulder', 'elbow', ...)
+            canal: Canal del PCA9685
+            pulso_neutral: Pulso que detiene el servo (µs)
+            pulso_hold: Pulso de mantenimiento al terminar un movimiento (µs), neutral si es None
+            pulsos: dict opcional {nombre: µs} con pulsos fijos ('subir', 'abrir', ...)
+        """
+        self.nombre = nombre
+        self.canal = canal
+        self.pulso_neutral = pulso_neutral
+        self.pulso_hold = pulso_neutral if pulso_hold is None else pulso_hold
+        self.duty_neutral = duty_desde_pulso(self.pulso_neutral)
+        self.duty_hold = duty_desde_pulso(self.pulso_hold)
+
+        # _tabla[direccion][i] = duty para velocidad i / PASOS_TABLA
+        # -1 = horario (neutral+), 1 = antihorario (neutral-)
+        self._tabla = {
+            direccion: tuple(
+                duty_desde_pulso(self.pulso_neutral - direccion * RANGO_VELOCIDAD_US * i / PASOS_TABLA)
+                for i in range(PASOS_TABLA + 1)
+            )
+            for direccion in (-1, 1)
+        }
+        self._fijos = {}
+        for clave, pulso in (pulsos or {}).items():
+            self.agregar_pulso(clave, pulso)
+
+    def agregar_pulso(self, clave, pulso_us):
+        """Registrar un pulso fijo con nombre y precalcular su duty cycle"""
+        self._fijos[clave] = (pulso_us, duty_desde_pulso(pulso_us))
+
+    def pulso(self, direccion, velocidad=0.5):
+        """Pulso (µs) para una dirección (-1, 0, 1) y factor de velocidad"""
+        return self.pulso_neutral - direccion * RANGO_VELOCIDAD_US * velocidad
+
+    def duty(self, direccion, velocidad=0.5):
+        """Duty cycle para una dirección (-1, 0, 1) y factor de velocidad
+
+        Las velocidades múltiplo de 1/PASOS_TABLA dentro de 0.0-1.0 salen de la
+        tabla; el resto (p. ej. la escala 1-10 de la web) se calcula al vuelo.
+        """
+        if direccion == 0:
+            return self.duty_neutral
+        indice = velocidad * PASOS_TABLA
+        i = int(round(indice))
+        if 0 <= i <= PASOS_TABLA and abs(indice - i) < 1e-9:
+            return self._tabla[direccion][i]
+        return duty_desde_pulso(self.pulso(direccion, velocidad))
+
+    def duty_fijo(self, clave):
+        """Duty cycle de un pulso fijo registrado con agregar_pulso()"""
+        return self._fijos[clave][1]
+
+    def pulso_fijo(self, clave):
+        """Pulso (µs) de un pulso fijo registrado con agregar_pulso()"""
+        return self._fijos[clave][0]
+
+    def aplicar(self, pca, clave):
+        """Escribir un pulso fijo ('neutral', 'hold' o registrado) directamente en el PCA9685"""
+        if clave == 'neutral':
+            duty = self.duty_neutral
+        elif clave == 'hold':
+            duty = self.duty_hold
+        else:
+            duty = self._fijos[clave][1]
+        pca.channels[self.canal].duty_cycle = duty
+
+    def __repr__(self):
+        return (f"PerfilServo({self.nombre!r}, canal={self.canal}, neutral={self.pulso_neutral}µs, "
+                f"hold={self.pulso_hold}µs)")
+
+
+def cargar_configuracion(ruta: str = RUTA_CONFIG) -> dict:
+    """Leer servo_config.json (o los valores por defecto) como {nombre: datos}"""
+    try:
+        if os.path.exists(ruta):
+            with open(ruta, 'r') as f:
+                config = json.load(f)
+            log.info(f"✅ Pulsos neutrales y hold cargados desde {ruta}")
+            return config
+        log.warning(f"⚠️  No se encontró {ruta}, usando valores calibrados por defecto")
+    except Exception as e:
+        log.error(f"❌ Error cargando servo_config.json: {e}")
+        log.warning("Usando valores calibrados por defecto")
+    return {nombre: dict(datos) for nombre, datos in CONFIG_POR_DEFECTO.items()}
+
+
+def cargar_perfil(nombre: str, canal: int = None, pulsos: dict = None, ruta: str = RUTA_CONFIG) -> PerfilServo:
+    """Crear el PerfilServo de un servo a partir de servo_config.json"""
+    por_defecto = CONFIG_POR_DEFECTO.get(nombre, {})
+    datos = cargar_configuracion(ruta).get(nombre, por_defecto)
+    neutral = datos.get('pulso_neutral', por_defecto.get('pulso_neutral', 1500))
+    hold = datos.get('pulso_hold', neutral)
+    if canal is None:
+        canal = datos.get('canal', por_defecto.get('canal', 0))
+    return PerfilServo(nombre, canal, neutral, hold, pulsos)
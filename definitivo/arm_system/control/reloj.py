@@ -0,0 +1,50 @@
+import time
+import threading
+
+
+class RelojReal:
+    """Reloj de pared: delega en time.monotonic/time.sleep"""
+
+    simulado = False
+
+    def ahora(self) -> float:
+        """Tiempo monotónico en segundos"""
+        return time.monotonic()
+
+    def dormir(self, segundos: float):
+        """Bloquear el hilo actual durante `segundos`"""
+        if segundos > 0:
+            time.sleep(segundos)
+
+
+class RelojVirtual:
+    """Reloj simulado que avanza instantáneamente
+
+    `dormir` no bloquea: solo suma el tiempo pedido al contador interno.
+    Permite ejecutar miles de ciclos de escaneo → pick → place en segundos
+    midiendo igualmente la duración "real" que tendrían en el brazo.
+    """
+
+    simulado = True
+
+    def __init__(self, inicio: float = 0.0):
+        self._tiempo = float(inicio)
+        self._lock = threading.Lock()
+
+    def ahora(self) -> float:
+        """Tiempo simulado en segundos"""
+        return self._tiempo
+
+    def dormir(self, segundos: float):
+        """Avanzar el tiempo simulado sin bloquear"""
+        if segundos > 0:
+            with self._lock:
+                self._tiempo += segundos
+
+    def avanzar(self, segundos: float):
+        """Alias explícito de dormir() para código de simulación"""
+        self.dormir(segundos)
+
+
+# Reloj por defecto compartido por los controladores que no reciben uno explícito
+RELOJ_REAL = RelojReal()
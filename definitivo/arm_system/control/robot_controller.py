@@ -1,30 +1,59 @@
-import time
-import board
-import busio
-from adafruit_pca9685 import PCA9685
-from gpiozero import OutputDevice
 import logging as log
-import json
-import os
+
+try:
+    from .reloj import RELOJ_REAL
+    from .simulacion import PCA9685Simulado, PinSimulado
+    from .pca9685_lote import EscritorLotePCA9685
+    from .perfil_servo import PerfilServo, CONFIG_POR_DEFECTO, cargar_configuracion, duty_desde_pulso
+    from .bucle_control import BucleControl
+    from ..telemetry.event_log import EVENTS
+except ImportError:
+    from control.reloj import RELOJ_REAL
+    from control.simulacion import PCA9685Simulado, PinSimulado
+    from control.pca9685_lote import EscritorLotePCA9685
+    from control.perfil_servo import PerfilServo, CONFIG_POR_DEFECTO, cargar_configuracion, duty_desde_pulso
+    from control.bucle_control import BucleControl
+    from telemetry.event_log import EVENTS
 
 class ControladorServo:
     """Controlador para servos continuos usando PCA9685 con movimientos temporizados"""
 
-    def __init__(self, direccion_i2c=0x40, frecuencia=50):
-        """Inicializar controlador PCA9685"""
-        # Para Raspberry Pi 5: usar GPIO 3 (SCL) y GPIO 2 (SDA) - puerto I2C1
-        # Estos son los pines físicos 5 y 3 respectivamente
-        try:
-            self.i2c = busio.I2C(board.D3, board.D2)
-            log.info("I2C inicializado en GPIO3/GPIO2 (bus I2C1)")
-        except Exception as e:
-            log.error(f"Error inicializando I2C en GPIO3/GPIO2: {e}")
-            log.error("Verifica que I2C esté habilitado en raspi-config")
-            raise
-        
-        self.pca = PCA9685(self.i2c, address=direccion_i2c)
+    def __init__(self, direccion_i2c=0x40, frecuencia=50, reloj=None, pca=None, telemetria=None):
+        """Inicializar controlador PCA9685
+
+        Args:
+            reloj: Reloj usado para temporizar movimientos (RelojReal por defecto)
+            pca: Instancia PCA9685 ya creada (p. ej. PCA9685Simulado); si es None se abre el bus I2C
+            telemetria: TelemetryRecorder opcional (pulsos y movimientos mandados)
+        """
+        self.reloj = reloj or RELOJ_REAL
+        self.telemetria = telemetria
+        if pca is not None:
+            self.i2c = None
+            self.pca = pca
+        else:
+            import board
+            import busio
+            from adafruit_pca9685 import PCA9685
+
+            # Para Raspberry Pi 5: usar GPIO 3 (SCL) y GPIO 2 (SDA) - puerto I2C1
+            # Estos son los pines físicos 5 y 3 respectivamente
+            try:
+                self.i2c = busio.I2C(board.D3, board.D2)
+                log.info("I2C inicializado en GPIO3/GPIO2 (bus I2C1)")
+            except Exception as e:
+                log.error(f"Error inicializando I2C en GPIO3/GPIO2: {e}")
+                log.error("Verifica que I2C esté habilitado en raspi-config")
+                raise
+
+            self.pca = PCA9685(self.i2c, address=direccion_i2c)
         self.pca.frequency = frecuencia
+        # Todas las escrituras de canales pasan por el escritor por lotes (caché sombra + ráfagas I2C)
+        self.escritor = EscritorLotePCA9685(self.pca, telemetria)
         self.servos = {}
+        self.perfiles = {}
+        # callback(segundos, {nombre: mando con signo}) tras cada movimiento temporizado (p. ej. estimador)
+        self.observadores = []
         
         # Cargar pulsos neutrales calibrados desde servo_config.json
         self.pulsos_neutrales = self._cargar_pulsos_neutrales()
@@ -42,36 +71,14 @@ class ControladorServo:
 
     def _cargar_pulsos_neutrales(self):
         """Cargar pulsos neutrales y pulsos hold calibrados desde servo_config.json"""
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'servo_config.json')
-        
-        # Valores por defecto si no existe el archivo
-        default_config = {
-            'shoulder': {'pulso_neutral': 1700, 'pulso_hold': 1700},
-            'elbow': {'pulso_neutral': 1720, 'pulso_hold': 1850},
-            'wrist': {'pulso_neutral': 1682, 'pulso_hold': 1800},
-            'gripper': {'pulso_neutral': 1690, 'pulso_hold': 1690}
-        }
-        
-        try:
-            if os.path.exists(config_path):
-                with open(config_path, 'r') as f:
-                    config = json.load(f)
-                    # Extraer pulsos neutrales y hold
-                    pulsos = {}
-                    for nombre, datos in config.items():
-                        pulsos[nombre] = {
-                            'neutral': datos.get('pulso_neutral', default_config.get(nombre, {}).get('pulso_neutral', 1500)),
-                            'hold': datos.get('pulso_hold', datos.get('pulso_neutral', default_config.get(nombre, {}).get('pulso_hold', 1500)))
-                        }
-                    log.info(f"✅ Pulsos neutrales y hold cargados desde {config_path}")
-                    return pulsos
-            else:
-                log.warning(f"⚠️  No se encontró {config_path}, usando valores calibrados por defecto")
-                return {k: {'neutral': v['pulso_neutral'], 'hold': v['pulso_hold']} for k, v in default_config.items()}
-        except Exception as e:
-            log.error(f"❌ Error cargando servo_config.json: {e}")
-            log.warning("Usando valores calibrados por defecto")
-            return {k: {'neutral': v['pulso_neutral'], 'hold': v['pulso_hold']} for k, v in default_config.items()}
+        pulsos = {}
+        for nombre, datos in cargar_configuracion().items():
+            # campo ausente: valor calibrado por defecto de esa articulación
+            por_defecto = CONFIG_POR_DEFECTO.get(nombre, {})
+            neutral = datos.get('pulso_neutral', por_defecto.get('pulso_neutral', 1500))
+            hold = datos.get('pulso_hold', datos.get('pulso_neutral', por_defecto.get('pulso_hold', 1500)))
+            pulsos[nombre] = {'neutral': neutral, 'hold': hold}
+        return pulsos
 
     def agregar_servo(self, nombre, canal, pulso_min=500, pulso_max=2500, angulo_min=0, angulo_max=180):
         """Agregar servo al controlador"""
@@ -86,6 +93,8 @@ class ControladorServo:
             'pulso_neutral': config['neutral'],  # Pulso neutral personalizado
             'pulso_hold': config['hold']  # Pulso hold para compensación de gravedad
         }
+        # Perfil compilado con los duty cycles precalculados (usado en los movimientos)
+        self.perfiles[nombre] = PerfilServo(nombre, canal, config['neutral'], config['hold'])
         log.info(f"Servo '{nombre}' agregado: canal={canal}, pulso_neutral={self.servos[nombre]['pulso_neutral']}µs, pulso_hold={self.servos[nombre]['pulso_hold']}µs")
 
     def mover_por_tiempo(self, nombre, direccion, tiempo_segundos, velocidad=0.5):
@@ -101,46 +110,101 @@ class ControladorServo:
             log.error(f"Servo {nombre} no configurado")
             return
 
-        servo = self.servos[nombre]
-        pulso_neutral = servo['pulso_neutral']  # Usar pulso neutral calibrado
-
-        # CONTROL DE SERVOS CONTINUOS - Control de velocidad por tiempo
-        # direccion: -1 = giro horario, 0 = parar, 1 = giro antihorario
-        if direccion == 0:
-            # Detener - usar pulso neutral calibrado
-            pulso = pulso_neutral
-        elif direccion == -1:
-            # Giro horario (sentido horario)
-            pulso = pulso_neutral + (500 * velocidad)  # neutral+500us
-        elif direccion == 1:
-            # Giro antihorario (sentido antihorario)
-            pulso = pulso_neutral - (500 * velocidad)  # neutral-500us
-        else:
+        if direccion not in (-1, 0, 1):
             log.error(f"Dirección inválida: {direccion}")
             return
 
-        ciclo_trabajo = int(pulso / 20000 * 0xFFFF)  # Periodo 50Hz
-        log.info(f"[Servo] {nombre}: inicio movimiento dir={direccion} tiempo={tiempo_segundos}s pulso={pulso}us (neutral={pulso_neutral}us) canal={servo['canal']}")
-        self.pca.channels[servo['canal']].duty_cycle = ciclo_trabajo
+        # CONTROL DE SERVOS CONTINUOS - Control de velocidad por tiempo
+        # direccion: -1 = giro horario (neutral+), 0 = parar (neutral), 1 = giro antihorario (neutral-)
+        perfil = self.perfiles[nombre]
+        # Evento binario en lugar de una línea de log por movimiento (ver telemetry/event_log.py)
+        EVENTS.record('servo', 'move', perfil.canal, direccion, velocidad, tiempo_segundos)
+        log.debug(f"[Servo] {nombre}: inicio movimiento dir={direccion} tiempo={tiempo_segundos}s pulso={perfil.pulso(direccion, velocidad)}us (neutral={perfil.pulso_neutral}us) canal={perfil.canal}")
+        if self.telemetria is not None:
+            self.telemetria.record_move(perfil.canal, direccion * velocidad, tiempo_segundos)
+        self.escritor.escribir({perfil.canal: perfil.duty(direccion, velocidad)})
 
         # Mantener movimiento por el tiempo especificado
-        time.sleep(tiempo_segundos)
+        self.reloj.dormir(tiempo_segundos)
 
         # Usar PULSO_HOLD al terminar (compensa gravedad en codo y muñeca)
-        pulso_hold = servo['pulso_hold']
-        ciclo_hold = int(pulso_hold / 20000 * 0xFFFF)
-        self.pca.channels[servo['canal']].duty_cycle = ciclo_hold
-        log.info(f"[Servo] {nombre}: detenido con pulso hold {pulso_hold}us (neutral={pulso_neutral}us)")
+        self.escritor.escribir({perfil.canal: perfil.duty_hold})
+        log.debug(f"[Servo] {nombre}: detenido con pulso hold {perfil.pulso_hold}us (neutral={perfil.pulso_neutral}us)")
+        self._notificar(tiempo_segundos, {nombre: direccion * velocidad})
+
+    def mover_varios_por_tiempo(self, movimientos, tiempo_segundos, velocidad=0.5):
+        """Mover varios servos a la vez durante el mismo tiempo
+
+        El arranque y la parada de todos los servos se escriben en una sola
+        ráfaga I2C cada uno, sin desfase entre articulaciones.
+
+        Args:
+            movimientos: dict {nombre: direccion} con direccion -1, 0 o 1
+            tiempo_segundos: Tiempo de movimiento
+            velocidad: Factor de velocidad 0.0-1.0
+        """
+        arranque = {}
+        parada = {}
+        mandos = {}
+        for nombre, direccion in movimientos.items():
+            if nombre not in self.servos:
+                log.error(f"Servo {nombre} no configurado")
+                continue
+            if direccion not in (-1, 0, 1):
+                log.error(f"Dirección inválida: {direccion}")
+                continue
+            perfil = self.perfiles[nombre]
+            arranque[perfil.canal] = perfil.duty(direccion, velocidad)
+            parada[perfil.canal] = perfil.duty_hold
+            mandos[nombre] = direccion * velocidad
+            if self.telemetria is not None:
+                self.telemetria.record_move(perfil.canal, direccion * velocidad, tiempo_segundos)
+
+        if not arranque:
+            return
+        log.debug(f"[Servo] movimiento coordinado {movimientos} tiempo={tiempo_segundos}s")
+        self.escritor.escribir(arranque)
+        self.reloj.dormir(tiempo_segundos)
+        self.escritor.escribir(parada)
+        self._notificar(tiempo_segundos, mandos)
+
+    def observar(self, callback):
+        """Registrar `callback(segundos, mandos)` llamado al terminar cada movimiento temporizado"""
+        self.observadores.append(callback)
+
+    def _notificar(self, segundos, mandos):
+        for callback in self.observadores:
+            try:
+                callback(segundos, mandos)
+            except Exception as e:
+                log.warning(f"[Servo] error notificando movimiento: {e}")
+
+    def fijar_velocidades(self, comandos):
+        """Aplicar velocidades sin bloquear (para bucles de control)
+
+        Args:
+            comandos: dict {nombre: (direccion, velocidad)}; direccion 0 aplica el pulso hold
+        """
+        duties = {}
+        for nombre, (direccion, velocidad) in comandos.items():
+            perfil = self.perfiles.get(nombre)
+            if perfil is None:
+                continue
+            duties[perfil.canal] = perfil.duty_hold if direccion == 0 else perfil.duty(direccion, velocidad)
+        if duties:
+            self.escritor.escribir(duties)
 
     def detener_servo(self, nombre):
         """Detener servo específico"""
-        if nombre in self.servos:
-            servo = self.servos[nombre]
-            pulso_hold = servo['pulso_hold']  # Usar pulso hold calibrado
+        if nombre in self.perfiles:
             # Pulso hold calibrado para detener (compensa gravedad)
-            ciclo_trabajo = int(pulso_hold / 20000 * 0xFFFF)
-            self.pca.channels[servo['canal']].duty_cycle = ciclo_trabajo
-            log.info(f"[Servo] {nombre}: detener_servo -> pulso hold {pulso_hold}us aplicado")
+            perfil = self.perfiles[nombre]
+            self.escritor.escribir({perfil.canal: perfil.duty_hold})
+            log.info(f"[Servo] {nombre}: detener_servo -> pulso hold {perfil.pulso_hold}us aplicado")
+
+    def aplicar_pulso_canal(self, canal, pulso_us):
+        """Aplicar un pulso arbitrario (µs) a un canal pasando por el escritor por lotes"""
+        self.escritor.escribir({canal: duty_desde_pulso(pulso_us)})
 
     def set_hold_after_move(self, enabled: bool, offset_us: int = None):
         """Habilitar/deshabilitar la aplicación de pequeño pulso de hold al terminar un movimiento.
@@ -157,20 +221,40 @@ class ControladorServo:
         log.info(f"[Servo] set_hold_after_move={self.hold_after_move} hold_pulse_offset={self.hold_pulse_offset}")
 
     def detener_todos(self):
-        """Detener todos los servos"""
-        for nombre in self.servos:
-            self.detener_servo(nombre)
+        """Detener todos los servos con su pulso hold en una sola ráfaga I2C"""
+        self.escritor.escribir({perfil.canal: perfil.duty_hold for perfil in self.perfiles.values()})
+        log.info("[Servo] detener_todos -> pulsos hold aplicados")
+
+    def apagar_todos(self):
+        """Cortar la señal PWM de todos los canales (ALL_LED, una sola escritura)
+
+        A diferencia de detener_todos, no aplica pulso hold: codo y muñeca
+        quedan sin compensación de gravedad.
+        """
+        self.escritor.apagar_todos()
 
 class ControladorStepper:
     """Controlador para motores stepper"""
 
-    def __init__(self, pin_paso, pin_direccion, pin_habilitar=None, pasos_por_rev=200, micropasos=16):
-        """Inicializar controlador stepper"""
-        self.pin_paso = OutputDevice(pin_paso)
-        self.pin_direccion = OutputDevice(pin_direccion)
-        self.pin_habilitar = OutputDevice(pin_habilitar) if pin_habilitar else None
+    def __init__(self, pin_paso, pin_direccion, pin_habilitar=None, pasos_por_rev=200, micropasos=16,
+                 reloj=None, fabrica_pin=None, telemetria=None):
+        """Inicializar controlador stepper
+
+        Args:
+            reloj: Reloj usado para temporizar los pulsos (RelojReal por defecto)
+            fabrica_pin: Clase/función que crea los pines (gpiozero.OutputDevice por defecto)
+            telemetria: TelemetryRecorder opcional (posición tras cada movimiento)
+        """
+        if fabrica_pin is None:
+            from gpiozero import OutputDevice
+            fabrica_pin = OutputDevice
+        self.reloj = reloj or RELOJ_REAL
+        self.pin_paso = fabrica_pin(pin_paso)
+        self.pin_direccion = fabrica_pin(pin_direccion)
+        self.pin_habilitar = fabrica_pin(pin_habilitar) if pin_habilitar else None
         self.pasos_por_rev = pasos_por_rev * micropasos
         self.posicion_actual = 0
+        self.telemetria = telemetria
 
     def habilitar(self):
         """Habilitar motor stepper"""
@@ -187,12 +271,20 @@ class ControladorStepper:
         
         self.pin_direccion.value = 1 if direccion > 0 else 0
         retardo = 1.0 / velocidad
-        for _ in range(abs(pasos)):
-            self.pin_paso.on()
-            time.sleep(retardo / 2)
-            self.pin_paso.off()
-            time.sleep(retardo / 2)
+        EVENTS.record('stepper', 'move', pasos, direccion, velocidad)
+        inicio = self.reloj.ahora()
+        if self.reloj.simulado:
+            # En simulación no se generan los pulsos uno a uno: solo avanza el reloj
+            self.reloj.dormir(abs(pasos) * retardo)
+        else:
+            for _ in range(abs(pasos)):
+                self.pin_paso.on()
+                self.reloj.dormir(retardo / 2)
+                self.pin_paso.off()
+                self.reloj.dormir(retardo / 2)
         self.posicion_actual += pasos * direccion
+        if self.telemetria is not None:
+            self.telemetria.record_stepper(self.posicion_actual, self.reloj.ahora() - inicio)
 
     def mover_distancia(self, distancia_mm, paso_tuerca=8, direccion=1, velocidad=1000):
         """Mover stepper una distancia específica en mm"""
@@ -202,13 +294,31 @@ class ControladorStepper:
 class ControladorRobotico:
     """Controlador principal del brazo robótico con movimientos temporizados y límites físicos"""
 
-    def __init__(self, habilitar_stepper=True):
+    # Sentido (+1, -1) de cada articulación en limites_fisicos
+    SENTIDOS = {
+        'base': ('derecha', 'izquierda'),
+        'shoulder': ('arriba', 'abajo'),
+        'elbow': ('extender', 'contraer'),
+        'gripper': ('abrir', 'cerrar')
+    }
+
+    # Pasos/s del motor paso a paso a velocidad=1.0 en los movimientos de base
+    PASOS_POR_SEGUNDO_BASE = 1000
+
+    def __init__(self, habilitar_stepper=True, reloj=None, simulado=False, telemetria=None):
         """Inicializar controlador del robot
         
         Args:
             habilitar_stepper: Si es False, no inicializa el motor paso a paso (útil si no está conectado o da error)
+            reloj: Reloj compartido por servos y stepper (RelojReal por defecto)
+            simulado: Si es True, usa PCA9685 y pines simulados en lugar del hardware
+            telemetria: TelemetryRecorder opcional compartido por servos, stepper y bucle de control
         """
-        self.controlador_servo = ControladorServo()
+        self.reloj = reloj or RELOJ_REAL
+        self.simulado = simulado
+        self.telemetria = telemetria
+        self.controlador_servo = ControladorServo(reloj=self.reloj, pca=PCA9685Simulado() if simulado else None,
+                                                  telemetria=telemetria)
         # Configurar servos: hombro (canal 0), codo (1), muñeca (2), pinza (3)
         # Todos los servos son continuos de 360°
         # NO hay servo "base" - el movimiento horizontal es con motor paso a paso
@@ -223,7 +333,9 @@ class ControladorRobotico:
         self.controlador_stepper = None
         if habilitar_stepper:
             try:
-                self.controlador_stepper = ControladorStepper(pin_paso=14, pin_direccion=15, pin_habilitar=None)
+                self.controlador_stepper = ControladorStepper(pin_paso=14, pin_direccion=15, pin_habilitar=None, reloj=self.reloj,
+                                                              fabrica_pin=PinSimulado if simulado else None,
+                                                              telemetria=telemetria)
                 log.info("✅ Motor paso a paso inicializado (GPIO14=STEP, GPIO15=DIR)")
             except Exception as e:
                 log.warning(f"⚠️  No se pudo inicializar motor paso a paso: {e}")
@@ -248,11 +360,49 @@ class ControladorRobotico:
             'gripper': 0.0
         }
 
+        # Bucle de control central (opcional, ver iniciar_bucle)
+        self.bucle = None
+
+    def iniciar_bucle(self, frecuencia_hz=200.0):
+        """Arrancar el bucle de control central que atiende enviar_movimiento()"""
+        if self.bucle is None:
+            self.bucle = BucleControl(self.controlador_servo, frecuencia_hz, reloj=self.reloj)
+        self.bucle.iniciar()
+        return self.bucle
+
+    def enviar_movimiento(self, articulacion, direccion, tiempo_segundos, velocidad=0.5, origen=''):
+        """Encolar un movimiento temporizado en el bucle de control (no bloquea)
+
+        Aplica los mismos límites físicos que mover_*_tiempo. Requiere iniciar_bucle().
+        La base no es un servo: se mueve con el stepper y bloquea hasta terminar.
+        """
+        if articulacion == 'base':
+            return self.mover_base_tiempo(direccion, tiempo_segundos, velocidad)
+        if self.bucle is None:
+            raise RuntimeError("Bucle de control no iniciado (llama a iniciar_bucle)")
+        positivo, negativo = self.SENTIDOS[articulacion]
+        tiempo_limitado = min(tiempo_segundos, self.limites_fisicos[articulacion][positivo if direccion == 1 else negativo])
+        if tiempo_limitado > 0:
+            self.bucle.enviar(articulacion, direccion, tiempo_limitado, velocidad, origen)
+            self.tiempo_acumulado[articulacion] += tiempo_limitado * direccion
+        return tiempo_limitado
+
     def mover_base_tiempo(self, direccion, tiempo_segundos, velocidad=0.5):
-        """Mover base por tiempo con límites físicos (velocidad reducida por defecto)"""
+        """Mover base por tiempo con límites físicos (velocidad reducida por defecto)
+
+        No hay servo de base: el giro lo hace el motor paso a paso a
+        velocidad × PASOS_POR_SEGUNDO_BASE pasos/s. Devuelve el tiempo realmente
+        movido (0 si el stepper no está disponible).
+        """
+        if self.controlador_stepper is None:
+            log.warning("⚠️  Motor paso a paso no disponible - la base no se mueve")
+            return 0.0
+        if direccion not in (-1, 1):
+            return 0.0
         tiempo_limitado = min(tiempo_segundos, self.limites_fisicos['base']['derecha' if direccion == 1 else 'izquierda'])
         if tiempo_limitado > 0:
-            self.controlador_servo.mover_por_tiempo('base', direccion, tiempo_limitado, velocidad)
+            pasos_por_segundo = max(1, round(self.PASOS_POR_SEGUNDO_BASE * velocidad))
+            self.controlador_stepper.mover_pasos(round(pasos_por_segundo * tiempo_limitado), direccion, pasos_por_segundo)
             self.tiempo_acumulado['base'] += tiempo_limitado * direccion
         return tiempo_limitado
 
@@ -350,5 +500,49 @@ class ControladorRobotico:
 
     def cerrar(self):
         """Cerrar controladores y liberar recursos"""
-        self.controlador_stepper.deshabilitar()
+        if self.bucle is not None:
+            self.bucle.detener()
+        if self.controlador_stepper is not None:
+            self.controlador_stepper.deshabilitar()
+        self.controlador_servo.apagar_todos()
         self.controlador_servo.pca.deinit()
+
+
+class RobotController(ControladorRobotico):
+    """Fachada en inglés usada por main.py y web.py
+
+    Traduce la API legacy basada en ángulos (move_base, move_arm, ...) a los
+    métodos de ControladorRobotico. `speed` se interpreta en la escala 1-100
+    de main.py y se convierte al factor 0.0-1.0 de los servos continuos.
+    """
+
+    @staticmethod
+    def _factor_velocidad(speed):
+        return max(0.1, min(1.0, speed / 100.0))
+
+    def move_base(self, angle, speed=5):
+        self.mover_base(angle, self._factor_velocidad(speed))
+
+    def move_shoulder(self, angle, speed=5):
+        self.mover_hombro(angle, self._factor_velocidad(speed))
+
+    def move_elbow(self, angle, speed=5):
+        self.mover_codo(angle, self._factor_velocidad(speed))
+
+    def move_gripper(self, angle, speed=5):
+        self.mover_pinza(angle, self._factor_velocidad(speed))
+
+    def move_arm(self, distance, direction=1, speed=1000):
+        self.mover_brazo(distance, direccion=direction, velocidad=speed)
+
+    def up_action(self, distance=50):
+        self.mover_brazo(distance, direccion=1)
+
+    def pick_action(self):
+        self.accion_recoger()
+
+    def place_action(self):
+        self.accion_soltar()
+
+    def close(self):
+        self.cerrar()
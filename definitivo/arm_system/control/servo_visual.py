@@ -0,0 +1,158 @@
+"""
+Servo visual: centrar un objeto en la imagen moviendo las articulaciones.
+
+En lugar de convertir el error en píxeles en un movimiento fijo y esperar un
+cooldown, cada detección alimenta un PI por eje sobre el error angular
+(atan(error_px / focal)). El frame refleja la pose del brazo en el instante
+de captura, no la actual: los movimientos mandados desde ese instante (los
+ya ejecutados y lo que queda del activo) se descuentan del error antes del
+PI, así que el retardo de cámara + inferencia no provoca sobreoscilación y
+cada tick puede corregir el error completo. Las consignas se envían al
+BucleControl sin bloquear; una consigna nueva sustituye a la activa.
+"""
+import math
+import logging as log
+from collections import deque
+
+try:
+    from .reloj import RELOJ_REAL
+    from .lazo_cerrado import GRADOS_POR_SEGUNDO
+except ImportError:
+    from control.reloj import RELOJ_REAL
+    from control.lazo_cerrado import GRADOS_POR_SEGUNDO
+
+
+class EjeServoVisual:
+    """PI de un eje de imagen (x o y) sobre una articulación, con compensación de retardo"""
+
+    def __init__(self, articulacion: str, signo: int = 1, kp: float = 0.8, ki: float = 0.2,
+                 velocidad: float = 0.5, duracion_max: float = 1.0, tolerancia_px: float = 20.0,
+                 grados_por_segundo: float = None, integral_max: float = 5.0):
+        """
+        Args:
+            articulacion: articulación que mueve este eje (enviar_movimiento)
+            signo: dirección de la articulación que reduce un error positivo
+            kp: fracción del error compensado corregida en cada tick
+            ki: ganancia integral (1/s) para errores sostenidos (p. ej. objeto que se mueve)
+            velocidad: velocidad de las consignas (0.0 - 1.0)
+            duracion_max: duración máxima de una consigna; cada detección la recalcula y sustituye
+            tolerancia_px: error por debajo del cual el eje está centrado y se detiene
+            grados_por_segundo: velocidad angular a velocidad=1.0 (por defecto GRADOS_POR_SEGUNDO)
+            integral_max: saturación del término integral (grados·s)
+        """
+        self.articulacion = articulacion
+        self.signo = signo
+        self.kp = kp
+        self.ki = ki
+        self.velocidad = velocidad
+        self.duracion_max = duracion_max
+        self.tolerancia_px = tolerancia_px
+        self.grados_por_segundo = grados_por_segundo or GRADOS_POR_SEGUNDO.get(articulacion, 60.0)
+        self.integral_max = integral_max
+        self.integral = 0.0
+        self._ultimo = None
+        # (inicio, fin, grados/s de corrección) de las consignas enviadas
+        self._historial = deque(maxlen=32)
+
+    @property
+    def tasa(self) -> float:
+        """grados/s de corrección de una consigna"""
+        return self.grados_por_segundo * self.velocidad
+
+    def corregido_desde(self, instante: float) -> float:
+        """grados de corrección mandados desde `instante` (incluye lo que falta de la consigna activa)"""
+        total = 0.0
+        for inicio, fin, tasa in self._historial:
+            if fin > instante:
+                total += tasa * (fin - max(inicio, instante))
+        return total
+
+    def activo(self, ahora: float) -> bool:
+        return bool(self._historial) and self._historial[-1][1] > ahora
+
+    def actualizar(self, error_px: float, focal_px: float, instante_frame: float, ahora: float):
+        """
+        Returns:
+            (direccion, duracion) de la consigna a enviar, None si no hay que mandar nada
+        """
+        error = math.degrees(math.atan2(error_px, focal_px)) - self.corregido_desde(instante_frame)
+        tolerancia = math.degrees(math.atan2(self.tolerancia_px, focal_px))
+        dt = 0.0 if self._ultimo is None else max(0.0, ahora - self._ultimo)
+        self._ultimo = ahora
+
+        if abs(error) <= tolerancia:
+            # centrado contando lo que ya está en marcha (si sobra, el error sale negativo y se corrige)
+            return None
+
+        self.integral = max(-self.integral_max, min(self.integral_max, self.integral + error * dt))
+        mando = self.kp * error + self.ki * self.integral
+        duracion = min(abs(mando) / self.tasa, self.duracion_max)
+        self._truncar(ahora)
+        self._historial.append((ahora, ahora + duracion, math.copysign(self.tasa, mando)))
+        return (self.signo if mando > 0 else -self.signo), duracion
+
+    def _truncar(self, ahora: float):
+        """la consigna nueva sustituye a la activa: lo que quedaba ya no se ejecuta"""
+        if self._historial and self._historial[-1][1] > ahora:
+            inicio, _, tasa = self._historial.pop()
+            self._historial.append((inicio, ahora, tasa))
+
+    def reiniciar(self):
+        self.integral = 0.0
+        self._ultimo = None
+        self._historial.clear()
+
+
+class ServoVisual:
+    """Centrado de un objetivo con un EjeServoVisual por eje de imagen y consignas no bloqueantes"""
+
+    def __init__(self, robot, ejes: dict, focal_px: float, centro: tuple, ticks_centrado: int = 2,
+                 reloj=None, origen: str = 'vision'):
+        """
+        Args:
+            robot: ControladorRobotico con el bucle iniciado (enviar_movimiento)
+            ejes: {'x': EjeServoVisual, 'y': EjeServoVisual}, se puede omitir un eje
+            focal_px: focal de la cámara en píxeles de los frames que se pasan
+            centro: (x, y) en píxeles donde debe quedar el objetivo
+            ticks_centrado: detecciones seguidas centradas (y sin movimiento) para dar el objetivo por centrado
+            reloj: reloj de los instantes de frame (RELOJ_REAL: time.monotonic)
+        """
+        self.robot = robot
+        self.ejes = ejes
+        self.focal_px = focal_px
+        self.centro = centro
+        self.ticks_centrado = ticks_centrado
+        self.reloj = reloj or RELOJ_REAL
+        self.origen = origen
+        self.ticks = 0
+
+    @property
+    def centrado(self) -> bool:
+        return self.ticks >= self.ticks_centrado
+
+    def actualizar(self, objetivo_px: tuple, instante_frame: float) -> bool:
+        """
+        Una detección del objetivo en un frame capturado en `instante_frame` (reloj del servo visual).
+        Envía las consignas necesarias y devuelve True cuando el objetivo está centrado.
+        """
+        ahora = self.reloj.ahora()
+        errores = {'x': objetivo_px[0] - self.centro[0], 'y': objetivo_px[1] - self.centro[1]}
+        quieto = True
+        for nombre, eje in self.ejes.items():
+            consigna = eje.actualizar(errores[nombre], self.focal_px, instante_frame, ahora)
+            if consigna is not None:
+                direccion, duracion = consigna
+                self.robot.enviar_movimiento(eje.articulacion, direccion, duracion, velocidad=eje.velocidad,
+                                             origen=self.origen)
+                log.debug(f"[ServoVisual] {nombre}: error={errores[nombre]:.0f}px -> {eje.articulacion} "
+                          f"dir={direccion} t={duracion:.3f}s")
+            quieto = quieto and consigna is None and not eje.activo(ahora) \
+                and abs(errores[nombre]) <= eje.tolerancia_px
+        self.ticks = self.ticks + 1 if quieto else 0
+        return self.centrado
+
+    def reiniciar(self):
+        """Objetivo perdido o cambiado: olvidar integrales e historial"""
+        self.ticks = 0
+        for eje in self.ejes.values():
+            eje.reiniciar()
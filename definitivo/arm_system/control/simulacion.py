@@ -0,0 +1,95 @@
+"""
+Backends simulados del hardware del brazo (PCA9685 y pines GPIO).
+
+Se usan junto con RelojVirtual para ejecutar el controlador sin Raspberry Pi,
+por ejemplo para medir tiempos de ciclo o probar ajustes de velocidad.
+"""
+
+LED0_ON_L = 0x06
+ALL_LED_ON_L = 0xFA
+
+
+def _duty_desde_registros(on, off):
+    if on & 0x1000:
+        return 0xFFFF
+    if off & 0x1000:
+        return 0
+    return off << 4
+
+
+class CanalSimulado:
+    """Canal PWM del PCA9685 simulado: solo guarda el último duty cycle"""
+
+    def __init__(self, pca, indice):
+        self._pca = pca
+        self.indice = indice
+        self._duty_cycle = 0
+
+    @property
+    def duty_cycle(self):
+        return self._duty_cycle
+
+    @duty_cycle.setter
+    def duty_cycle(self, valor):
+        self._duty_cycle = int(valor)
+        self._pca.escrituras += 1
+
+
+class DispositivoI2CSimulado:
+    """Sustituto de I2CDevice: decodifica ráfagas con auto-incremento a los canales"""
+
+    def __init__(self, pca):
+        self._pca = pca
+        self.transacciones = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def write(self, buf, start=0, end=None):
+        datos = bytes(buf[start:end])
+        registro, carga = datos[0], datos[1:]
+        self.transacciones += 1
+        grupos = [carga[i:i + 4] for i in range(0, len(carga) - 3, 4)]
+        if registro == ALL_LED_ON_L:
+            on, off = grupos[0][0] | grupos[0][1] << 8, grupos[0][2] | grupos[0][3] << 8
+            for canal in self._pca.channels:
+                canal._duty_cycle = _duty_desde_registros(on, off)
+            return
+        primero = (registro - LED0_ON_L) // 4
+        for i, grupo in enumerate(grupos):
+            on, off = grupo[0] | grupo[1] << 8, grupo[2] | grupo[3] << 8
+            self._pca.channels[primero + i]._duty_cycle = _duty_desde_registros(on, off)
+
+
+class PCA9685Simulado:
+    """Sustituto de adafruit_pca9685.PCA9685 con la misma interfaz mínima"""
+
+    def __init__(self, canales=16, frecuencia=50):
+        self.channels = [CanalSimulado(self, i) for i in range(canales)]
+        self.i2c_device = DispositivoI2CSimulado(self)
+        self.frequency = frecuencia
+        self.escrituras = 0
+
+    def deinit(self):
+        for canal in self.channels:
+            canal._duty_cycle = 0
+
+
+class PinSimulado:
+    """Sustituto de gpiozero.OutputDevice"""
+
+    def __init__(self, pin=None):
+        self.pin = pin
+        self.value = 0
+        self.pulsos = 0
+
+    def on(self):
+        if not self.value:
+            self.pulsos += 1
+        self.value = 1
+
+    def off(self):
+        self.value = 0
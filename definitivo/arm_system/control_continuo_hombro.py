@@ -7,6 +7,7 @@ import time
 import board
 import busio
 from adafruit_pca9685 import PCA9685
+from control.perfil_servo import PerfilServo
 import sys
 import tty
 import termios
@@ -17,6 +18,9 @@ PULSO_NEUTRAL = 1700
 PULSO_SUBIR = 1200
 PULSO_BAJAR = 2200
 
+# Duty cycles precalculados (evita recalcular en el bucle a 50Hz)
+PERFIL_HOMBRO = PerfilServo('hombro', CANAL_HOMBRO, PULSO_NEUTRAL, None, {'subir': PULSO_SUBIR, 'bajar': PULSO_BAJAR})
+
 class ControlTeclado:
     def __init__(self):
         self.fd = sys.stdin.fileno()
@@ -35,11 +39,6 @@ class ControlTeclado:
             return sys.stdin.read(1)
         return None
 
-def aplicar_pulso(pca, canal, pulso_us):
-    """Aplicar pulso específico"""
-    duty_cycle = int(pulso_us / 20000 * 0xFFFF)
-    pca.channels[canal].duty_cycle = duty_cycle
-
 def main():
     print("="*60)
     print("🎮 CONTROL CONTINUO HOMBRO")
@@ -60,7 +59,7 @@ def main():
     input()
     
     # Detener al inicio
-    aplicar_pulso(pca, CANAL_HOMBRO, PULSO_NEUTRAL)
+    PERFIL_HOMBRO.aplicar(pca, 'neutral')
     
     print("\n🟢 CONTROL ACTIVO - Mantén W/S presionado\n")
     
@@ -77,32 +76,32 @@ def main():
                     if tecla == 'w':
                         if estado_actual != 'subir':
                             print("\r⬆️  SUBIENDO...    ", end='', flush=True)
-                            aplicar_pulso(pca, CANAL_HOMBRO, PULSO_SUBIR)
+                            PERFIL_HOMBRO.aplicar(pca, 'subir')
                             estado_actual = 'subir'
                     
                     elif tecla == 's':
                         if estado_actual != 'bajar':
                             print("\r⬇️  BAJANDO...     ", end='', flush=True)
-                            aplicar_pulso(pca, CANAL_HOMBRO, PULSO_BAJAR)
+                            PERFIL_HOMBRO.aplicar(pca, 'bajar')
                             estado_actual = 'bajar'
                     
                     elif tecla == 'q':
                         print("\n\n👋 Saliendo...")
-                        aplicar_pulso(pca, CANAL_HOMBRO, PULSO_NEUTRAL)
+                        PERFIL_HOMBRO.aplicar(pca, 'neutral')
                         break
                 
                 else:
                     # No hay tecla presionada - DETENER
                     if estado_actual != 'detenido':
                         print(f"\r⏹️  DETENIDO        ", end='', flush=True)
-                        aplicar_pulso(pca, CANAL_HOMBRO, PULSO_NEUTRAL)
+                        PERFIL_HOMBRO.aplicar(pca, 'neutral')
                         estado_actual = 'detenido'
                 
                 time.sleep(0.02)  # 50Hz actualización
     
     except KeyboardInterrupt:
         print("\n\n⚠️  Interrupción")
-        aplicar_pulso(pca, CANAL_HOMBRO, PULSO_NEUTRAL)
+        PERFIL_HOMBRO.aplicar(pca, 'neutral')
 
 if __name__ == '__main__':
     main()
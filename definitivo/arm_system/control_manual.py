@@ -76,9 +76,6 @@ canal_codo = servos['elbow']['canal']
 canal_muneca = servos['wrist']['canal']
 canal_pinza = servos['gripper']['canal']
 
-# Obtener objeto PCA9685
-pca = robot.controlador_servo.pca
-
 # Pulsos de movimiento
 PULSO_RAPIDO = 500  # Offset para movimiento rápido
 
@@ -96,9 +93,8 @@ teclas_activas = set()
 print("\n🟢 CONTROL ACTIVO - Mantén presionada la tecla para movimiento continuo\n")
 
 def aplicar_pulso_directo(canal, pulso_us):
-    """Aplica un pulso directamente al canal PCA9685"""
-    duty_cycle = int(pulso_us / 20000.0 * 0xFFFF)
-    pca.channels[canal].duty_cycle = duty_cycle
+    """Aplica un pulso al canal PCA9685 (vía escritor por lotes, mantiene la caché sombra)"""
+    robot.controlador_servo.aplicar_pulso_canal(canal, pulso_us)
 
 try:
     with ControlTeclado() as control:
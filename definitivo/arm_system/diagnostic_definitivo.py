@@ -6,6 +6,7 @@ import time
 import board
 import busio
 from adafruit_pca9685 import PCA9685
+from control.perfil_servo import duty_desde_pulso
 
 print("="*60)
 print("🔍 DIAGNÓSTICO DEFINITIVO - TIPO DE SERVO")
@@ -24,16 +25,9 @@ SERVOS = {
     'pinza': 3
 }
 
-def pulso_a_duty_cycle(pulso_us):
-    """Convertir microsegundos a duty cycle"""
-    periodo_ms = 1000.0 / 50
-    duty = int((pulso_us / 1000.0) / periodo_ms * 65535)
-    return duty
-
 def aplicar_pulso(canal, pulso_us):
     """Aplicar pulso a canal"""
-    duty = pulso_a_duty_cycle(pulso_us)
-    pca.channels[canal].duty_cycle = duty
+    pca.channels[canal].duty_cycle = duty_desde_pulso(pulso_us)
 
 # Seleccionar servo
 print("\nSelecciona un servo para diagnosticar:")
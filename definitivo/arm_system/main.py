@@ -1,29 +1,56 @@
-import time
 import logging as log
+import numpy as np
+from functools import cached_property
 from control.robot_controller import RobotController
-from communication.serial_manager import CommunicationManager
+from control.reloj import RELOJ_REAL
+from control.lazo_cerrado import FusionArticulaciones, ControladorLazoCerrado
+from telemetry.recorder import TelemetryRecorder
+from telemetry.event_log import EVENTS
+from telemetry.startup import STARTUP
+from preloader import Preloader
 
 log.basicConfig(level=log.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
 class Robot:
-    def __init__(self):
-        
-        self.robot_controller = RobotController()
+    def __init__(self, reloj=None, simulado: bool = False, preload: bool = False):
+        """
+        :param reloj: clock shared by the controller and the orchestration (RelojReal by default)
+        :param simulado: use simulated servo/stepper backends and skip serial and camera
+        :param preload: connect serial and load camera + detector in background threads while the
+                        menu is shown, instead of serial here and vision on the first scan
+        """
+        self.reloj = reloj or RELOJ_REAL
+        self.simulado = simulado
+        # commanded pulses, moves, stepper position and VEX angles (ring buffer)
+        self.telemetry = TelemetryRecorder(reloj=self.reloj)
+        # servo/stepper hardware (I2C bus, GPIO) is opened on the first move, see robot_controller
         self.serial_manager = None  # Inicializar como None
 
-        # Intentar inicializar la conexión serial (opcional)
-        try:
-            self.serial_manager = CommunicationManager()
-            if not self.serial_manager.connect():
-                log.warning("No se pudo conectar con el puerto serial - modo sin hardware")
-                self.serial_manager = None
-        except Exception as e:
-            log.warning(f"Error inicializando comunicación serial: {e} - modo sin hardware")
-            self.serial_manager = None
+        # stepper speed (steps/s) used for arm moves in pick & place
+        self.arm_speed = 1000
+
+        # joint state estimate (motion model + VEX) and optional closed loop
+        self.joint_estimator = FusionArticulaciones({'base': 0, 'shoulder': 90, 'elbow': 90, 'wrist': 90,
+                                                      'gripper': 0})
+        self.closed_loop = None
 
         # register scan data
         self.scan_results = []
+        # camera intrinsics/extrinsics (perception/vision/camera/calibration.json), loaded on the first scan
+        self.camera_calibration = None
+        # client of the vision daemon (perception/vision/service) when one is running
+        self.vision = None
+        # (camera, detector) used by scans, kept between scans
+        self._scan_pair = None
+
+        # background loading of serial link and vision (opt-in), see _serial() and _scan_components()
+        self.preloader = Preloader() if preload and not simulado else None
+        if self.preloader is not None:
+            self.preloader.submit('serial', self._connect_serial)
+            self.preloader.submit('vision', self._load_scan_components, warmup=True)
+        elif not simulado:
+            self._connect_serial()
 
         # zones
         self.placement_zones = {
@@ -32,12 +59,47 @@ class Robot:
             'bottle': {'angle': 45, 'distance': 200},
             'default': {'angle': 270, 'distance': 200},
         }
+
+    @cached_property
+    def robot_controller(self) -> RobotController:
+        """servo and stepper controller, created (I2C bus and GPIO opened) on first use"""
+        with STARTUP.phase('robot controller'):
+            controller = RobotController(reloj=self.reloj, simulado=self.simulado, telemetria=self.telemetry)
+        controller.controlador_servo.observar(self._on_servo_move)
+        return controller
+
+    def _close_robot_controller(self):
+        if 'robot_controller' in self.__dict__:
+            self.robot_controller.close()
+
+    def _connect_serial(self):
+        # Intentar inicializar la conexión serial (opcional)
+        try:
+            from communication.serial_manager import CommunicationManager
+            serial_manager = CommunicationManager()
+            if not serial_manager.connect():
+                log.warning("No se pudo conectar con el puerto serial - modo sin hardware")
+                return None
+            serial_manager.register_callback('current_angles', self._on_current_angles)
+            self.serial_manager = serial_manager
+        except Exception as e:
+            log.warning(f"Error inicializando comunicación serial: {e} - modo sin hardware")
+        return self.serial_manager
+
+    def _serial(self):
+        """serial manager (None without hardware), waiting for a background connection still in progress"""
+        if self.preloader is not None and self.preloader.has('serial'):
+            self.preloader.take('serial')
+        return self.serial_manager
         
     # --- MENU ---
     def main_menu_loop(self):
         running = True
+        STARTUP.ready()
         while running:
             print("\n=== Main menu ===")
+            if self.preloader is not None and self.preloader.status():
+                print(" loading: " + ", ".join(f"{name} {state}" for name, state in self.preloader.status().items()))
             print(" [c] check service")
             print(" [s] safety service")
             print(" [n] scan service")
@@ -48,13 +110,13 @@ class Robot:
             user_input = input("input command: ").strip().lower()
 
             if user_input == 'c':
-                if self.serial_manager:
+                if self._serial():
                     self.serial_manager.send_message('check_service', {})
                 else:
                     log.info("Modo sin hardware - check service simulado")
 
             elif user_input == 's':
-                if self.serial_manager:
+                if self._serial():
                     self.serial_manager.send_message('safety_service', {})
                 else:
                     log.info("Modo sin hardware - safety service simulado")
@@ -74,20 +136,25 @@ class Robot:
             else:
                 print("command unrecognized")
 
-            time.sleep(0.5)
+            self.reloj.dormir(0.5)
             
     # --- SCAN ---
     def handle_scan_command(self):
         """scan command"""
 
-        from perception.vision.camera.main import CameraManager
-        from perception.vision.detection.main import DetectionModel
+        if self.simulado:
+            self.scan_results = []
+            self._simulate_detection()
+            return
+
+        from perception.vision.camera.decode import reduction_for
+        from perception.vision.camera.calibration import load_calibration
+        from perception.vision.range_estimator import RangeEstimator
 
         self.scan_results = []
 
         try:
-            camera = CameraManager()
-            detector = DetectionModel()
+            camera, detector = self._scan_components()
         except Exception as e:
             log.error(f"Error inicializando componentes de visión: {e}")
             # Simular detección para modo demo
@@ -96,38 +163,58 @@ class Robot:
 
         log.info("scanning in progress...")
 
-        # Capture image
+        # Capture image (in memory; the copy on disk is written in the background).
+        # Decoded at the detector's input size: the full-resolution JPEG is only saved
         try:
-            image_path = camera.capture_image()
-            if not image_path:
+            image, image_path = camera.capture_image(
+                reduction=reduction_for(camera.width, camera.height, detector.imgsz))
+            if image is None:
                 log.warning("failed to capture image - usando modo simulado")
+                self._close_vision()
                 self._simulate_detection()
                 return
         except Exception as e:
             log.warning(f"Error capturando imagen: {e} - usando modo simulado")
+            self._close_vision()
             self._simulate_detection()
             return
 
-        # Load image
-        import cv2
-        image = cv2.imread(image_path)
+        if self.camera_calibration is None:
+            self.camera_calibration = load_calibration()
+        calibration = self.camera_calibration
+        # without extrinsics the distance comes from the box size and the class size prior
+        ranges = (RangeEstimator.from_calibration(calibration) if calibration is not None
+                  else RangeEstimator(image_size=(camera.width, camera.height)))
+        if calibration is not None and calibration.has_extrinsics:
+            # lookup tables are built once per resolution and cached by the calibration
+            calibration = calibration.for_size(image.shape[1], image.shape[0])
+        else:
+            calibration = None
+            log.warning("camera not calibrated: rough angle estimate, distance from box size")
 
         # Detect objects
         results, names = detector.inference(image)
 
         for result in results:
             boxes = result.boxes
-            for box in boxes:
+            all_xyxy = boxes.xyxy.cpu().numpy()
+            box_ranges, _ = ranges.estimate(all_xyxy, [names[int(c)] for c in boxes.cls.cpu().numpy()],
+                                            (image.shape[1], image.shape[0]))
+            for box, xyxy, box_range in zip(boxes, all_xyxy, box_ranges):
                 cls = int(box.cls[0])
                 conf = float(box.conf[0])
-                xyxy = box.xyxy[0].cpu().numpy()
                 x1, y1, x2, y2 = xyxy
                 center_x = (x1 + x2) / 2
                 center_y = (y1 + y2) / 2
 
-                # Simulate angle and distance based on position
-                angle = (center_x / image.shape[1]) * 180  # rough estimate
-                distance = 200  # fixed for now
+                # scans are taken from the scan pose the extrinsics were calibrated at
+                target = calibration.box_to_target(xyxy) if calibration is not None else None
+                if target is not None:
+                    angle, distance = target['angle'], target['distance']
+                else:
+                    angle = (center_x / image.shape[1]) * 180  # rough estimate
+                    # class without size prior: fixed distance
+                    distance = float(box_range) if np.isfinite(box_range) else 200
 
                 data = {
                     'class': names[cls],
@@ -140,12 +227,75 @@ class Robot:
 
         self.process_scan_results()
         
+    def _scan_components(self):
+        """(camera, detector): the preloaded ones (waiting if still loading), else loaded now"""
+        if self._scan_pair is None:
+            if self.preloader is not None and self.preloader.has('vision'):
+                self._scan_pair = self.preloader.take('vision')
+            else:
+                self._scan_pair = self._load_scan_components()
+        return self._scan_pair
+
+    def _load_scan_components(self, warmup: bool = False):
+        """
+        camera and detector of the vision daemon when it is running, else local ones (YOLO load)
+
+        :param warmup: run one inference on a blank frame, so the first scan does not pay the
+                       first-inference setup either (used when preloading)
+        """
+        from perception.vision.camera.main import CameraManager
+        from perception.vision.camera.decode import reduction_for
+        from perception.vision.camera.calibration import load_calibration
+        from perception.vision.detection.main import DetectionModel
+        from perception.vision.service.client import connect_vision
+
+        if self.camera_calibration is None:
+            self.camera_calibration = load_calibration()
+        if self.vision is None:
+            self.vision = connect_vision()
+        if self.vision is not None:
+            # the daemon owns camera and model: the snapshot already carries its detections
+            from perception.vision.service.adapters import ServiceCamera, ServiceDetectionModel
+            camera = ServiceCamera(self.vision)
+            return camera, ServiceDetectionModel(camera)
+
+        with STARTUP.phase('camera'):
+            camera = CameraManager()
+        with STARTUP.phase('detection model'):
+            detector = DetectionModel()
+        if warmup:
+            with STARTUP.phase('first inference'):
+                reduction = reduction_for(camera.width, camera.height, detector.imgsz)
+                blank = np.zeros((-(-camera.height // reduction), -(-camera.width // reduction), 3), dtype=np.uint8)
+                for _ in detector.inference(blank)[0]:
+                    pass
+        return camera, detector
+
+    def _close_vision(self):
+        """drop the daemon connection and the scan camera/detector (they are reloaded on the next scan)"""
+        self._scan_pair = None
+        if self.vision is not None:
+            self.vision.close()
+            self.vision = None
+
+    def _on_servo_move(self, seconds: float, commands: dict):
+        """timed servo moves (open loop) advance the joint estimate with the commanded speeds"""
+        signs = self.closed_loop.signos if self.closed_loop is not None else {}
+        self.joint_estimator.predecir(seconds, {joint: command * signs.get(joint, 1)
+                                                for joint, command in commands.items()})
+
+    def _on_current_angles(self, angles: dict):
+        """VEX `current_angles`: keep them in telemetry and correct the joint estimate"""
+        self.telemetry.record_angles(angles)
+        self.joint_estimator.actualizar_vex(angles)
+
     def _scan_callback(self, data):
         if data.get('class'):
             self._update_object_registry(data)
             
     def _update_object_registry(self, data: dict):
         """update object registry"""
+        EVENTS.record('vision', 'detection', data)
         try:
             self.scan_results.append({
                 'position': {
@@ -205,6 +355,7 @@ class Robot:
         print(" [g<angle>] gripper angle (ej: g0 abrir, g90 cerrar)")
         print(" [a<mm>] arm up/down (ej: a50 subir, a-50 bajar)")
         print(" [h] home position")
+        print(" [l] toggle closed loop control")
         print(" [q] back to main menu")
 
         while True:
@@ -213,6 +364,11 @@ class Robot:
                 break
             elif cmd == 'h':
                 self.move_to_home()
+            elif cmd == 'l':
+                if self.closed_loop is not None and self.closed_loop.activo:
+                    self.disable_closed_loop()
+                else:
+                    self.enable_closed_loop()
             elif cmd.startswith(('b', 's', 'e', 'g', 'a')):
                 self.parse_manual_command(cmd)
             else:
@@ -228,7 +384,9 @@ class Robot:
                 angle = int(cmd[1:])
 
                 log.info(f"Moviendo {joint} a {angle}°")
-                if joint == 'base':
+                if self.closed_loop is not None and self.closed_loop.activo and joint != 'base':
+                    self.closed_loop.mover_a(joint, angle)
+                elif joint == 'base':
                     self.robot_controller.move_base(angle, speed=10)  # slower for manual
                 elif joint == 'shoulder':
                     self.robot_controller.move_shoulder(angle, speed=10)
@@ -253,11 +411,11 @@ class Robot:
         """Move to home position"""
         log.info("Moviendo a posición home...")
         self.robot_controller.move_base(90, speed=5)
-        time.sleep(0.5)
+        self.reloj.dormir(0.5)
         self.robot_controller.move_shoulder(90, speed=5)
-        time.sleep(0.5)
+        self.reloj.dormir(0.5)
         self.robot_controller.move_elbow(90, speed=5)
-        time.sleep(0.5)
+        self.reloj.dormir(0.5)
         self.robot_controller.move_gripper(0, speed=5)  # open
         log.info("Posición home alcanzada")
 
@@ -362,8 +520,21 @@ class Robot:
             
     def get_current_angles(self) -> dict:
         """get current angles (estimated)"""
-        # Since no encoders, return default or last known
-        return {'base': 0, 'shoulder': 90, 'elbow': 90, 'gripper': 0}
+        # no encoders: fused estimate from the motion model and the VEX readings
+        return self.joint_estimator.angulos()
+
+    def enable_closed_loop(self, **kwargs):
+        """start the fixed-rate closed loop; angle commands then drive servos to the estimated target"""
+        if self.closed_loop is None:
+            self.closed_loop = ControladorLazoCerrado(self.robot_controller.controlador_servo,
+                                                      self.joint_estimator, reloj=self.reloj, **kwargs)
+        self.closed_loop.iniciar()
+        log.info("closed loop control enabled")
+
+    def disable_closed_loop(self):
+        if self.closed_loop is not None:
+            self.closed_loop.detener()
+            log.info("closed loop control disabled")
         
     def execute_movement(self, message_type: str, movement_sequence: list):
         """execute movements on arm"""
@@ -373,6 +544,7 @@ class Robot:
             try:
                 joint = move['joint']
                 log.info(f"movement: {joint}")
+                EVENTS.record('robot', 'phase', dict(move, service=message_type, state='start'))
 
                 # execute movement - ahora siempre intenta usar hardware directo
                 if joint == 'base':
@@ -382,16 +554,16 @@ class Robot:
                     if 'action' in move:
                         if move['action'] == 'pick':
                             log.info(f"  HARDWARE: Brazo -> bajando {move['distance']}mm para recoger")
-                            self.robot_controller.move_arm(move['distance'], direction=-1)  # down
+                            self.robot_controller.move_arm(move['distance'], direction=-1, speed=self.arm_speed)  # down
                         elif move['action'] == 'up':
                             log.info(f"  HARDWARE: Brazo -> subiendo {move.get('distance', 50)}mm")
                             self.robot_controller.up_action(move.get('distance', 50))
                         elif move['action'] == 'place':
                             log.info(f"  HARDWARE: Brazo -> bajando {move['distance']}mm para colocar")
-                            self.robot_controller.move_arm(move['distance'], direction=-1)  # down
+                            self.robot_controller.move_arm(move['distance'], direction=-1, speed=self.arm_speed)  # down
                     else:
                         log.info(f"  HARDWARE: Brazo -> movimiento a distancia {move['distance']}mm")
-                        self.robot_controller.move_arm(move['distance'], direction=1)
+                        self.robot_controller.move_arm(move['distance'], direction=1, speed=self.arm_speed)
                 elif joint == 'gripper':
                     if move['action'] == 'close':
                         log.info(f"  HARDWARE: Pinza -> cerrando")
@@ -402,9 +574,11 @@ class Robot:
 
                 # log
                 log.info(f"-> ¡Movement {joint} completed!")
+                EVENTS.record('robot', 'phase', dict(move, service=message_type, state='completed'))
 
             except Exception as e:
                 log.error(f'error in movement: {str(e)}')
+                EVENTS.record('robot', 'phase', dict(move, service=message_type, state='error', error=str(e)))
                 self.handle_movement_failure()
                 raise
             
@@ -434,11 +608,23 @@ class Robot:
             log.info("Programa interrumpido por el usuario.")
         finally:
             log.info("closing robot controller.")
-            self.robot_controller.close()
-            if self.serial_manager:
+            self.disable_closed_loop()
+            self._close_robot_controller()
+            if self._serial():
                 self.serial_manager.close()
+            self._close_vision()
+            if STARTUP.verbose:
+                STARTUP.report()
 
 
 if __name__ == '__main__':
-    robot = Robot()
+    import os
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Robot arm main menu")
+    parser.add_argument('--preload', action='store_true',
+                        default=os.environ.get('ARM_PRELOAD', '0').lower() in ('1', 'true', 'yes'),
+                        help="connect serial and load camera + detector in the background while the menu is shown")
+    args = parser.parse_args()
+    robot = Robot(preload=args.preload)
     robot.run()
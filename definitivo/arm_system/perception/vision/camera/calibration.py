@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Camera-to-arm calibration: intrinsics, lens distortion and the camera pose
+at the scan position, used to turn detection boxes into arm-frame
+millimetres (table plane) for the pick sequence.
+
+The arm frame has its origin on the base axis at table height, x pointing
+where the base faces, y to the left and z up. The extrinsics are those of
+the camera on the gripper with the arm in the scan pose; a target's base
+angle is the capture base angle minus its bearing, the same direction as
+the old image-column estimate (left of the image = smaller angle).
+
+Calibrating (from arm_system/, chessboard with 9x6 inner corners, 25 mm squares):
+    python -m perception.vision.camera.calibration intrinsics perception/vision/camera/objects_images/*.png
+    python -m perception.vision.camera.calibration extrinsics board.jpg --board-origin 150 -100
+"""
+import os
+import json
+import glob
+import argparse
+import logging as log
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+CALIBRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calibration.json')
+# pixel spacing of the precomputed point-undistortion table
+TABLE_STEP = 8
+# base angle of the scan pose (move_to_home), where the extrinsics are calibrated
+SCAN_BASE_ANGLE = 90.0
+
+
+class CameraCalibration:
+    """
+    Pinhole model + distortion + camera pose for one capture resolution.
+
+    Only box corners are undistorted, through a lookup table of normalised
+    coordinates computed once per resolution, so no frame is remapped on the
+    detection path. The full-frame cv2.initUndistortRectifyMap maps are also
+    built once, lazily, for undistort_frame() (calibration checks, display).
+    """
+
+    def __init__(self, camera_matrix, dist_coeffs, image_size: Tuple[int, int],
+                 rotation=None, translation=None, table_z: float = 0.0):
+        """
+        :param camera_matrix: 3x3 intrinsics for `image_size`
+        :param dist_coeffs: OpenCV distortion coefficients (k1, k2, p1, p2[, k3...])
+        :param image_size: (width, height) the intrinsics were calibrated at
+        :param rotation: 3x3 camera-to-arm rotation at the scan pose (None: not calibrated yet)
+        :param translation: camera centre in the arm frame, mm
+        :param table_z: height of the surface objects stand on, mm in the arm frame
+        """
+        self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64).reshape(3, 3)
+        self.dist_coeffs = np.asarray(dist_coeffs, dtype=np.float64).ravel()
+        self.image_size = (int(image_size[0]), int(image_size[1]))
+        self.rotation = None if rotation is None else np.asarray(rotation, dtype=np.float64).reshape(3, 3)
+        self.translation = None if translation is None else np.asarray(translation, dtype=np.float64).ravel()
+        self.table_z = float(table_z)
+        self._table = None
+        self._maps = None
+        self._scaled: Dict[Tuple[int, int], 'CameraCalibration'] = {}
+
+    # --- persistence ---
+    @classmethod
+    def load(cls, path: str = CALIBRATION_PATH) -> 'CameraCalibration':
+        with open(path) as f:
+            data = json.load(f)
+        extrinsics = data.get('extrinsics') or {}
+        return cls(data['camera_matrix'], data['dist_coeffs'], data['image_size'],
+                   extrinsics.get('rotation'), extrinsics.get('translation_mm'), extrinsics.get('table_z_mm', 0.0))
+
+    def save(self, path: str = CALIBRATION_PATH):
+        data = {
+            'image_size': list(self.image_size),
+            'camera_matrix': self.camera_matrix.tolist(),
+            'dist_coeffs': self.dist_coeffs.tolist(),
+            'extrinsics': None if self.rotation is None else {
+                'rotation': self.rotation.tolist(),
+                'translation_mm': self.translation.tolist(),
+                'table_z_mm': self.table_z,
+            },
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    @property
+    def has_extrinsics(self) -> bool:
+        return self.rotation is not None and self.translation is not None
+
+    def for_size(self, width: int, height: int) -> 'CameraCalibration':
+        """same calibration for frames of another resolution (e.g. reduced-scale decodes)"""
+        if (width, height) == self.image_size:
+            return self
+        scaled = self._scaled.get((width, height))
+        if scaled is None:
+            sx, sy = width / self.image_size[0], height / self.image_size[1]
+            matrix = self.camera_matrix.copy()
+            matrix[0, [0, 2]] *= sx
+            matrix[1, [1, 2]] *= sy
+            scaled = self._scaled[(width, height)] = CameraCalibration(
+                matrix, self.dist_coeffs, (width, height), self.rotation, self.translation, self.table_z)
+        return scaled
+
+    # --- undistortion ---
+    def _point_table(self) -> np.ndarray:
+        """normalised undistorted (x/z, y/z) of a TABLE_STEP pixel grid covering the image"""
+        if self._table is None:
+            w, h = self.image_size
+            xs = np.arange(0, w + TABLE_STEP, TABLE_STEP, dtype=np.float64)
+            ys = np.arange(0, h + TABLE_STEP, TABLE_STEP, dtype=np.float64)
+            grid = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 1, 2)
+            normalised = cv2.undistortPoints(grid, self.camera_matrix, self.dist_coeffs)
+            self._table = normalised.reshape(len(ys), len(xs), 2)
+        return self._table
+
+    def undistort_points(self, points) -> np.ndarray:
+        """pixel coordinates (N x 2) -> normalised undistorted coordinates, bilinear in the table"""
+        table = self._point_table()
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        gx = np.clip(points[:, 0] / TABLE_STEP, 0, table.shape[1] - 1.000001)
+        gy = np.clip(points[:, 1] / TABLE_STEP, 0, table.shape[0] - 1.000001)
+        x0, y0 = gx.astype(int), gy.astype(int)
+        fx, fy = (gx - x0)[:, None], (gy - y0)[:, None]
+        top = table[y0, x0] * (1 - fx) + table[y0, x0 + 1] * fx
+        bottom = table[y0 + 1, x0] * (1 - fx) + table[y0 + 1, x0 + 1] * fx
+        return top * (1 - fy) + bottom * fy
+
+    def undistort_frame(self, frame: np.ndarray) -> np.ndarray:
+        """whole-frame undistortion with maps built once (not used on the detection path)"""
+        if self._maps is None:
+            self._maps = cv2.initUndistortRectifyMap(self.camera_matrix, self.dist_coeffs, None, self.camera_matrix,
+                                                     self.image_size, cv2.CV_16SC2)
+        return cv2.remap(frame, self._maps[0], self._maps[1], cv2.INTER_LINEAR)
+
+    # --- projection ---
+    def pixels_to_table(self, points) -> np.ndarray:
+        """pixel coordinates (N x 2) -> points on the table plane (N x 3, mm, arm frame of the capture pose)"""
+        if not self.has_extrinsics:
+            raise ValueError("camera extrinsics not calibrated")
+        normalised = self.undistort_points(points)
+        rays = np.hstack([normalised, np.ones((len(normalised), 1))]) @ self.rotation.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = (self.table_z - self.translation[2]) / rays[:, 2]
+        s[~np.isfinite(s) | (s <= 0)] = np.nan  # ray parallel to or pointing away from the table
+        return self.translation + rays * s[:, None]
+
+    def box_to_target(self, box, base_angle: float = SCAN_BASE_ANGLE) -> Optional[Dict[str, float]]:
+        """
+        pick target of a detection box: the midpoint of its bottom edge projected on the table
+
+        Only the bottom edge is where the object touches the table; the rest of the box is the
+        object's height, which the table-plane projection would push far beyond the object.
+
+        :param box: x1, y1, x2, y2 in pixels of a frame at self.image_size
+        :param base_angle: base angle (degrees) the frame was captured at
+        :return: {'angle': base degrees, 'distance': mm from the base axis, 'x_mm', 'y_mm'} with
+                 x/y in the arm frame of the capture pose, None when the box does not project on the table
+        """
+        x1, y1, x2, y2 = [float(v) for v in box]
+        contact = self.pixels_to_table([((x1 + x2) / 2, y2)])[0]
+        if np.isnan(contact).any():
+            return None
+        x, y = contact[:2]
+        # objects to the left (+y) need a smaller base angle
+        return {
+            'angle': float(base_angle - np.degrees(np.arctan2(y, x))),
+            'distance': float(np.hypot(x, y)),
+            'x_mm': float(x),
+            'y_mm': float(y),
+        }
+
+
+def load_calibration(path: str = CALIBRATION_PATH) -> Optional[CameraCalibration]:
+    """calibration on disk, None when the camera has not been calibrated"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return CameraCalibration.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        log.error(f"invalid camera calibration {path}: {e}")
+        return None
+
+
+# --- calibration from chessboard images ---
+def board_points(pattern: Tuple[int, int], square_mm: float) -> np.ndarray:
+    """inner-corner coordinates of the chessboard in its own plane (z = 0), mm"""
+    cols, rows = pattern
+    points = np.zeros((cols * rows, 3), np.float32)
+    points[:, :2] = np.mgrid[0:cols, 0:rows].T.reshape(-1, 2) * square_mm
+    return points
+
+
+def find_corners(image: np.ndarray, pattern: Tuple[int, int]) -> Optional[np.ndarray]:
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    found, corners = cv2.findChessboardCorners(gray, pattern)
+    if not found:
+        return None
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+    return cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
+
+
+def calibrate_intrinsics(paths: List[str], pattern: Tuple[int, int], square_mm: float):
+    """:return: (CameraCalibration without extrinsics, RMS reprojection error in pixels, images used)"""
+    object_points, image_points, size = [], [], None
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        corners = find_corners(image, pattern)
+        if corners is None:
+            log.warning(f"chessboard not found in {path}")
+            continue
+        size = (image.shape[1], image.shape[0])
+        object_points.append(board_points(pattern, square_mm))
+        image_points.append(corners)
+    if len(image_points) < 3:
+        raise ValueError(f"chessboard found in {len(image_points)} images, at least 3 needed")
+    rms, matrix, dist, _, _ = cv2.calibrateCamera(object_points, image_points, size, None, None)
+    return CameraCalibration(matrix, dist, size), rms, len(image_points)
+
+
+def calibrate_extrinsics(calibration: CameraCalibration, image: np.ndarray, pattern: Tuple[int, int],
+                         square_mm: float, board_origin: Tuple[float, float], table_z: float = 0.0) -> float:
+    """
+    camera pose from one view of a chessboard lying flat on the table, taken with the arm in
+    the scan pose (base at SCAN_BASE_ANGLE)
+
+    cv2 orders the inner corners row by row from the first one it finds; the board must lie
+    with that first corner at `board_origin` (mm, arm frame), the rows along +x and the
+    following rows towards -y (check the printed origin after calibrating).
+
+    :return: RMS reprojection error in pixels
+    """
+    view = calibration.for_size(image.shape[1], image.shape[0])
+    corners = find_corners(image, pattern)
+    if corners is None:
+        raise ValueError("chessboard not found")
+    objects = board_points(pattern, square_mm)
+    ok, rvec, tvec = cv2.solvePnP(objects, corners, view.camera_matrix, view.dist_coeffs)
+    if not ok:
+        raise ValueError("solvePnP failed")
+    projected, _ = cv2.projectPoints(objects, rvec, tvec, view.camera_matrix, view.dist_coeffs)
+    rms = float(np.sqrt(np.mean(np.sum((projected.reshape(-1, 2) - corners.reshape(-1, 2)) ** 2, axis=1))))
+    # X_cam = R X_board + t; seen from above the board frame has y and z flipped against the arm frame
+    r_board, _ = cv2.Rodrigues(rvec)
+    board_to_arm = np.diag([1.0, -1.0, -1.0])
+    origin = np.array([board_origin[0], board_origin[1], table_z])
+    calibration.rotation = board_to_arm @ r_board.T
+    calibration.translation = origin - board_to_arm @ r_board.T @ tvec.ravel()
+    calibration.table_z = table_z
+    calibration._scaled.clear()  # rescaled copies carry the old pose
+    return rms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera intrinsics/extrinsics calibration with a chessboard")
+    parser.add_argument('step', choices=('intrinsics', 'extrinsics'))
+    parser.add_argument('images', nargs='+', help="chessboard captures (extrinsics: one, taken from the scan pose)")
+    parser.add_argument('--pattern', default='9x6', help="inner corners, columns x rows")
+    parser.add_argument('--square', type=float, default=25.0, help="square size, mm")
+    parser.add_argument('--board-origin', type=float, nargs=2, metavar=('X', 'Y'),
+                        help="arm-frame position (mm) of the first inner corner (extrinsics)")
+    parser.add_argument('--table-z', type=float, default=0.0, help="table height in the arm frame, mm")
+    parser.add_argument('--output', default=CALIBRATION_PATH)
+    args = parser.parse_args()
+
+    log.basicConfig(level=log.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    pattern = tuple(int(n) for n in args.pattern.lower().split('x'))
+    paths = sorted(p for pattern_ in args.images for p in glob.glob(pattern_))
+
+    if args.step == 'intrinsics':
+        calibration, rms, used = calibrate_intrinsics(paths, pattern, args.square)
+        previous = load_calibration(args.output)
+        if previous is not None and previous.has_extrinsics:
+            log.warning("new intrinsics: the extrinsics have to be calibrated again")
+        calibration.save(args.output)
+        print(f"intrinsics from {used} images, RMS {rms:.3f} px -> {args.output}")
+    else:
+        if args.board_origin is None:
+            parser.error("extrinsics needs --board-origin X Y")
+        calibration = load_calibration(args.output)
+        if calibration is None:
+            parser.error(f"no intrinsics in {args.output}, run the intrinsics step first")
+        image = cv2.imread(paths[0])
+        if image is None:
+            parser.error(f"cannot read {paths[0]}")
+        rms = calibrate_extrinsics(calibration, image, pattern, args.square, args.board_origin, args.table_z)
+        calibration.save(args.output)
+        print(f"camera at {np.round(calibration.translation, 1).tolist()} mm, RMS {rms:.3f} px -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
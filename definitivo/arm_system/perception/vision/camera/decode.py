@@ -0,0 +1,53 @@
+"""
+Reduced-size JPEG decoding for the detection path.
+
+libjpeg(-turbo) can decode a JPEG at 1/2, 1/4 or 1/8 scale by skipping DCT
+coefficients (cv2.IMREAD_REDUCED_COLOR_N). That is much cheaper than a full
+decode followed by the resize YOLO does anyway. Frames for inference are
+decoded at the smallest scale that still covers the inference size; full
+resolution is only decoded for saving or display.
+"""
+import cv2
+import numpy as np
+
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def reduction_for(width: int, height: int, imgsz: int) -> int:
+    """largest DCT scale factor whose decoded long side is still >= imgsz"""
+    long_side = max(width, height)
+    factor = 1
+    for candidate in (2, 4, 8):
+        if long_side // candidate >= imgsz:
+            factor = candidate
+    return factor
+
+
+def decode_jpeg(data, reduction: int = 1) -> np.ndarray:
+    """decode JPEG bytes at 1/`reduction` scale (1, 2, 4 or 8)"""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), REDUCED_FLAGS[reduction])
+
+
+def read_image(path: str, reduction: int = 1) -> np.ndarray:
+    """cv2.imread at 1/`reduction` scale"""
+    return cv2.imread(path, REDUCED_FLAGS[reduction])
+
+
+def reduce_frame(frame: np.ndarray, reduction: int) -> np.ndarray:
+    """same scale for frames that arrive already decoded (e.g. cv2.VideoCapture)"""
+    if reduction == 1:
+        return frame
+    h, w = frame.shape[:2]
+    return cv2.resize(frame, (w // reduction, h // reduction), interpolation=cv2.INTER_AREA)
+
+
+def decode_frame(data, reduction: int = 1) -> np.ndarray:
+    """frame of a CameraStream (JPEG bytes or an already decoded array) at 1/`reduction` scale"""
+    if isinstance(data, np.ndarray):
+        return reduce_frame(data, reduction)
+    return decode_jpeg(data, reduction)
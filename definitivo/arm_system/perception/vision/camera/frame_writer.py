@@ -0,0 +1,159 @@
+import os
+import glob
+import time
+import queue
+import atexit
+import itertools
+import threading
+import logging as log
+from collections import deque
+from typing import Optional
+
+import cv2
+import numpy as np
+
+OBJECTS_IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'objects_images')
+
+
+class FrameWriter:
+    """
+    Background JPEG persistence for captured and annotated frames.
+
+    submit() only enqueues the frame: encoding and the SD-card write happen in
+    a worker thread (submit_encoded() frames are already JPEG and skip the
+    encode). The queue is bounded, so when the card cannot keep up
+    frames are dropped instead of blocking capture or detection. Only every
+    `sample_every`-th submitted frame is kept, unless it is submitted with
+    force=True (annotated detections whose path is reported). When the JPEGs written by the
+    writer exceed `quota_mb`, the oldest ones are deleted; other files in the
+    directory (e.g. the .png calibration captures) are never touched.
+    """
+
+    def __init__(self, directory: str = OBJECTS_IMAGES_DIR, max_queue: int = 8, sample_every: int = 1,
+                 quota_mb: float = 256, jpeg_quality: int = 90):
+        """
+        :param directory: where frames are written
+        :param max_queue: frames waiting to be written before new ones are dropped
+        :param sample_every: keep one of every N submitted frames (0 disables persistence)
+        :param quota_mb: size of the kept JPEGs before the oldest are pruned
+        :param jpeg_quality: cv2 JPEG quality
+        """
+        self.directory = directory
+        self.sample_every = sample_every
+        self.quota_bytes = int(quota_mb * 1024 * 1024)
+        self.jpeg_quality = jpeg_quality
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._counter = itertools.count(1)  # file names
+        self._sampled = itertools.count(1)  # frames subject to sample_every
+        self._thread = None
+        self._lock = threading.Lock()
+        self._files = deque()  # (path, size) oldest first
+        self._bytes = 0
+        self.written = self.dropped = self.skipped = self.pruned = 0
+
+    def submit(self, image: np.ndarray, suffix: str = '', force: bool = False) -> Optional[str]:
+        """
+        queue `image` for writing without blocking
+
+        The writer keeps a reference: do not draw on the array afterwards.
+        :param force: keep the frame regardless of sample_every (still dropped when the queue is full)
+        :return: path the frame will be written to, or None if sampled out or dropped
+        """
+        if image is None:
+            return None
+        return self._enqueue(image, suffix, force)
+
+    def submit_encoded(self, data: bytes, suffix: str = '') -> Optional[str]:
+        """like submit() for a frame that is already a JPEG (e.g. rpicam-still output): written as is"""
+        if not data:
+            return None
+        return self._enqueue(bytes(data), suffix)
+
+    def _enqueue(self, frame, suffix: str, force: bool = False) -> Optional[str]:
+        if self.sample_every <= 0:
+            return None
+        # forced frames do not advance the sampling, so they never shift which captures are kept
+        if not force and (next(self._sampled) - 1) % self.sample_every:
+            self.skipped += 1
+            return None
+        n = next(self._counter)
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{n:05d}{suffix}.jpg")
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((path, frame))
+        except queue.Full:
+            self.dropped += 1
+            return None
+        return path
+
+    def flush(self):
+        """wait until every queued frame is on disk"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> dict:
+        return {'queued': self._queue.qsize(), 'written': self.written, 'dropped': self.dropped,
+                'skipped': self.skipped, 'pruned': self.pruned, 'bytes': self._bytes, 'files': len(self._files)}
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                # JPEGs from earlier runs count towards the quota
+                for path in sorted(glob.glob(os.path.join(self.directory, '*.jpg')), key=os.path.getmtime):
+                    size = os.path.getsize(path)
+                    self._files.append((path, size))
+                    self._bytes += size
+                self._thread = threading.Thread(target=self._run, name='frame-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, frame = item
+                if isinstance(frame, bytes):
+                    buffer = frame
+                else:
+                    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                    if not ok:
+                        log.error(f"could not encode frame for {path}")
+                        continue
+                with open(path, 'wb') as f:
+                    f.write(buffer)
+                self._files.append((path, len(buffer)))
+                self._bytes += len(buffer)
+                self.written += 1
+                self._prune()
+            except OSError as e:
+                log.error(f"error writing frame: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _prune(self):
+        while self._bytes > self.quota_bytes and len(self._files) > 1:
+            path, size = self._files.popleft()
+            self._bytes -= size
+            try:
+                os.remove(path)
+                self.pruned += 1
+            except OSError:
+                pass
+
+
+# process-wide writer shared by every CameraManager and the detection code
+# ARM_CAPTURE_SAVE_EVERY=N keeps one of N frames (0 = never write), ARM_CAPTURE_QUOTA_MB bounds the disk use
+FRAME_WRITER = FrameWriter(sample_every=int(os.environ.get('ARM_CAPTURE_SAVE_EVERY', '1')),
+                           quota_mb=float(os.environ.get('ARM_CAPTURE_QUOTA_MB', '256')))
+atexit.register(FRAME_WRITER.close)
@@ -1,9 +1,10 @@
 import os
-import time
-import numpy as np
 import subprocess
 import cv2
 
+from .frame_writer import FRAME_WRITER
+from .decode import decode_jpeg, reduce_frame
+
 class CameraManager:
     def __init__(self, camera_index: int = 0, width: int = 1280, height: int = 720, flip: bool = True):
         self.flip = flip
@@ -32,8 +33,16 @@ class CameraManager:
             return cv2.rotate(image, cv2.ROTATE_180)
         return image
         
-    def capture_image(self, save: bool = True):
-        """Capturar imagen y opcionalmente guardarla"""
+    def capture_image(self, save: bool = True, reduction: int = 1):
+        """Capturar imagen y opcionalmente guardarla
+
+        La imagen se devuelve en memoria; con save=True se encola una copia en
+        FRAME_WRITER (escritura en segundo plano, sin bloquear la captura).
+        Con reduction=2/4/8 la imagen devuelta se decodifica a 1/N de resolución
+        (escalado DCT de libjpeg, ver decode.py); lo guardado es siempre la
+        captura completa.
+        Devuelve (imagen, ruta) - la ruta es None si el frame no se va a guardar.
+        """
         try:
             if self.use_rpicam:
                 # Capturar con rpicam-still (más confiable)
@@ -47,6 +56,9 @@ class CameraManager:
                     '-t', '1',  # Timeout de 1ms (inmediato)
                     '-n'  # No preview
                 ]
+                if self.flip:
+                    # girado por el ISP: el JPEG ya sale invertido y se guarda tal cual
+                    cmd += ['--rotation', '180']
                 
                 result = subprocess.run(cmd, capture_output=True, timeout=5)
                 
@@ -54,43 +66,37 @@ class CameraManager:
                     print(f"ERROR: rpicam-still falló: {result.stderr.decode()}")
                     return None, None
                 
-                # Leer la imagen capturada
-                image = cv2.imread(temp_file)
+                # Leer la imagen capturada (una sola lectura, se decodifica solo a la escala pedida)
+                try:
+                    with open(temp_file, 'rb') as f:
+                        data = f.read()
+                    os.remove(temp_file)
+                except OSError:
+                    data = b''
+                image = decode_jpeg(data, reduction) if data else None
                 
                 if image is None:
                     print(f"ERROR: No se pudo leer {temp_file}")
                     return None, None
                 
-                # Limpiar archivo temporal
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+                # el JPEG original va al disco sin decodificar ni recomprimir
+                return image, FRAME_WRITER.submit_encoded(data) if save else None
                     
-            else:
-                # Capturar con OpenCV
-                for _ in range(5):
-                    self.cap.grab()
-                
-                ret, image = self.cap.read()
-                if not ret:
-                    print("ERROR: OpenCV no pudo capturar imagen")
-                    return None, None
+            # Capturar con OpenCV
+            for _ in range(5):
+                self.cap.grab()
+            
+            ret, image = self.cap.read()
+            if not ret:
+                print("ERROR: OpenCV no pudo capturar imagen")
+                return None, None
             
             # Invertir imagen si está habilitado
             image = self._flip_image(image)
             
-            if save:
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                timestamp = time.strftime("%Y%m%d-%H%M%S")
-                filename = f"{current_dir}/objects_images/{timestamp}.jpg"
-                
-                os.makedirs(os.path.dirname(filename), exist_ok=True)
-                cv2.imwrite(filename, image)
-                
-                return image, filename
-            
-            return image, None
+            # el frame completo va al writer; quien recibe la imagen puede dibujar sobre ella
+            path = FRAME_WRITER.submit(image.copy()) if save else None
+            return reduce_frame(image, reduction), path
             
         except Exception as e:
             print(f"ERROR en capture_image: {type(e).__name__}: {e}")
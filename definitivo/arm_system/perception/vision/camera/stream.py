@@ -0,0 +1,85 @@
+import time
+import shutil
+import subprocess
+import logging as log
+from typing import Iterator, Tuple, Union
+
+import cv2
+import numpy as np
+
+SOI, EOI = b'\xff\xd8', b'\xff\xd9'
+
+
+class CameraStream:
+    """
+    Continuous camera capture for long-running consumers (the vision service).
+
+    With rpicam-vid the sensor streams MJPEG and frames are yielded as the
+    JPEG bytes, so each consumer decodes them at the scale it needs
+    (decode_frame). Without it (desktop, USB camera) cv2.VideoCapture frames
+    are yielded already decoded. Every frame carries its arrival time
+    (time.monotonic), the reference for latency compensation.
+    """
+
+    def __init__(self, width: int = 1280, height: int = 720, fps: int = 15, flip: bool = True,
+                 camera_index: int = 0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.flip = flip
+        self.camera_index = camera_index
+        self.use_rpicam = shutil.which('rpicam-vid') is not None
+        self._process = None
+        self._cap = None
+
+    def frames(self) -> Iterator[Tuple[float, Union[bytes, np.ndarray]]]:
+        """yield (time.monotonic() of arrival, JPEG bytes or BGR frame) until the camera stops"""
+        if self.use_rpicam:
+            yield from self._rpicam_frames()
+        else:
+            yield from self._opencv_frames()
+
+    def _rpicam_frames(self):
+        cmd = ['rpicam-vid', '--inline', '--codec', 'mjpeg', '--width', str(self.width),
+               '--height', str(self.height), '--framerate', str(self.fps), '-t', '0', '-o', '-', '--nopreview']
+        if self.flip:
+            cmd += ['--rotation', '180']
+        self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=10**8)
+        log.info(f"camera stream (rpicam-vid): {self.width}x{self.height} @ {self.fps}fps")
+        buffer = b''
+        try:
+            while True:
+                chunk = self._process.stdout.read(8192)
+                if not chunk:
+                    break
+                buffer += chunk
+                start = buffer.find(SOI)
+                end = buffer.find(EOI, start + 2) if start != -1 else -1
+                if end != -1:
+                    data, buffer = buffer[start:end + 2], buffer[end + 2:]
+                    yield time.monotonic(), data
+        finally:
+            self.close()
+
+    def _opencv_frames(self):
+        self._cap = cv2.VideoCapture(self.camera_index)
+        self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        log.info(f"camera stream (OpenCV {self.camera_index}): {self.width}x{self.height}")
+        try:
+            while self._cap is not None:
+                ret, frame = self._cap.read()
+                if not ret:
+                    break
+                yield time.monotonic(), cv2.rotate(frame, cv2.ROTATE_180) if self.flip else frame
+        finally:
+            self.close()
+
+    def close(self):
+        process, self._process = self._process, None
+        if process is not None:
+            process.terminate()
+            process.wait()
+        cap, self._cap = self._cap, None
+        if cap is not None:
+            cap.release()
@@ -41,7 +41,7 @@ def test_camera():
             
             # Si presiona 'c', capturar imagen
             elif key == ord('c'):
-                filename = camera.capture_image()
+                _, filename = camera.capture_image()
                 if filename:
                     print(f"Imagen guardada en: {filename}")
                 else:
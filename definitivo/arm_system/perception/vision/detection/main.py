@@ -1,22 +1,44 @@
 import numpy as np
-from typing import Tuple, Dict
+from typing import TYPE_CHECKING, Tuple, Dict
 from abc import ABC, abstractmethod
 
-from ultralytics.engine.results import Results
 from .model_loader import ModelLoader
 
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
+
 
 class DetectionModelInterface(ABC):
     @abstractmethod
-    def inference(self, image: np.ndarray) -> Tuple[Results, Dict[int, str]]:
+    def inference(self, image: np.ndarray, imgsz: int = None, conf: float = None) -> Tuple['Results', Dict[int, str]]:
         pass
     
 
 class DetectionModel(DetectionModelInterface):
-    def __init__(self):
-        self.object_model = ModelLoader().get_model()
+    def __init__(self, variant: str = None, classes: list = None):
+        loader = ModelLoader(variant, classes)
+        self.object_model = loader.get_model()
+        from .preprocess import LetterboxPreprocessor  # torch, already loaded with the model
+        self.imgsz = loader.imgsz
+        self.class_ids = loader.class_ids
+        # exported models have a fixed imgsz x imgsz input; .pt ones accept the minimal stride-padded canvas
+        # and any inference size
+        self.dynamic_input = loader.variant['path'].endswith('.pt')
+        self.preprocess = LetterboxPreprocessor(rect=self.dynamic_input)
+
+    def inference(self, image: np.ndarray, imgsz: int = None, conf: float = None) -> tuple[list['Results'], Dict[int, str]]:
+        """
+        :param imgsz: inference size (default: the variant's), lower for cheap burst frames;
+                      ignored by fixed-shape exports, which only accept their own size
+        :param conf: minimum box confidence (default 0.55)
 
-    def inference(self, image: np.ndarray) -> tuple[list[Results], Dict[int, str]]:
-        results = self.object_model.predict(image, conf=0.55, verbose=False, imgsz=640, stream=True, task='detect', half=True)
-        return results, self.object_model.names
-    
\ No newline at end of file
+        The frame is letterboxed into a reused input tensor and the boxes are mapped back to
+        `image` coordinates; results must be consumed before the next call.
+        """
+        if not self.dynamic_input:
+            imgsz = None
+        tensor, geometry = self.preprocess(image, imgsz or self.imgsz)
+        # classes=...: boxes of other classes are discarded before NMS
+        results = self.object_model.predict(tensor, conf=conf or 0.55, verbose=False, stream=True,
+                                            task='detect', half=True, classes=self.class_ids)
+        return (self.preprocess.restore(result, image, geometry) for result in results), self.object_model.names
@@ -1,15 +1,132 @@
 import os
+import json
+import platform
+import logging as log
 
-from typing import Dict
-from ultralytics import YOLO
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MANIFEST_PATH = os.path.join(MODELS_DIR, 'manifest.json')
+DEFAULT_VARIANT = {'name': 'yolo11s_ncnn_fp32', 'path': 'yolo11s_ncnn_model', 'imgsz': 640}
+
+# minimum agreement (F1 against the FP32 .pt reference) for a quantized variant to be used
+MIN_F1 = 0.9
+# CPU flags with int8 dot-product instructions; without them INT8 kernels are rarely faster
+INT8_FLAGS = ('asimddp', 'avx512_vnni', 'avx_vnni')
+# classes the arm handles; ARM_DETECT_CLASSES="apple,bottle" (or "all") overrides it per deployment
+DEFAULT_CLASSES = ('apple', 'orange', 'bottle', 'cup', 'cell phone', 'book')
+
+
+def configured_classes() -> Optional[List[str]]:
+    """class subset to detect, None for every class of the model"""
+    value = os.environ.get('ARM_DETECT_CLASSES')
+    if value is None:
+        return list(DEFAULT_CLASSES)
+    if value.strip().lower() in ('', 'all'):
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def cpu_info() -> Dict[str, object]:
+    """host CPU identity used to match manifest latencies (model name and feature flags)"""
+    model, flags = platform.processor() or '', set()
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                key = key.strip().lower()
+                if key in ('model name', 'cpu part', 'hardware') and not model:
+                    model = value.strip()
+                elif key in ('flags', 'features'):
+                    flags.update(value.split())
+    except OSError:
+        pass
+    return {'machine': platform.machine(), 'model': model, 'flags': sorted(flags)}
+
+
+def host_key(info: Dict[str, object]) -> str:
+    return f"{info['machine']}/{info['model']}"
+
+
+def select_variant(manifest: dict, info: Dict[str, object] = None, min_f1: float = MIN_F1,
+                   classes: List[str] = None) -> Optional[dict]:
+    """
+    best variant of the manifest for this host: lowest p50 latency among the
+    variants present on disk that are accurate enough and, when pruned to a
+    class subset at export, still cover `classes`
+
+    Latencies measured on the same CPU are preferred; otherwise INT8 variants
+    are only considered when the CPU has int8 dot-product instructions.
+    """
+    info = info or cpu_info()
+    key = host_key(info)
+    int8_capable = any(flag in info['flags'] for flag in INT8_FLAGS)
+    candidates = []
+    for variant in manifest.get('variants', []):
+        if not os.path.exists(os.path.join(MODELS_DIR, variant['path'])):
+            continue
+        if variant.get('accuracy', {}).get('f1', 1.0) < min_f1:
+            continue
+        if 'classes' in variant and (classes is None or not set(classes) <= set(variant['classes'])):
+            continue
+        latency = variant.get('latency', {})
+        if key in latency:
+            candidates.append((0, latency[key]['p50_ms'], variant))
+        elif variant.get('precision') != 'int8' or int8_capable:
+            measured = [entry['p50_ms'] for entry in latency.values()]
+            candidates.append((1, min(measured) if measured else float('inf'), variant))
+    return min(candidates, key=lambda c: c[:2])[2] if candidates else None
 
 
 class ModelLoader:
-    def __init__(self):
-        current_path = os.path.dirname(os.path.abspath(__file__))
-        object_model_path: str = current_path + '/models/yolo11s_ncnn_model'
-        self.model: YOLO = YOLO(object_model_path, task='detect')
-        
-    def get_model(self) -> YOLO:
+    def __init__(self, variant: str = None, classes: List[str] = None):
+        """
+        :param variant: variant name from models/manifest.json (or ARM_MODEL_VARIANT);
+                        by default the fastest accurate variant for this CPU
+        :param classes: class names to detect (default: configured_classes())
+        """
+        self.classes = classes if classes is not None else configured_classes()
+        self.variant = self._resolve(variant or os.environ.get('ARM_MODEL_VARIANT'), self.classes)
+        object_model_path: str = os.path.join(MODELS_DIR, self.variant['path'])
+        self.imgsz: int = self.variant.get('imgsz', 640)
+        log.info(f"detection model: {self.variant['name']} ({object_model_path}, imgsz={self.imgsz})")
+        # ultralytics (and torch) are imported here, not at module load: variant selection and the
+        # benchmarks' helpers stay cheap to import
+        from ultralytics import YOLO
+        self.model: 'YOLO' = YOLO(object_model_path, task='detect')
+        self.class_ids: Optional[List[int]] = self._class_ids(self.model.names, self.classes)
+
+    @staticmethod
+    def _class_ids(names: Dict[int, str], classes: Optional[List[str]]) -> Optional[List[int]]:
+        """model ids of `classes`, passed to predict(classes=...) so other classes are dropped before NMS"""
+        if classes is None:
+            return None
+        ids = {name: i for i, name in names.items()}
+        unknown = [name for name in classes if name not in ids]
+        if unknown:
+            log.warning(f"classes not in the model, ignored: {unknown}")
+        selected = sorted(ids[name] for name in classes if name in ids)
+        if not selected:
+            # an empty filter would mean "every class" to predict(): the opposite of what was asked
+            raise ValueError(f"none of the configured classes {list(classes)} is in the model")
+        # a head already pruned to exactly these classes needs no filtering
+        return selected if len(selected) < len(names) else None
+
+    @staticmethod
+    def _resolve(name: Optional[str], classes: Optional[List[str]] = None) -> dict:
+        if not os.path.exists(MANIFEST_PATH):
+            return DEFAULT_VARIANT
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+        if name:
+            for variant in manifest.get('variants', []):
+                if variant['name'] == name:
+                    return variant
+            log.warning(f"model variant {name} not in manifest, selecting automatically")
+        return select_variant(manifest, classes=classes) or DEFAULT_VARIANT
+
+    def get_model(self) -> 'YOLO':
         return self.model
-    
\ No newline at end of file
@@ -1,5 +1,329 @@
+"""
+Export pipeline: FP32 and INT8 NCNN/ONNX variants of a YOLO model plus a manifest.
+
+INT8 variants are calibrated on our own captures (camera/objects_images):
+- ONNX: onnxruntime static quantization (QDQ, per-channel weights). The
+  Detect head stays in float because box regression loses most accuracy
+  when quantized.
+- NCNN: ncnnoptimize → ncnn2table (KL calibration) → ncnn2int8. The ncnn
+  tools must be on PATH; otherwise the variant is skipped.
+
+With --classes, the ONNX output head is pruned to that subset: a Gather
+keeps the 4 box rows and the chosen class rows, so decoding and NMS only
+see those classes. NCNN variants keep the full head; ModelLoader filters
+them before NMS at load time (ARM_DETECT_CLASSES).
+
+Calibration pre-processing is fused into one native pass. For ONNX,
+letterbox + cv2.dnn.blobFromImage does BGR→RGB, 1/255 scaling and
+HWC→NCHW together. For NCNN, the mean/norm/pixel-order options go into the
+calibration table, so ncnn applies them inside from_pixels.
+
+Every variant is evaluated against the FP32 .pt reference on captures held
+out from calibration (every --eval-every-th image), so INT8 variants are not
+scored on the images their ranges were fitted to. Accuracy (F1, mean IoU) and latency go to models/manifest.json.
+Latency is keyed by host CPU, so exporting on a PC and re-measuring on the
+Pi (--evaluate-only) keeps both. ModelLoader reads the manifest to choose
+the fastest accurate variant for the CPU it runs on.
+
+Usage (from arm_system/):
+    python -m perception.vision.detection.models.export_model --weights yolo11s.pt --formats onnx ncnn
+    python -m perception.vision.detection.models.export_model --evaluate-only     # on the Pi
+"""
+import os
+import ast
+import glob
+import json
+import time
+import shutil
+import argparse
+import subprocess
+import logging as log
+
+import cv2
+import numpy as np
 from ultralytics import YOLO
 
-model = YOLO('yolo11s.pt')
+from perception.vision.detection.model_loader import MODELS_DIR, MANIFEST_PATH, cpu_info, host_key
+from benchmarks.common import summarize
+from benchmarks.vision_pipeline import agreement, postprocess
+
+CALIBRATION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                               'camera', 'objects_images')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+LETTERBOX_COLOR = (114, 114, 114)
+NCNN_TOOLS = ('ncnnoptimize', 'ncnn2table', 'ncnn2int8')
+
+
+# --- calibration data ---
+def calibration_images(directory: str = CALIBRATION_DIR, limit: int = None) -> list:
+    paths = sorted(p for p in glob.glob(os.path.join(directory, '*')) if p.lower().endswith(IMAGE_EXTENSIONS))
+    if not paths:
+        raise ValueError(f'no calibration images in {directory}')
+    return paths[:limit]
+
+
+def split_images(paths: list, eval_every: int) -> tuple:
+    """(calibration, evaluation): every `eval_every`-th capture is held out for evaluation"""
+    if eval_every < 2:
+        raise ValueError(f'eval_every must be at least 2, got {eval_every}')
+    evaluation = paths[eval_every - 1::eval_every]
+    if not evaluation:
+        raise ValueError(f'need at least {eval_every} images to hold out an evaluation set')
+    calibration = [p for i, p in enumerate(paths, 1) if i % eval_every]
+    return calibration, evaluation
+
+
+def preprocess(image: np.ndarray, imgsz: int) -> np.ndarray:
+    """letterbox + one blobFromImage call (BGR→RGB, /255, HWC→NCHW) as float32 [1, 3, imgsz, imgsz]"""
+    h, w = image.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    nh, nw = round(h * scale), round(w * scale)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    padded = cv2.copyMakeBorder(cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR),
+                                top, imgsz - nh - top, left, imgsz - nw - left,
+                                cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return cv2.dnn.blobFromImage(padded, scalefactor=1 / 255.0, swapRB=True)
+
+
+# --- ONNX ---
+def export_onnx(weights: str, imgsz: int, name: str) -> str:
+    exported = YOLO(weights).export(format='onnx', imgsz=imgsz, simplify=True, dynamic=False)
+    path = os.path.join(MODELS_DIR, f'{name}.onnx')
+    shutil.move(exported, path)
+    return path
+
+
+def prune_onnx_classes(onnx_path: str, pruned_path: str, classes: list) -> list:
+    """
+    keep only `classes` in the [1, 4 + nc, anchors] output with a Gather on axis 1
+    and rewrite the `names` metadata; returns the kept class names in new id order
+    """
+    import onnx
+    from onnx import helper, numpy_helper
+    model = onnx.load(onnx_path)
+    metadata = {prop.key: prop for prop in model.metadata_props}
+    names = ast.literal_eval(metadata['names'].value)  # ultralytics stores str(dict)
+    ids = sorted(i for i, name in names.items() if name in classes)
+    if not ids:
+        raise ValueError(f'none of {classes} in the model')
+
+    graph = model.graph
+    output = graph.output[0]
+    full = output.name + '_all_classes'
+    for node in graph.node:
+        node.output[:] = [full if name == output.name else name for name in node.output]
+    indices = numpy_helper.from_array(np.array(list(range(4)) + [4 + i for i in ids], dtype=np.int64),
+                                      '/prune/indices')
+    graph.initializer.append(indices)
+    graph.node.append(helper.make_node('Gather', [full, indices.name], [output.name], name='/prune/Gather', axis=1))
+    output.type.tensor_type.shape.dim[1].dim_value = 4 + len(ids)
+
+    kept = [names[i] for i in ids]
+    metadata['names'].value = str(dict(enumerate(kept)))
+    onnx.checker.check_model(model)
+    onnx.save(model, pruned_path)
+    return kept
+
+
+def _head_nodes(onnx_path: str) -> list:
+    """non-Conv nodes of the Detect head (last module) and the class pruning, kept in float"""
+    import onnx
+    graph = onnx.load(onnx_path).graph
+    modules = [node.name.split('/')[1] for node in graph.node if node.name.startswith('/model.')]
+    head = max(set(modules), key=lambda m: int(m.split('.')[1])) if modules else None
+    return [node.name for node in graph.node
+            if (head and node.name.startswith(f'/{head}/') and node.op_type != 'Conv')
+            or node.name.startswith('/prune/')]
+
+
+def quantize_onnx(fp32_path: str, int8_path: str, images: list, imgsz: int) -> str:
+    try:
+        from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+                                              quantize_static)
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+    except ImportError as e:
+        raise RuntimeError("INT8 ONNX export needs onnxruntime (pip install onnxruntime)") from e
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.blobs = (preprocess(cv2.imread(path), imgsz) for path in images)
+
+        def get_next(self):
+            blob = next(self.blobs, None)
+            return None if blob is None else {'images': blob}
+
+    prepared = fp32_path.replace('.onnx', '_prep.onnx')
+    quant_pre_process(fp32_path, prepared)
+    quantize_static(prepared, int8_path, Reader(),
+                    quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    calibrate_method=CalibrationMethod.MinMax,
+                    nodes_to_exclude=_head_nodes(prepared))
+    os.remove(prepared)
+    return int8_path
+
+
+# --- NCNN ---
+def export_ncnn(weights: str, imgsz: int, name: str) -> str:
+    exported = YOLO(weights).export(format='ncnn', imgsz=imgsz)
+    path = os.path.join(MODELS_DIR, f'{name}_ncnn_model')
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    shutil.move(exported, path)
+    return path
+
+
+def quantize_ncnn(fp32_dir: str, int8_dir: str, images: list, imgsz: int) -> str:
+    missing = [tool for tool in NCNN_TOOLS if shutil.which(tool) is None]
+    if missing:
+        raise RuntimeError(f"INT8 NCNN export needs the ncnn tools on PATH (missing: {', '.join(missing)})")
+    os.makedirs(int8_dir, exist_ok=True)
+    param, weights = os.path.join(fp32_dir, 'model.ncnn.param'), os.path.join(fp32_dir, 'model.ncnn.bin')
+    opt_param, opt_bin = os.path.join(int8_dir, 'opt.param'), os.path.join(int8_dir, 'opt.bin')
+    image_list, table = os.path.join(int8_dir, 'calibration.txt'), os.path.join(int8_dir, 'model.table')
+    with open(image_list, 'w') as f:
+        f.write('\n'.join(os.path.abspath(p) for p in images) + '\n')
+
+    norm = 1 / 255.0
+    subprocess.run(['ncnnoptimize', param, weights, opt_param, opt_bin, '0'], check=True)
+    subprocess.run(['ncnn2table', opt_param, opt_bin, image_list, table,
+                    'mean=[0,0,0]', f'norm=[{norm},{norm},{norm}]', f'shape=[{imgsz},{imgsz},3]',
+                    'pixel=BGR2RGB', f'thread={os.cpu_count()}', 'method=kl'], check=True)
+    subprocess.run(['ncnn2int8', opt_param, opt_bin, os.path.join(int8_dir, 'model.ncnn.param'),
+                    os.path.join(int8_dir, 'model.ncnn.bin'), table], check=True)
+    # ultralytics reads class names and imgsz from metadata.yaml
+    shutil.copy(os.path.join(fp32_dir, 'metadata.yaml'), int8_dir)
+    for path in (opt_param, opt_bin):
+        os.remove(path)
+    return int8_dir
+
+
+# --- evaluation and manifest ---
+def evaluate(model_path: str, images: list, imgsz: int, classes: list = None, warmup: int = 3):
+    """per-image detections and latency summary of one variant (restricted to `classes` if given)"""
+    model = YOLO(model_path, task='detect')
+    class_ids = None
+    if classes:
+        class_ids = [i for i, name in model.names.items() if name in classes]
+    frames = [cv2.imread(path) for path in images]
+    for frame in frames[:warmup]:
+        model.predict(frame, imgsz=imgsz, verbose=False, classes=class_ids)
+    detections, samples = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        result = model.predict(frame, imgsz=imgsz, verbose=False, classes=class_ids)[0]
+        samples.append(time.perf_counter() - start)
+        detections.append(postprocess(result, model.names)[0])
+    return detections, summarize(samples)
+
+
+def load_manifest() -> dict:
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    return {'variants': []}
+
+
+def save_manifest(manifest: dict):
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def update_manifest(manifest: dict, entry: dict):
+    """replace a variant by name, keeping latencies measured on other hosts"""
+    for i, variant in enumerate(manifest['variants']):
+        if variant['name'] == entry['name']:
+            entry['latency'] = dict(variant.get('latency', {}), **entry.get('latency', {}))
+            manifest['variants'][i] = entry
+            return
+    manifest['variants'].append(entry)
+
+
+def measure(manifest: dict, weights: str, images: list):
+    """evaluate every manifest variant on this host against the .pt reference"""
+    key = host_key(cpu_info())
+    references = {}
+    for variant in manifest['variants']:
+        imgsz, classes = variant['imgsz'], variant.get('classes')
+        # pruned variants are compared with the reference restricted to the same classes
+        ref_key = (imgsz, tuple(classes or ()))
+        if ref_key not in references:
+            references[ref_key] = evaluate(weights, images, imgsz, classes)[0]
+        reference = references[ref_key]
+        log.info(f"evaluating {variant['name']} on {key}")
+        detections, latency = evaluate(os.path.join(MODELS_DIR, variant['path']), images, imgsz, classes)
+        variant['accuracy'] = dict(agreement(reference, detections), reference=os.path.basename(weights),
+                                   images=len(images))
+        variant.setdefault('latency', {})[key] = {k: latency[k] for k in ('mean_ms', 'p50_ms', 'p99_ms')}
+
+
+def build(weights: str, imgsz: int, formats, calibration: list, classes: list = None) -> dict:
+    """export FP32 and INT8 variants for `formats`, returning the updated manifest"""
+    name = os.path.splitext(os.path.basename(weights))[0]
+    manifest = load_manifest()
+    common = {'source': os.path.basename(weights), 'imgsz': imgsz, 'created': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    calibration_info = {'images': len(calibration), 'directory': os.path.relpath(CALIBRATION_DIR, MODELS_DIR)}
+
+    if 'onnx' in formats:
+        fp32 = export_onnx(weights, imgsz, name)
+        onnx_name, onnx_common = f'{name}_onnx', common
+        if classes:
+            pruned = fp32.replace('.onnx', f'_{len(classes)}cls.onnx')
+            kept = prune_onnx_classes(fp32, pruned, classes)
+            os.remove(fp32)
+            fp32, onnx_name = pruned, f'{name}_onnx_{len(kept)}cls'
+            onnx_common = dict(common, classes=kept)
+        update_manifest(manifest, dict(onnx_common, name=f'{onnx_name}_fp32', format='onnx', precision='fp32',
+                                       path=os.path.basename(fp32)))
+        try:
+            int8 = quantize_onnx(fp32, fp32.replace('.onnx', '_int8.onnx'), calibration, imgsz)
+            update_manifest(manifest, dict(onnx_common, name=f'{onnx_name}_int8', format='onnx', precision='int8',
+                                           path=os.path.basename(int8),
+                                           calibration=dict(calibration_info, method='minmax', head='fp32')))
+        except RuntimeError as e:
+            log.warning(f"skipping INT8 ONNX: {e}")
+
+    if 'ncnn' in formats:
+        fp32 = export_ncnn(weights, imgsz, name)
+        update_manifest(manifest, dict(common, name=f'{name}_ncnn_fp32', format='ncnn', precision='fp32',
+                                       path=os.path.basename(fp32)))
+        try:
+            int8 = quantize_ncnn(fp32, os.path.join(MODELS_DIR, f'{name}_ncnn_int8_model'), calibration, imgsz)
+            update_manifest(manifest, dict(common, name=f'{name}_ncnn_int8', format='ncnn', precision='int8',
+                                           path=os.path.basename(int8),
+                                           calibration=dict(calibration_info, method='kl', pixel='BGR2RGB')))
+        except (RuntimeError, subprocess.CalledProcessError) as e:
+            log.warning(f"skipping INT8 NCNN: {e}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export FP32/INT8 NCNN and ONNX variants and record them in the manifest")
+    parser.add_argument('--weights', default='yolo11s.pt', help="ultralytics weights (downloaded if missing)")
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--formats', nargs='+', choices=('onnx', 'ncnn'), default=['onnx', 'ncnn'])
+    parser.add_argument('--classes', nargs='+', metavar='NAME',
+                        help="prune the ONNX head to these classes (e.g. --classes apple orange bottle)")
+    parser.add_argument('--calibration-dir', default=CALIBRATION_DIR)
+    parser.add_argument('--calibration-count', type=int, default=200, help="images used for INT8 calibration")
+    parser.add_argument('--eval-every', type=int, default=5,
+                        help="hold out every k-th capture for evaluation instead of calibration")
+    parser.add_argument('--evaluate-only', action='store_true', help="only re-measure the manifest variants on this host")
+    parser.add_argument('--skip-evaluation', action='store_true')
+    args = parser.parse_args()
+
+    log.basicConfig(level=log.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    calibration, evaluation = split_images(calibration_images(args.calibration_dir), args.eval_every)
+    calibration = calibration[:args.calibration_count]
+
+    manifest = (load_manifest() if args.evaluate_only
+                else build(args.weights, args.imgsz, args.formats, calibration, args.classes))
+    if not args.skip_evaluation:
+        # no labelled set of our own objects: agreement with the .pt reference on held-out captures
+        measure(manifest, args.weights, evaluation)
+    save_manifest(manifest)
+    log.info(f"manifest: {MANIFEST_PATH}")
+
 
-model.export(format="ncnn")
+if __name__ == '__main__':
+    main()
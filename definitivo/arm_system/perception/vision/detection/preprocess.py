@@ -0,0 +1,98 @@
+import cv2
+import numpy as np
+import torch
+from collections import OrderedDict
+from typing import Tuple
+
+PAD_VALUE = 114  # grey used by Ultralytics' LetterBox
+
+
+class LetterboxGeometry:
+    """resize/pad of one (frame shape, imgsz) pair, computed like Ultralytics' LetterBox(center=True)"""
+    __slots__ = ('shape', 'ratio', 'new_w', 'new_h', 'top', 'left', 'canvas_h', 'canvas_w')
+
+    def __init__(self, shape: Tuple[int, int], imgsz: int, stride: int = 32, rect: bool = False):
+        h, w = shape
+        self.shape = (h, w)
+        self.ratio = min(imgsz / h, imgsz / w)
+        self.new_w, self.new_h = int(round(w * self.ratio)), int(round(h * self.ratio))
+        dw, dh = imgsz - self.new_w, imgsz - self.new_h
+        if rect:
+            # minimum padding to a stride multiple (dynamic-shape .pt models)
+            dw, dh = dw % stride, dh % stride
+        self.top, self.left = int(round(dh / 2 - 0.1)), int(round(dw / 2 - 0.1))
+        self.canvas_h, self.canvas_w = self.new_h + dh, self.new_w + dw
+
+
+class LetterboxPreprocessor:
+    """
+    Letterbox + normalisation into preallocated buffers.
+
+    Ultralytics letterboxes and normalises every numpy frame into fresh
+    arrays. Here the geometry, the padded canvas and the (1, 3, H, W) float
+    input tensor are built once per camera mode (frame shape, imgsz) and
+    reused, so a frame costs one resize into the canvas and one scaled copy
+    into the tensor. Given a tensor, Ultralytics skips its own preprocessing;
+    its boxes come back in canvas coordinates and restore() maps them to the
+    frame.
+
+    The tensor is overwritten by the next call: one inference in flight per
+    preprocessor.
+    """
+
+    def __init__(self, stride: int = 32, rect: bool = False, max_modes: int = 4):
+        """
+        :param stride: model stride, canvas sides are multiples of it
+        :param rect: pad only to the stride (.pt models) instead of to imgsz x imgsz (fixed-shape exports)
+        :param max_modes: (frame shape, imgsz) buffers kept, least recently used dropped first
+        """
+        self.stride = stride
+        self.rect = rect
+        self.max_modes = max_modes
+        self._modes = OrderedDict()  # (h, w, imgsz) -> (geometry, canvas, tensor, tensor as numpy)
+
+    def _mode(self, shape: Tuple[int, int], imgsz: int):
+        key = (shape[0], shape[1], imgsz)
+        mode = self._modes.get(key)
+        if mode is None:
+            geometry = LetterboxGeometry(shape, imgsz, self.stride, self.rect)
+            canvas = np.full((geometry.canvas_h, geometry.canvas_w, 3), PAD_VALUE, dtype=np.uint8)
+            tensor = torch.empty((1, 3, geometry.canvas_h, geometry.canvas_w), dtype=torch.float32)
+            mode = self._modes[key] = (geometry, canvas, tensor, tensor.numpy())
+            while len(self._modes) > self.max_modes:
+                self._modes.popitem(last=False)
+        else:
+            self._modes.move_to_end(key)
+        return mode
+
+    def __call__(self, frame: np.ndarray, imgsz: int) -> Tuple[torch.Tensor, LetterboxGeometry]:
+        """BGR uint8 frame -> RGB float tensor in [0, 1] ready for predict(), and its geometry"""
+        geometry, canvas, tensor, array = self._mode(frame.shape[:2], imgsz)
+        region = canvas[geometry.top:geometry.top + geometry.new_h, geometry.left:geometry.left + geometry.new_w]
+        if frame.shape[:2] == region.shape[:2]:
+            np.copyto(region, frame)
+        else:
+            # dst is a view of the canvas: cv2 writes in place, the padding is never touched
+            cv2.resize(frame, (geometry.new_w, geometry.new_h), dst=region, interpolation=cv2.INTER_LINEAR)
+        # HWC BGR -> CHW RGB, /255, straight into the tensor memory
+        np.multiply(canvas.transpose(2, 0, 1)[::-1], np.float32(1 / 255), out=array[0], casting='unsafe')
+        return tensor, geometry
+
+    @staticmethod
+    def restore(result, frame: np.ndarray, geometry: LetterboxGeometry):
+        """map the boxes of a canvas-space Results to `frame` coordinates (in place)"""
+        h, w = geometry.shape
+        result.orig_img = frame
+        result.orig_shape = (h, w)
+        if result.boxes is None:
+            return result
+        result.boxes.orig_shape = (h, w)
+        # predict() builds its outputs in inference mode; in-place edits need it too
+        with torch.inference_mode():
+            xyxy = result.boxes.data[:, :4]
+            xyxy[:, 0::2] -= geometry.left
+            xyxy[:, 1::2] -= geometry.top
+            xyxy /= geometry.ratio
+            xyxy[:, 0::2].clamp_(0, w)
+            xyxy[:, 1::2].clamp_(0, h)
+        return result
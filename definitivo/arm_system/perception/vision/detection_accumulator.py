@@ -0,0 +1,140 @@
+import numpy as np
+import logging as log
+from typing import Callable, Dict, List, Optional
+
+from .detection.main import DetectionModelInterface
+
+NONE_CLASS = '__none__'
+# burst inference size for models that accept any input size
+BURST_IMGSZ = 320
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class DetectionAccumulator:
+    """
+    Multi-frame class estimate for the object in front of the camera.
+
+    A scan `detected` event triggers a short burst of cheap low-resolution
+    inferences instead of one full-resolution pass. Every frame turns the
+    boxes overlapping the tracked object into a distribution over the classes
+    seen so far plus "no object". These are fused as independent observations
+    (sum of log-probabilities), and the burst stops as soon as the posterior
+    of one outcome reaches `stop_confidence`. One missed or lucky frame then
+    moves the estimate instead of deciding it.
+    """
+
+    def __init__(self, detector: DetectionModelInterface, capture: Callable[[], Optional[np.ndarray]],
+                 imgsz: int = None, max_frames: int = 5, min_frames: int = 2, stop_confidence: float = 0.9,
+                 min_box_confidence: float = 0.25, track_iou: float = 0.3, floor: float = 0.05,
+                 min_confidence: float = 0.5):
+        """
+        :param detector: detection model (inference(image, imgsz, conf))
+        :param capture: returns one BGR frame, or None on failure
+        :param imgsz: inference size of the burst frames (default: BURST_IMGSZ, or the detector's
+                      own size when it only accepts that one, e.g. fixed-shape ONNX/NCNN exports)
+        :param max_frames: frames per burst at most
+        :param min_frames: frames always fused before stopping early
+        :param stop_confidence: posterior that ends the burst
+        :param min_box_confidence: weakest box still used as evidence
+        :param track_iou: overlap with the tracked box for a box to count as the same object
+        :param floor: probability given to classes not seen in a frame (bounds the effect of one frame)
+        :param min_confidence: fused probability below which the burst reports no object
+        """
+        self.detector = detector
+        self.capture = capture
+        if imgsz is None:
+            imgsz = BURST_IMGSZ if getattr(detector, 'dynamic_input', True) else detector.imgsz
+        self.imgsz = imgsz
+        self.max_frames = max_frames
+        self.min_frames = min_frames
+        self.stop_confidence = stop_confidence
+        self.min_box_confidence = min_box_confidence
+        self.track_iou = track_iou
+        self.floor = floor
+        self.min_confidence = min_confidence
+
+    def _frame_evidence(self, frame: np.ndarray, track: Optional[np.ndarray]):
+        """per-class max confidence of the boxes on the tracked object, and those boxes"""
+        results, names = self.detector.inference(frame, imgsz=self.imgsz, conf=self.min_box_confidence)
+        evidence: Dict[str, float] = {}
+        boxes = []
+        for result in results:
+            if result.boxes is None or len(result.boxes) == 0:
+                continue
+            xyxy = result.boxes.xyxy.cpu().numpy()
+            confs = result.boxes.conf.cpu().numpy()
+            classes = result.boxes.cls.cpu().numpy().astype(int)
+            order = np.argsort(-confs)
+            if track is None:
+                track = xyxy[order[0]]
+            for i in order:
+                if _iou(xyxy[i], track) < self.track_iou:
+                    continue
+                name = names[classes[i]]
+                evidence[name] = max(evidence.get(name, 0.0), float(confs[i]))
+                boxes.append((name, int(classes[i]), float(confs[i]), xyxy[i]))
+        return evidence, boxes, track
+
+    def posterior(self, observations: List[Dict[str, float]]) -> Dict[str, float]:
+        """fused class probabilities (NONE_CLASS = no object) of the per-frame evidence"""
+        classes = sorted({name for evidence in observations for name in evidence}) + [NONE_CLASS]
+        log_post = np.zeros(len(classes))
+        for evidence in observations:
+            q = np.array([evidence.get(name, self.floor) for name in classes[:-1]]
+                         + [1.0 - max(evidence.values(), default=0.0)])
+            q = np.clip(q, self.floor, 1.0)
+            log_post += np.log(q / q.sum())
+        post = np.exp(log_post - log_post.max())
+        post /= post.sum()
+        return dict(zip(classes, post.tolist()))
+
+    def observe(self) -> Optional[dict]:
+        """
+        run one burst
+
+        :return: {'class', 'confidence', 'box', 'class_id', 'frames', 'probabilities', 'frame'}
+                 for the fused class, or None if "no object" wins, the winner stays below
+                 `min_confidence` or no frame could be captured
+        """
+        observations, boxes, track, frame = [], [], None, None
+        posterior: Dict[str, float] = {}
+        for _ in range(self.max_frames):
+            captured = self.capture()
+            if captured is None:
+                continue
+            frame = captured
+            evidence, frame_boxes, track = self._frame_evidence(frame, track)
+            observations.append(evidence)
+            boxes.extend(frame_boxes)
+            posterior = self.posterior(observations)
+            if len(observations) >= self.min_frames and max(posterior.values()) >= self.stop_confidence:
+                break
+
+        if not observations:
+            log.error("burst without frames: camera could not be captured")
+            return None
+        best = max(posterior, key=posterior.get)
+        log.info(f"fused {len(observations)} frames: {best} ({posterior[best]:.2f})")
+        if best == NONE_CLASS or posterior[best] < self.min_confidence:
+            return None
+
+        # confidence-weighted box of the winning class over the burst
+        class_boxes = [(class_id, conf, box) for name, class_id, conf, box in boxes if name == best]
+        weights = np.array([conf for _, conf, _ in class_boxes])
+        box = (np.stack([b for _, _, b in class_boxes]) * weights[:, None]).sum(axis=0) / weights.sum()
+        return {
+            'class': best,
+            'confidence': posterior[best],
+            'box': box,
+            'class_id': class_boxes[0][0],
+            'frames': len(observations),
+            'probabilities': {('none' if k == NONE_CLASS else k): v for k, v in posterior.items()},
+            'frame': frame,
+        }
@@ -4,28 +4,37 @@ import logging as log
 log.basicConfig(level=log.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 from .detection.main import (DetectionModelInterface, DetectionModel)
+from .camera.frame_writer import FRAME_WRITER
 
 class ImageProcessor:
-    def __init__(self, confidence_threshold: float = 0.45):
-        self.detection: DetectionModelInterface = DetectionModel()
+    # classes with their own placement zone; anything else is 'default'
+    SORTED_CLASSES = ('apple', 'orange', 'bottle')
+
+    def __init__(self, confidence_threshold: float = 0.45, detection: DetectionModelInterface = None):
+        """
+        :param detection: model to use (default: a local DetectionModel; the vision service passes its own)
+        """
+        self.detection: DetectionModelInterface = detection or DetectionModel()
         self.conf_threshold = confidence_threshold
         
     def read_image_path(self, path: str, draw_results: bool = True, save_drawn_img: bool = True):
-        object_image = cv2.imread(path)
-        processed_img, best_detection = self.process_image(object_image, self.conf_threshold)
-        
+        return self.read_image(cv2.imread(path), draw_results, save_drawn_img)
+
+    def read_image(self, image: np.ndarray, draw_results: bool = True, save_drawn_img: bool = True):
+        """detect on an in-memory frame; the drawn frame is persisted in the background"""
+        processed_img, best_detection = self.process_image(image, self.conf_threshold)
+
         if draw_results and best_detection is not None and best_detection.get('confidence', 0) > 0:
             self._draw_detection(processed_img, best_detection)
             if save_drawn_img:
-                self._save_drawn_image(processed_img, path)
+                self._save_drawn_image(processed_img)
 
         return processed_img, best_detection
     
     def process_image(self, image: np.ndarray, confidence_threshold: float =0.45):
         try:
-            # 1. inference
-            copy_image = image.copy()
-            object_results, object_classes = self.detection.inference(copy_image)
+            # 1. inference (the preprocessing never writes into `image`, no copy needed)
+            object_results, object_classes = self.detection.inference(image)
             
             # 2. init variables
             best_detection = {'class': '', 'confidence': 0.0, 'box': [], 'class_id': -1}
@@ -44,11 +53,7 @@ class ImageProcessor:
                 if confidence < confidence_threshold:
                     continue
                     
-                detected_class = object_classes[class_id]
-                clss_object = 'default'
-                    
-                if detected_class in ['apple', 'orange', 'bottle']:
-                    clss_object = detected_class
+                clss_object = self.object_class(object_classes[class_id])
                     
                 log.info(f'class: {clss_object}')
                         
@@ -71,6 +76,9 @@ class ImageProcessor:
             log.info(f'error un image processing: {e}')
             return image, None
         
+    def object_class(self, detected_class: str) -> str:
+        return detected_class if detected_class in self.SORTED_CLASSES else 'default'
+
     def _draw_detection(self, image: np.ndarray, detection: dict):
         """
         draw image. 
@@ -86,10 +94,13 @@ class ImageProcessor:
         label = f"{class_name} {confidence:.2f}"
         cv2.putText(image, label, (x1, y1 - 10),cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
 
-    def _save_drawn_image(self, image: np.ndarray, original_path: str):
+    def _save_drawn_image(self, image: np.ndarray) -> str:
         """
-        save image.
+        queue the drawn image for the background writer; returns its future path (None if dropped)
+
+        Always kept, whatever ARM_CAPTURE_SAVE_EVERY: the path is reported with the detection.
         """
-        out_path = original_path.replace('.jpg', '_detected.jpg')
-        cv2.imwrite(out_path, image)
-        log.info(f"save image with draw detections: {out_path}")
\ No newline at end of file
+        out_path = FRAME_WRITER.submit(image, suffix='_detected', force=True)
+        if out_path:
+            log.info(f"save image with draw detections: {out_path}")
+        return out_path
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Drop-in replacements for CameraManager and DetectionModel backed by the vision daemon.
+
+The daemon already ran the model on every frame it hands out, so the pair
+works together: ServiceCamera.capture_image() takes a snapshot (frame plus
+its detections) and ServiceDetectionModel.inference() answers for the frame
+the camera returned last, without running a model in this process.
+"""
+import numpy as np
+import torch
+from typing import Dict, List, Tuple
+
+from ultralytics.engine.results import Results
+from ..camera.decode import reduce_frame
+from ..camera.frame_writer import FRAME_WRITER
+from ..detection.main import DetectionModelInterface
+from .client import VisionClient
+
+
+class ServiceCamera:
+    """CameraManager interface (width, height, capture_image) over VisionClient.snapshot()"""
+
+    def __init__(self, client: VisionClient, timeout: float = 5.0):
+        self.client = client
+        self.timeout = timeout
+        self.width = client.width
+        self.height = client.height
+        self.last_image = None
+        self.last_detections: List[dict] = []
+        self.last_scale = 1.0
+        self.last_timestamp = None
+
+    def capture_image(self, save: bool = True, reduction: int = 1):
+        """like CameraManager.capture_image; the frame is captured after the call"""
+        snapshot = self.client.snapshot(self.timeout)
+        if snapshot is None:
+            print("ERROR: el servicio de visión no entregó imagen")
+            return None, None
+        frame = snapshot['frame']
+        path = FRAME_WRITER.submit(frame.copy()) if save else None
+        image = reduce_frame(frame, reduction)
+        self.last_image = image
+        self.last_detections = snapshot['detections']
+        self.last_scale = image.shape[1] / frame.shape[1]
+        self.last_timestamp = snapshot['timestamp']
+        return image, path
+
+
+class ServiceDetectionModel(DetectionModelInterface):
+    """detections the daemon computed for the frame ServiceCamera returned last"""
+
+    def __init__(self, camera: ServiceCamera):
+        self.camera = camera
+        # the daemon's inference size; imgsz arguments cannot change it
+        self.imgsz = camera.client.imgsz
+        self.dynamic_input = False
+        self.names: Dict[int, str] = camera.client.names
+
+    def inference(self, image: np.ndarray, imgsz: int = None, conf: float = None) -> Tuple[list, Dict[int, str]]:
+        if image is not self.camera.last_image:
+            raise ValueError("ServiceDetectionModel only answers for the last frame of its ServiceCamera")
+        conf = conf or 0.55
+        rows = [d['box'] + [d['conf'], d['class_id']] for d in self.camera.last_detections if d['conf'] >= conf]
+        boxes = torch.tensor(rows, dtype=torch.float32).reshape(-1, 6)
+        boxes[:, :4] *= self.camera.last_scale
+        return [Results(image, path='', names=self.names, boxes=boxes)], self.names
@@ -0,0 +1,173 @@
+import time
+import socket
+import logging as log
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .protocol import SOCKET_PATH, encode, LineReader, FrameRing
+
+
+class VisionClient:
+    """
+    Connection to the vision daemon.
+
+    After connect() `info` describes the camera and the model (size, class
+    names, shared-memory ring). Events are read with recv()/events(); frames
+    referenced by an event are copied out of shared memory with read_frame().
+    Timestamps are time.monotonic() of the daemon, comparable with this
+    process's time.monotonic() (same machine).
+    """
+
+    def __init__(self, socket_path: str = SOCKET_PATH):
+        self.socket_path = socket_path
+        self.sock: Optional[socket.socket] = None
+        self.reader: Optional[LineReader] = None
+        self.ring: Optional[FrameRing] = None
+        self.info: dict = {}
+        self.names: Dict[int, str] = {}
+        self._pending = deque()
+
+    def connect(self, timeout: float = 2.0) -> 'VisionClient':
+        """raises OSError if the daemon is not running"""
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(self.socket_path)
+        self.reader = LineReader(self.sock)
+        hello = self.reader.read()
+        if hello is None or hello.get('type') != 'info':
+            self.close()
+            raise ConnectionError("vision service did not answer with its info")
+        self.sock.settimeout(None)
+        self.info = hello['data']
+        self.names = {int(k): v for k, v in self.info['names'].items()}
+        self.ring = FrameRing(self.info['shm'], self.info['slots'])
+        return self
+
+    @property
+    def width(self) -> int:
+        return self.info['width']
+
+    @property
+    def height(self) -> int:
+        return self.info['height']
+
+    @property
+    def imgsz(self) -> int:
+        return self.info['imgsz']
+
+    def subscribe(self, frames: bool = False, detections: bool = True, with_frames: bool = False,
+                  classes: List[str] = None, min_conf: float = 0.0, every: int = 1):
+        """
+        :param frames: every captured frame ('frame' events), independent of detection
+        :param detections: detection results ('detections' events, one per analysed frame)
+        :param with_frames: detection events carry the analysed frame in shared memory
+        :param classes: only detections of these classes (None: all)
+        :param min_conf: only detections at least this confident
+        :param every: deliver one of every N events of each kind
+        """
+        self._send('subscribe', {'frames': frames, 'detections': detections, 'with_frames': with_frames,
+                                 'classes': classes, 'min_conf': min_conf, 'every': every})
+
+    def unsubscribe(self):
+        self._send('unsubscribe')
+
+    def recv(self, timeout: float = None) -> Optional[dict]:
+        """next event {'type', 'data'}; None on timeout or when the daemon went away"""
+        if self._pending:
+            return self._pending.popleft()
+        self.sock.settimeout(timeout)
+        try:
+            return self.reader.read()
+        except socket.timeout:
+            return None
+        finally:
+            self.sock.settimeout(None)
+
+    def events(self, timeout: float = None) -> Iterator[dict]:
+        """subscribed events until the daemon goes away (or nothing arrives for `timeout` s)"""
+        while True:
+            message = self.recv(timeout)
+            if message is None:
+                return
+            yield message
+
+    def read_frame(self, event_data: dict, out: np.ndarray = None) -> Optional[np.ndarray]:
+        """
+        copy of the frame of a 'frame', 'detections' (with_frames) or 'snapshot' event
+
+        None if the event has no frame or the ring already reused its slot (the
+        client fell more than `slots` frames behind).
+        """
+        if event_data.get('slot') is None:
+            return None
+        return self.ring.read(event_data['slot'], event_data['seq'], out)
+
+    def snapshot(self, timeout: float = 5.0) -> Optional[dict]:
+        """
+        detections and frame of the next frame captured after this call
+
+        :return: snapshot data with 'frame' (full resolution) added, None on timeout
+        Subscribed events that arrive meanwhile are kept for recv().
+        """
+        self._send('snapshot')
+        deadline = time.monotonic() + timeout
+        skipped = []
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.sock.settimeout(remaining)
+                try:
+                    message = self.reader.read()
+                except socket.timeout:
+                    return None
+                if message is None:
+                    return None
+                if message['type'] != 'snapshot':
+                    skipped.append(message)
+                    continue
+                data = message['data']
+                data['frame'] = self.read_frame(data)
+                return data if data['frame'] is not None else None
+        finally:
+            self.sock.settimeout(None)
+            self._pending.extend(skipped)
+
+    def _send(self, message_type: str, data: dict = None):
+        self.sock.sendall(encode(message_type, data))
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def connect_vision(socket_path: str = SOCKET_PATH, timeout: float = 2.0) -> Optional[VisionClient]:
+    """client of the running vision daemon, None when there is none (callers open their own camera)"""
+    try:
+        return VisionClient(socket_path).connect(timeout)
+    except (OSError, ValueError) as e:
+        log.debug(f"vision service not available at {socket_path}: {e}")
+        return None
+
+
+def detection_arrays(detections: List[dict]):
+    """service detections -> (N x 4 xyxy, confidences, class ids, class names), like a Results' boxes"""
+    if not detections:
+        return np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int), []
+    return (np.array([d['box'] for d in detections], dtype=np.float64),
+            np.array([d['conf'] for d in detections], dtype=np.float64),
+            np.array([d['class_id'] for d in detections], dtype=int),
+            [d['class'] for d in detections])
@@ -0,0 +1,375 @@
+"""
+Vision daemon: the only process that opens the camera and loads the model.
+
+    python -m perception.vision.service [--width 1280 --height 720 --fps 15 --variant NAME]
+
+Entry points (main.py, serial_manager, test_detection_web.py,
+test_detection_realtime.py) connect to it with VisionClient when it is
+running and fall back to their own camera and model when it is not.
+
+Threads:
+    capture    reads the CameraStream and keeps only the newest frame; when
+               clients subscribed to raw frames, decodes it at full
+               resolution into the shared ring and announces it.
+    detection  always runs on the newest frame (older ones are skipped),
+               decoded at reduced DCT scale for the model; boxes are sent in
+               full-resolution pixels. Clients that asked for paired frames
+               (or a snapshot) get the analysed frame in the ring too.
+    accept     one reader thread per client for its requests, one sender
+               thread per client draining a bounded queue: a slow client
+               loses messages, it never stalls the pipeline.
+"""
+import os
+import time
+import queue
+import socket
+import argparse
+import threading
+import logging as log
+from typing import Dict, List, Optional
+
+from telemetry.metrics import METRICS
+from .protocol import SOCKET_PATH, SHM_NAME, DEFAULT_SLOTS, encode, LineReader, FrameRing
+from ..camera.stream import CameraStream
+from ..camera.decode import decode_frame, reduction_for
+
+# confidence floor of the daemon's model: clients filter above it with min_conf
+SERVICE_CONF = 0.25
+CLIENT_QUEUE = 16
+
+
+class _Client:
+    """connection state: subscription filters and the outgoing queue"""
+
+    def __init__(self, sock: socket.socket, address: str):
+        self.sock = sock
+        self.address = address
+        self.queue = queue.Queue(maxsize=CLIENT_QUEUE)
+        self.frames = False
+        self.detections = False
+        self.with_frames = False
+        self.classes = None
+        self.min_conf = 0.0
+        self.every = 1
+        self.snapshots = []  # request times (time.monotonic) of pending snapshots
+        self.counters = {'frame': 0, 'detections': 0}
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.closed = False
+
+    def subscribe(self, data: dict):
+        self.frames = bool(data.get('frames', False))
+        self.detections = bool(data.get('detections', True))
+        self.with_frames = bool(data.get('with_frames', False))
+        classes = data.get('classes')
+        self.classes = set(classes) if classes else None
+        self.min_conf = float(data.get('min_conf', 0.0))
+        self.every = max(1, int(data.get('every', 1)))
+        self.counters = {'frame': 0, 'detections': 0}
+
+    def filter(self, detections: List[dict]) -> List[dict]:
+        return [d for d in detections if d['conf'] >= self.min_conf
+                and (self.classes is None or d['class'] in self.classes)]
+
+    def due(self, kind: str) -> bool:
+        """subsampling of subscribed events (every N-th of each kind)"""
+        self.counters[kind] += 1
+        return (self.counters[kind] - 1) % self.every == 0
+
+    def request_snapshot(self):
+        with self.lock:
+            self.snapshots.append(time.monotonic())
+
+    def take_snapshot(self, timestamp: float) -> bool:
+        """consume the oldest snapshot request made before a frame captured at `timestamp`"""
+        with self.lock:
+            if not self.snapshots or self.snapshots[0] > timestamp:
+                return False
+            self.snapshots.pop(0)
+            return True
+
+    def send(self, payload: bytes):
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            self.dropped += 1
+
+
+class VisionService:
+    def __init__(self, socket_path: str = SOCKET_PATH, width: int = 1280, height: int = 720, fps: int = 15,
+                 variant: str = None, flip: bool = True, camera_index: int = 0, slots: int = DEFAULT_SLOTS,
+                 shm_name: str = SHM_NAME):
+        """
+        :param socket_path: Unix socket the clients connect to
+        :param variant: detection model variant (default: ModelLoader's choice for this host)
+        :param slots: frames kept in shared memory; a client has about slots / fps seconds to copy a frame
+        """
+        self.socket_path = socket_path
+        self.camera = CameraStream(width, height, fps, flip, camera_index)
+        self.variant = variant
+        self.slots = slots
+        self.shm_name = shm_name
+        self.detector = None
+        self.ring = None
+        self.server = None
+        self.clients: List[_Client] = []
+        self._clients_lock = threading.Lock()
+        self._stop = threading.Event()
+        # newest captured frame: (seq, timestamp, data, full-resolution frame or None)
+        self._latest = None
+        self._latest_cond = threading.Condition()
+        self._ring_lock = threading.Lock()
+        self._next_slot = 0
+        self._written: Dict[int, int] = {}  # seq -> slot of frames currently in the ring
+        self.names: Dict[int, str] = {}
+
+    # --- lifecycle ---
+    def start(self):
+        from ..detection.main import DetectionModel
+        self.detector = DetectionModel(self.variant)
+        self.names = {int(k): v for k, v in self.detector.object_model.names.items()}
+        self.ring = FrameRing(self.shm_name, self.slots, (self.camera.height, self.camera.width, 3), create=True)
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen(8)
+
+        for target, name in ((self._capture_loop, 'vision-capture'), (self._detection_loop, 'vision-detection'),
+                             (self._accept_loop, 'vision-accept')):
+            threading.Thread(target=target, name=name, daemon=True).start()
+        log.info(f"vision service on {self.socket_path} (shm {self.shm_name}, {self.slots} slots)")
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        self._stop.set()
+        self.camera.close()
+        with self._latest_cond:
+            self._latest_cond.notify_all()
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        with self._clients_lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            self._drop(client)
+        if self.ring is not None:
+            with self._ring_lock:
+                self.ring.close()
+                self.ring = None
+
+    def info(self) -> dict:
+        return {
+            'width': self.camera.width, 'height': self.camera.height, 'fps': self.camera.fps,
+            'imgsz': self.detector.imgsz, 'names': self.names, 'shm': self.shm_name, 'slots': self.slots,
+            'pid': os.getpid(),
+        }
+
+    # --- pipeline ---
+    def _capture_loop(self):
+        seq = 0
+        for timestamp, data in self.camera.frames():
+            if self._stop.is_set():
+                break
+            seq += 1
+            METRICS.inc('service_frames')
+            full = None
+            subscribers = [c for c in self._client_list() if c.frames]
+            if subscribers:
+                with METRICS.time('decode', {'reduction': 1}):
+                    full = decode_frame(data, 1)
+                slot = self._store(seq, timestamp, full)
+                for client in subscribers:
+                    if client.due('frame'):
+                        client.send(encode('frame', {'seq': seq, 'slot': slot, 'timestamp': timestamp}))
+            with self._latest_cond:
+                self._latest = (seq, timestamp, data, full)
+                self._latest_cond.notify_all()
+        log.warning("camera stream ended")
+        self._stop.set()
+
+    def _detection_loop(self):
+        done = 0
+        width, height = self.camera.width, self.camera.height
+        reduction = reduction_for(width, height, self.detector.imgsz)
+        while not self._stop.is_set():
+            with self._latest_cond:
+                while not self._stop.is_set() and (self._latest is None or self._latest[0] == done):
+                    self._latest_cond.wait(0.5)
+                if self._stop.is_set():
+                    return
+                seq, timestamp, data, full = self._latest
+            done = seq
+
+            with METRICS.time('decode', {'reduction': reduction}):
+                frame = decode_frame(data, reduction)
+            if frame is None:
+                continue
+            start = time.perf_counter()
+            with METRICS.time('inference'):
+                results, names = self.detector.inference(frame, conf=SERVICE_CONF)
+                detections = _to_dicts(results, names, width / frame.shape[1], height / frame.shape[0])
+            latency = (time.perf_counter() - start) * 1000
+            METRICS.inc('service_detections')
+
+            clients = self._client_list()
+            paired = [c for c in clients if c.snapshots or (c.detections and c.with_frames)]
+            slot = None
+            if paired:
+                slot = self._written.get(seq)
+                if slot is None:
+                    if full is None:
+                        full = decode_frame(data, 1)
+                    slot = self._store(seq, timestamp, full)
+
+            message = {'seq': seq, 'timestamp': timestamp, 'latency': latency, 'shape': [height, width]}
+            for client in clients:
+                if client.take_snapshot(timestamp):
+                    client.send(encode('snapshot', dict(message, slot=slot, detections=client.filter(detections))))
+                if client.detections and client.due('detections'):
+                    client.send(encode('detections', dict(message, slot=slot if client.with_frames else None,
+                                                          detections=client.filter(detections))))
+
+    def _store(self, seq: int, timestamp: float, frame) -> Optional[int]:
+        with self._ring_lock:
+            if self.ring is None:
+                return None
+            slot = self._next_slot
+            self._next_slot = (slot + 1) % self.slots
+            self._written = {s: k for s, k in self._written.items() if k != slot}
+            self.ring.write(slot, seq, timestamp, frame)
+            self._written[seq] = slot
+            return slot
+
+    # --- clients ---
+    def _client_list(self) -> List[_Client]:
+        with self._clients_lock:
+            return list(self.clients)
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                return
+            client = _Client(sock, f"client-{sock.fileno()}")
+            client.send(encode('info', self.info()))
+            with self._clients_lock:
+                self.clients.append(client)
+            threading.Thread(target=self._client_reader, args=(client,), name=f'{client.address}-rx',
+                             daemon=True).start()
+            threading.Thread(target=self._client_sender, args=(client,), name=f'{client.address}-tx',
+                             daemon=True).start()
+            log.info(f"{client.address} connected ({len(self.clients)} clients)")
+
+    def _client_reader(self, client: _Client):
+        reader = LineReader(client.sock)
+        try:
+            while True:
+                message = reader.read()
+                if message is None:
+                    break
+                kind, data = message.get('type'), message.get('data') or {}
+                if kind == 'subscribe':
+                    client.subscribe(data)
+                elif kind == 'unsubscribe':
+                    client.frames = client.detections = False
+                elif kind == 'snapshot':
+                    client.request_snapshot()
+                elif kind == 'info':
+                    client.send(encode('info', self.info()))
+                else:
+                    client.send(encode('error', {'message': f"unknown request {kind!r}"}))
+        except ConnectionResetError:
+            pass  # client closed with replies still unread
+        except (OSError, ValueError) as e:
+            log.warning(f"{client.address}: {e}")
+        finally:
+            self._drop(client)
+
+    def _client_sender(self, client: _Client):
+        while True:
+            payload = client.queue.get()
+            if payload is None:
+                return
+            try:
+                client.sock.sendall(payload)
+            except OSError:
+                self._drop(client)
+                return
+
+    def _drop(self, client: _Client):
+        with self._clients_lock:
+            if client.closed:
+                return
+            client.closed = True
+            if client in self.clients:
+                self.clients.remove(client)
+        try:
+            client.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        client.sock.close()
+        try:
+            client.queue.put_nowait(None)
+        except queue.Full:
+            # sender is blocked or gone: make room for the stop marker
+            try:
+                client.queue.get_nowait()
+            except queue.Empty:
+                pass
+            client.queue.put_nowait(None)
+        log.info(f"{client.address} disconnected ({client.dropped} messages dropped)")
+
+
+def _to_dicts(results, names, scale_x: float, scale_y: float) -> List[dict]:
+    """Results of one frame -> JSON-able detections in full-resolution pixels"""
+    detections = []
+    for result in results:
+        if result.boxes is None or len(result.boxes) == 0:
+            continue
+        xyxy = result.boxes.xyxy.cpu().numpy()
+        confs = result.boxes.conf.cpu().numpy()
+        classes = result.boxes.cls.cpu().numpy().astype(int)
+        for box, conf, class_id in zip(xyxy, confs, classes):
+            detections.append({
+                'class': names[class_id],
+                'class_id': int(class_id),
+                'conf': float(conf),
+                'box': [float(box[0] * scale_x), float(box[1] * scale_y),
+                        float(box[2] * scale_x), float(box[3] * scale_y)],
+            })
+    return detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vision daemon: one camera and one model shared by every client")
+    parser.add_argument('--socket', default=SOCKET_PATH)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--fps', type=int, default=15)
+    parser.add_argument('--variant', default=None, help='detection model variant (default: best for this host)')
+    parser.add_argument('--camera-index', type=int, default=0, help='OpenCV camera when rpicam-vid is missing')
+    parser.add_argument('--no-flip', action='store_true', help='camera not mounted upside down')
+    parser.add_argument('--slots', type=int, default=DEFAULT_SLOTS)
+    args = parser.parse_args()
+
+    log.basicConfig(level=log.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    VisionService(args.socket, args.width, args.height, args.fps, args.variant, not args.no_flip,
+                  args.camera_index, args.slots).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
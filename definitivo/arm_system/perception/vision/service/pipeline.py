@@ -0,0 +1,273 @@
+"""
+Capture, inference and annotation in separate processes.
+
+In one CPython process the three stages compete for the GIL and a Pi 5
+runs them on one core at a time. Here each stage is a process and frames
+move between them through shared-memory slots (SlotPool): the producer
+writes a slot and hands its index over a queue, the consumer works on a
+zero-copy NumPy view and gives the slot back. A slot is never written while
+its consumer holds it, so no copy is needed to protect against tearing.
+Producers never wait: with no free slot the frame is skipped for that
+consumer, and a consumer that fell behind jumps to the newest frame.
+
+    capture   CameraStream -> decode at 1/N for the model -> detect pool
+                           -> decode full resolution     -> display pool
+    inference detect pool  -> DetectionModel -> detections queue (boxes in full-res px)
+    encode    display pool + latest overlay state -> draw -> JPEG queue
+
+The owner (e.g. the Flask process with the arm controller) reads
+detections(), sends overlay state with set_overlay() and serves jpeg().
+Processes are forked: start the pipeline before opening hardware or
+starting threads in the owner.
+"""
+import time
+import queue
+import logging as log
+import multiprocessing as mp
+from typing import Callable, Optional
+
+import numpy as np
+
+from .protocol import FrameRing
+
+SLOTS_PER_POOL = 3
+
+
+class SlotPool:
+    """
+    FrameRing whose slots are owned by one process at a time (producer -> consumer -> free)
+
+    Shared with forked children, which inherit the mapping of the segment.
+    """
+
+    def __init__(self, ctx, name: str, max_shape, slots: int = SLOTS_PER_POOL):
+        self.name = name
+        self.slots = slots
+        self.ring = FrameRing(name, slots, max_shape, create=True)
+        self.free = ctx.Queue()
+        self.ready = ctx.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+
+    # --- producer ---
+    def acquire(self) -> Optional[int]:
+        """a free slot, None if the consumer holds all of them (skip this frame)"""
+        try:
+            return self.free.get_nowait()
+        except queue.Empty:
+            return None
+
+    def publish(self, slot: int, seq: int, timestamp: float, frame: np.ndarray, meta: dict = None):
+        self.ring.write(slot, seq, timestamp, frame)
+        self.ready.put((slot, seq, timestamp, meta or {}))
+
+    # --- consumer ---
+    def get(self, timeout: float = None):
+        """
+        newest ready frame: (slot, seq, timestamp, meta, view), None on timeout
+
+        Older ready frames are released unread. The view aliases shared memory
+        and stays valid until release(slot).
+        """
+        try:
+            item = self.ready.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        while True:
+            try:
+                newer = self.ready.get_nowait()
+            except queue.Empty:
+                break
+            self.release(item[0])
+            item = newer
+        slot, seq, timestamp, meta = item
+        header = self.ring.headers[slot]
+        shape = (int(header['height']), int(header['width']), int(header['channels']))
+        view = self.ring.data[slot, :shape[0] * shape[1] * shape[2]].reshape(shape)
+        return slot, seq, timestamp, meta, view
+
+    def release(self, slot: int):
+        self.free.put(slot)
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+def _put_latest(q, item):
+    """non-blocking put that replaces the oldest item when the queue is full"""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def capture_worker(camera_args: dict, reduction: int, detect: SlotPool, display: SlotPool, stop):
+    from ..camera.stream import CameraStream
+    from ..camera.decode import decode_frame
+
+    camera = CameraStream(**camera_args)
+    seq = 0
+    try:
+        for timestamp, data in camera.frames():
+            if stop.is_set():
+                break
+            seq += 1
+            slot = detect.acquire()
+            if slot is not None:
+                frame = decode_frame(data, reduction)
+                if frame is None:
+                    detect.release(slot)
+                else:
+                    detect.publish(slot, seq, timestamp, frame)
+            slot = display.acquire()
+            if slot is not None:
+                frame = decode_frame(data, 1)
+                if frame is None:
+                    display.release(slot)
+                    continue
+                display.publish(slot, seq, timestamp, frame)
+    finally:
+        camera.close()
+
+
+def inference_worker(variant: Optional[str], classes: Optional[list], imgsz: Optional[int], conf: float,
+                     scale: float, detect: SlotPool, detections, stop):
+    from ..detection.main import DetectionModel
+
+    # same variant selection, class filter and preallocated letterbox as the daemon and the scans
+    detector = DetectionModel(variant, classes)
+    names = detector.object_model.names
+    while not stop.is_set():
+        item = detect.get(timeout=0.5)
+        if item is None:
+            continue
+        slot, seq, timestamp, _, view = item
+        try:
+            start = time.perf_counter()
+            results, _ = detector.inference(view, imgsz=imgsz, conf=conf)
+            result = next(iter(results))
+            latency = (time.perf_counter() - start) * 1000
+        finally:
+            # the letterbox already copied the frame into the input tensor
+            detect.release(slot)
+        boxes = result.boxes
+        if boxes is not None and len(boxes) > 0:
+            bboxes = boxes.xyxy.cpu().numpy() * scale
+            confs = boxes.conf.cpu().numpy()
+            classes = boxes.cls.cpu().numpy().astype(int)
+        else:
+            bboxes, confs, classes = np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int)
+        _put_latest(detections, {'seq': seq, 'timestamp': timestamp, 'latency': latency, 'names': names,
+                                 'boxes': bboxes, 'confs': confs, 'classes': classes})
+
+
+def encode_worker(draw: Callable, quality: int, display: SlotPool, overlay, jpegs, stop):
+    import cv2
+
+    state = None
+    while not stop.is_set():
+        item = display.get(timeout=0.5)
+        if item is None:
+            continue
+        slot, seq, timestamp, _, view = item
+        try:
+            while True:
+                try:
+                    state = overlay.get_nowait()
+                except queue.Empty:
+                    break
+            # drawn in place: the slot belongs to this process until released
+            draw(view, state)
+            ok, buffer = cv2.imencode('.jpg', view, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        finally:
+            display.release(slot)
+        if ok:
+            _put_latest(jpegs, (seq, timestamp, buffer.tobytes()))
+
+
+class VisionPipeline:
+    """capture / inference / encode processes connected by SlotPools (see module docstring)"""
+
+    def __init__(self, variant: str = None, width: int = 1280, height: int = 720, fps: int = 15, imgsz: int = None,
+                 conf: float = 0.45, reduction: int = 1, draw: Callable = None, jpeg_quality: int = 75,
+                 flip: bool = True, name: str = 'arm_pipeline', classes: list = None):
+        """
+        :param variant: manifest variant loaded in the inference process by DetectionModel
+                        (default: ARM_MODEL_VARIANT or the fastest accurate one for this CPU)
+        :param imgsz: inference size (default: the variant's; fixed-shape exports only use their own)
+        :param classes: class names to detect (default: ARM_DETECT_CLASSES)
+        :param reduction: DCT scale of the frames given to the model (boxes are returned in full-res pixels)
+        :param draw: draw(frame, overlay_state) run in the encode process on the full-res frame
+                     (overlay_state: last set_overlay() value, None before the first)
+        """
+        self.ctx = mp.get_context('fork')
+        self.camera_args = {'width': width, 'height': height, 'fps': fps, 'flip': flip}
+        self.variant = variant
+        self.classes = classes
+        self.imgsz = imgsz
+        self.conf = conf
+        self.reduction = reduction
+        self.draw = draw or (lambda frame, state: None)
+        self.jpeg_quality = jpeg_quality
+        self.name = name
+        self.stop = self.ctx.Event()
+        self.detect = self.display = None
+        self.detections_queue = self.ctx.Queue(maxsize=2)
+        self.overlay_queue = self.ctx.Queue(maxsize=2)
+        self.jpeg_queue = self.ctx.Queue(maxsize=2)
+        self.processes = []
+
+    def start(self) -> 'VisionPipeline':
+        width, height = self.camera_args['width'], self.camera_args['height']
+        small = (-(-height // self.reduction), -(-width // self.reduction), 3)
+        self.detect = SlotPool(self.ctx, f'{self.name}_detect', small)
+        self.display = SlotPool(self.ctx, f'{self.name}_display', (height, width, 3))
+        workers = (
+            ('capture', capture_worker, (self.camera_args, self.reduction, self.detect, self.display, self.stop)),
+            ('inference', inference_worker, (self.variant, self.classes, self.imgsz, self.conf,
+                                             float(self.reduction), self.detect, self.detections_queue, self.stop)),
+            ('encode', encode_worker, (self.draw, self.jpeg_quality, self.display, self.overlay_queue,
+                                       self.jpeg_queue, self.stop)),
+        )
+        for name, target, args in workers:
+            process = self.ctx.Process(target=target, args=args, name=f'{self.name}-{name}', daemon=True)
+            process.start()
+            self.processes.append(process)
+        log.info(f"vision pipeline: {', '.join(p.name for p in self.processes)}")
+        return self
+
+    def detections(self, timeout: float = None) -> Optional[dict]:
+        """next detection result {'seq', 'timestamp', 'latency', 'names', 'boxes', 'confs', 'classes'}"""
+        try:
+            return self.detections_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def set_overlay(self, state):
+        """state passed to draw() for the following frames"""
+        _put_latest(self.overlay_queue, state)
+
+    def jpeg(self, timeout: float = None):
+        """next annotated frame (seq, timestamp, JPEG bytes), None on timeout"""
+        try:
+            return self.jpeg_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.stop.set()
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        for pool in (self.detect, self.display):
+            if pool is not None:
+                pool.close()
@@ -0,0 +1,145 @@
+"""
+Wire format of the vision service.
+
+Control and detection messages travel over a Unix stream socket as one JSON
+object per line, {'type': ..., 'data': {...}}, like the VEX serial protocol.
+Frames never go through the socket: the daemon copies them into a ring of
+slots in shared memory and messages only carry (seq, slot). Every slot has a
+header with the sequence number of the frame it holds; it is zeroed while
+the slot is being rewritten, so a reader that finds the same sequence number
+before and after its copy knows the copy is consistent (a seqlock). A reader
+that is too slow finds another frame's number and gets None instead of a torn
+frame.
+"""
+import os
+import json
+import socket
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+SOCKET_PATH = os.environ.get('ARM_VISION_SOCKET', '/tmp/arm_vision.sock')
+SHM_NAME = os.environ.get('ARM_VISION_SHM', 'arm_vision_frames')
+DEFAULT_SLOTS = 4
+
+SLOT_HEADER = np.dtype([('seq', '<u8'), ('timestamp', '<f8'), ('height', '<u4'), ('width', '<u4'),
+                        ('channels', '<u4'), ('pad', '<u4')])
+
+
+def encode(message_type: str, data: dict = None) -> bytes:
+    return json.dumps({'type': message_type, 'data': data or {}}).encode() + b'\n'
+
+
+class LineReader:
+    """newline-delimited JSON messages from a socket"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.buffer = bytearray()
+
+    def read(self) -> Optional[dict]:
+        """next message; None when the peer closed the connection (socket timeouts propagate)"""
+        while True:
+            end = self.buffer.find(b'\n')
+            if end != -1:
+                line = bytes(self.buffer[:end])
+                del self.buffer[:end + 1]
+                if line.strip():
+                    return json.loads(line)
+                continue
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                return None
+            self.buffer += chunk
+
+
+class FrameRing:
+    """
+    Ring of frame slots in shared memory.
+
+    One writer (the daemon) and any number of readers. Slots are sized for
+    `max_shape` frames; smaller frames are stored in the top-left of the slot
+    buffer with their shape in the header.
+    """
+
+    def __init__(self, name: str = SHM_NAME, slots: int = DEFAULT_SLOTS, max_shape: Tuple[int, int, int] = None,
+                 create: bool = False):
+        """
+        :param name: shared memory segment name
+        :param slots: number of frames kept (only used when creating)
+        :param max_shape: (height, width, channels) of the largest frame (only used when creating)
+        :param create: create the segment (daemon) instead of attaching to it (clients)
+        """
+        self.name = name
+        self.owner = create
+        if create:
+            h, w, c = max_shape
+            self.slot_bytes = h * w * c
+            size = slots * (SLOT_HEADER.itemsize + self.slot_bytes)
+            try:
+                self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+            except FileExistsError:
+                # left behind by a daemon that did not exit cleanly
+                stale = shared_memory.SharedMemory(name)
+                stale.close()
+                stale.unlink()
+                self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+            self.slots = slots
+        else:
+            self.shm = _attach(name)
+            self.slots = slots
+            self.slot_bytes = self.shm.size // slots - SLOT_HEADER.itemsize
+        self.headers = np.ndarray((self.slots,), dtype=SLOT_HEADER, buffer=self.shm.buf)
+        self.data = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf,
+                               offset=self.slots * SLOT_HEADER.itemsize)
+        if create:
+            self.headers[:] = 0
+
+    def write(self, slot: int, seq: int, timestamp: float, frame: np.ndarray):
+        """store `frame` (uint8, C-contiguous or not) as frame number `seq` (> 0)"""
+        header = self.headers[slot]
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+        if h * w * c > self.slot_bytes:
+            raise ValueError(f"frame {frame.shape} does not fit a {self.slot_bytes} byte slot")
+        self.headers['seq'][slot] = 0
+        np.copyto(self.data[slot, :h * w * c].reshape(frame.shape), frame)
+        header['timestamp'], header['height'], header['width'], header['channels'] = timestamp, h, w, c
+        self.headers['seq'][slot] = seq
+
+    def read(self, slot: int, seq: int, out: np.ndarray = None) -> Optional[np.ndarray]:
+        """copy of frame `seq` from `slot`, None if it has been (or is being) overwritten"""
+        if not 0 <= slot < self.slots or int(self.headers['seq'][slot]) != seq:
+            return None
+        header = self.headers[slot].copy()
+        shape = (int(header['height']), int(header['width']), int(header['channels']))
+        view = self.data[slot, :shape[0] * shape[1] * shape[2]].reshape(shape)
+        if out is None or out.shape != shape:
+            out = np.empty(shape, dtype=np.uint8)
+        np.copyto(out, view)
+        if int(self.headers['seq'][slot]) != seq:
+            return None
+        return out
+
+    def close(self):
+        # views into the buffer must go before the mapping can be closed
+        self.headers = self.data = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """attach without registering the segment with this process's resource tracker"""
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # Python < 3.13: the tracker would unlink the daemon's segment when this client exits
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
@@ -0,0 +1,85 @@
+"""
+Background loading of slow resources while the menu is already usable.
+
+Each resource (serial link, camera + detector, ...) is loaded by its own
+daemon thread, so they load in parallel and a slow one never delays the
+others or the menu. Consumers ask for the result when they first need it:
+result() returns at once if loading finished and otherwise waits for it,
+instead of starting a second load. status() is the readiness state shown
+to the operator.
+"""
+import logging as log
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+from telemetry.startup import STARTUP
+
+
+class Preloader:
+    def __init__(self):
+        self._tasks: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, loader: Callable, *args, **kwargs) -> Future:
+        """start loading `name` with loader(*args, **kwargs) in a background thread"""
+        future = Future()
+        with self._lock:
+            self._tasks[name] = future
+
+        def run():
+            future.set_running_or_notify_cancel()
+            try:
+                with STARTUP.phase(f'preload {name}'):
+                    value = loader(*args, **kwargs)
+            except BaseException as e:
+                log.warning(f"preload of {name} failed: {e}")
+                future.set_exception(e)
+            else:
+                log.info(f"preload of {name} ready")
+                future.set_result(value)
+
+        threading.Thread(target=run, name=f'preload-{name}', daemon=True).start()
+        return future
+
+    def has(self, name: str) -> bool:
+        with self._lock:
+            return name in self._tasks
+
+    def ready(self, name: str) -> bool:
+        """finished (successfully or not)"""
+        with self._lock:
+            future = self._tasks.get(name)
+        return future is not None and future.done()
+
+    def status(self) -> Dict[str, str]:
+        """'loading', 'ready' or 'failed' per resource"""
+        with self._lock:
+            tasks = dict(self._tasks)
+        return {name: ('loading' if not f.done() else 'failed' if f.exception() is not None else 'ready')
+                for name, f in tasks.items()}
+
+    def result(self, name: str, timeout: Optional[float] = None):
+        """
+        loaded value of `name`, waiting for it if still loading
+
+        Raises the loader's exception if it failed, KeyError if `name` was never submitted,
+        and concurrent.futures.TimeoutError if it is not ready within `timeout` seconds.
+        """
+        with self._lock:
+            future = self._tasks[name]
+        if not future.done():
+            log.info(f"waiting for {name} to finish loading...")
+        return future.result(timeout)
+
+    def take(self, name: str, timeout: Optional[float] = None):
+        """result() and forget the finished task, so a later load of `name` starts from scratch"""
+        with self._lock:
+            future = self._tasks[name]
+        try:
+            return self.result(name, timeout)
+        finally:
+            if future.done():
+                with self._lock:
+                    if self._tasks.get(name) is future:
+                        del self._tasks[name]
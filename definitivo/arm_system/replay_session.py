@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+REPRODUCCIÓN DE SESIONES - lee el registro binario de eventos (telemetry/event_log.py)
+y lo vuelca como texto/JSON o lo reproduce sobre el backend simulado con reloj virtual.
+
+Grabar una sesión:
+    ARM_EVENT_LOG=logs/events python main.py
+
+Uso:
+    python replay_session.py logs/events --listar
+    python replay_session.py logs/events --sesion 20261019-101500-4242 --json
+    python replay_session.py logs/events --replay
+"""
+import argparse
+import json
+import time
+import logging as log
+
+from control.reloj import RelojVirtual
+from control.robot_controller import ControladorRobotico
+from telemetry.event_log import EVENTS, list_sessions, read_session, session_start
+
+
+def formatear(evento) -> str:
+    """Una línea legible por evento"""
+    campos = ' '.join(f'{k}={json.dumps(v, default=str)}' for k, v in evento.fields.items())
+    return f"{evento.t:10.4f}s  {evento.subsystem}/{evento.event:<10} {campos}"
+
+
+def reproducir(eventos, mostrar: bool = False) -> dict:
+    """Aplicar los eventos de hardware sobre un ControladorRobotico simulado
+
+    El reloj virtual avanza hasta el instante de cada evento, de modo que los
+    movimientos del stepper consumen el mismo tiempo simulado que en la sesión.
+    """
+    reloj = RelojVirtual()
+    robot = ControladorRobotico(habilitar_stepper=True, reloj=reloj, simulado=True)
+    escritor = robot.controlador_servo.escritor
+    conteo = {}
+    try:
+        for evento in eventos:
+            if evento.t > reloj.ahora():
+                reloj.avanzar(evento.t - reloj.ahora())
+            clave = f'{evento.subsystem}/{evento.event}'
+            conteo[clave] = conteo.get(clave, 0) + 1
+            if clave == 'servo/write':
+                escritor.escribir(evento.fields['duties'])
+            elif clave == 'servo/off_all':
+                escritor.apagar_todos()
+            elif clave == 'stepper/move' and robot.controlador_stepper is not None:
+                robot.controlador_stepper.mover_pasos(evento.fields['steps'], evento.fields['direction'],
+                                                      evento.fields['speed'])
+            if mostrar:
+                print(formatear(evento))
+        duties = {canal: robot.controlador_servo.pca.channels[canal].duty_cycle
+                  for canal in sorted(p.canal for p in robot.controlador_servo.perfiles.values())}
+        posicion = robot.controlador_stepper.posicion_actual if robot.controlador_stepper else None
+    finally:
+        robot.cerrar()
+    return {
+        'eventos': conteo,
+        'duracion_s': reloj.ahora(),
+        'transacciones_i2c': escritor.transacciones,
+        'duties_finales': duties,
+        'posicion_stepper': posicion,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Volcado y reproducción del registro binario de eventos")
+    parser.add_argument('directorio', help="directorio de segmentos (ARM_EVENT_LOG)")
+    parser.add_argument('--sesion', help="id de sesión (por defecto la más reciente)")
+    parser.add_argument('--listar', action='store_true', help="listar las sesiones disponibles")
+    parser.add_argument('--json', action='store_true', help="volcar los eventos como JSON (una línea por evento)")
+    parser.add_argument('--replay', action='store_true', help="reproducir la sesión sobre el backend simulado")
+    parser.add_argument('--verbose', action='store_true', help="mostrar cada evento durante la reproducción")
+    args = parser.parse_args()
+
+    # La reproducción no debe grabarse a sí misma
+    EVENTS.close()
+
+    sesiones = list_sessions(args.directorio)
+    if args.listar:
+        for sesion in sesiones:
+            inicio = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(session_start(args.directorio, sesion)))
+            print(f"{sesion}  (inicio {inicio})")
+        return
+    if not sesiones:
+        print(f"❌ No hay sesiones en {args.directorio}")
+        return
+    sesion = args.sesion or sesiones[-1]
+    eventos = read_session(args.directorio, sesion)
+
+    if not args.replay:
+        for evento in eventos:
+            if args.json:
+                print(json.dumps(evento._asdict(), default=str))
+            else:
+                print(formatear(evento))
+        return
+
+    log.getLogger().setLevel(log.WARNING)
+    resultado = reproducir(eventos, mostrar=args.verbose)
+
+    print("=" * 60)
+    print(f"🔁 REPRODUCCIÓN DE SESIÓN {sesion}")
+    print("=" * 60)
+    for clave, n in sorted(resultado['eventos'].items()):
+        print(f"  {clave:<18} {n}")
+    print(f"  Duración simulada: {resultado['duracion_s']:.2f}s")
+    print(f"  Transacciones I2C: {resultado['transacciones_i2c']}")
+    print(f"  Duties finales:    {resultado['duties_finales']}")
+    print(f"  Posición stepper:  {resultado['posicion_stepper']}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+SIMULACIÓN DE CICLOS - escaneo → pick → place con reloj virtual
+Ejecuta miles de ciclos en segundos para medir tiempo de ciclo, throughput
+y fallos con distintos ajustes (velocidad del brazo, probabilidad de fallo).
+
+Uso:
+    python simular_ciclos.py --ciclos 2000 --velocidad-brazo 1500 --prob-fallo 0.01
+"""
+import argparse
+import random
+import statistics
+import time
+import logging as log
+
+from control.reloj import RelojVirtual
+from main import Robot
+
+
+class FalloSimulado(Exception):
+    """Fallo inyectado en un movimiento del brazo"""
+
+
+def _inyectar_fallos(robot: Robot, probabilidad: float, rng: random.Random):
+    """Envolver move_arm para que falle con la probabilidad indicada"""
+    if probabilidad <= 0:
+        return
+    move_arm = robot.robot_controller.move_arm
+
+    def move_arm_con_fallos(*args, **kwargs):
+        if rng.random() < probabilidad:
+            raise FalloSimulado("fallo simulado en move_arm")
+        return move_arm(*args, **kwargs)
+
+    robot.robot_controller.move_arm = move_arm_con_fallos
+
+
+def simular(ciclos: int, velocidad_brazo: int = 1000, prob_fallo: float = 0.0, semilla: int = 0) -> dict:
+    """Ejecutar `ciclos` ciclos completos y devolver estadísticas en tiempo simulado"""
+    reloj = RelojVirtual()
+    robot = Robot(reloj=reloj, simulado=True)
+    robot.arm_speed = velocidad_brazo
+    _inyectar_fallos(robot, prob_fallo, random.Random(semilla))
+
+    tiempos_ciclo = []
+    objetos = 0
+    fallos = 0
+    inicio_real = time.perf_counter()
+
+    for _ in range(ciclos):
+        t0 = reloj.ahora()
+        robot.handle_scan_command()
+        for objeto in list(robot.scan_results):
+            # execute_*_sequence capturan el error y ejecutan el protocolo de seguridad
+            if robot.execute_pick_sequence(objeto) and robot.execute_place_sequence(objeto):
+                objetos += 1
+            else:
+                fallos += 1
+        tiempos_ciclo.append(reloj.ahora() - t0)
+
+    duracion_simulada = reloj.ahora()
+    robot.robot_controller.close()
+    return {
+        'ciclos': ciclos,
+        'objetos': objetos,
+        'fallos': fallos,
+        'tiempo_simulado_s': duracion_simulada,
+        'tiempo_real_s': time.perf_counter() - inicio_real,
+        'ciclo_medio_s': statistics.mean(tiempos_ciclo) if tiempos_ciclo else 0.0,
+        'ciclo_max_s': max(tiempos_ciclo) if tiempos_ciclo else 0.0,
+        'objetos_por_hora': objetos / duracion_simulada * 3600 if duracion_simulada > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación de ciclos pick & place con reloj virtual")
+    parser.add_argument('--ciclos', type=int, default=1000)
+    parser.add_argument('--velocidad-brazo', type=int, default=1000, help="pasos/s del motor paso a paso")
+    parser.add_argument('--prob-fallo', type=float, default=0.0, help="probabilidad de fallo por movimiento del brazo")
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    # Los logs por movimiento dominarían el tiempo de simulación
+    log.getLogger().setLevel(log.CRITICAL)
+
+    resultado = simular(args.ciclos, args.velocidad_brazo, args.prob_fallo, args.semilla)
+
+    print("=" * 60)
+    print("📊 SIMULACIÓN DE CICLOS")
+    print("=" * 60)
+    print(f"  Ciclos:            {resultado['ciclos']}")
+    print(f"  Objetos colocados: {resultado['objetos']}")
+    print(f"  Fallos:            {resultado['fallos']}")
+    print(f"  Ciclo medio:       {resultado['ciclo_medio_s']:.2f}s (máx {resultado['ciclo_max_s']:.2f}s)")
+    print(f"  Throughput:        {resultado['objetos_por_hora']:.0f} objetos/hora")
+    print(f"  Tiempo simulado:   {resultado['tiempo_simulado_s'] / 3600:.2f}h")
+    print(f"  Tiempo real:       {resultado['tiempo_real_s']:.2f}s")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
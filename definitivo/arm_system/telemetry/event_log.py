@@ -0,0 +1,241 @@
+"""
+Structured binary event log for post-mortem replay.
+
+Events are appended as compact binary records to preallocated, memory-mapped
+segment files. Writing one is a struct.pack plus a memory copy, so there are
+no per-event syscalls or formatted text on the SD card. When a segment fills
+up it is truncated to its used size and a new one is opened. Only the newest
+`max_segments` are kept per session.
+
+Segment layout:
+    header  MAGIC (8) | wall-clock start (f64) | session id (32, utf-8, zero padded)
+    record  t since session start (f64) | event id (u8) | payload length (u16) | payload
+A zero event id marks the end of the written area. A record whose payload
+does not fit the u16 length or one segment is dropped with a warning: the
+log never raises into the control or serial code that records an event.
+
+The log is off unless ARM_EVENT_LOG=<directory> is set or EVENTS.open(directory)
+is called. When it is off, record() returns after one attribute check.
+Read sessions back with read_session() or replay them with replay_session.py.
+"""
+import os
+import glob
+import atexit
+import json
+import mmap
+import time
+import struct
+import threading
+import logging as log
+from collections import namedtuple
+
+MAGIC = b'ARMEVT1\x00'
+SEGMENT_HEADER = struct.Struct('<8sd32s')
+RECORD_HEADER = struct.Struct('<dBH')
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+DEFAULT_MAX_SEGMENTS = 16
+
+# event id -> (subsystem, event, payload format, field names)
+# format 'json' stores a UTF-8 JSON object; 'duties' a variable list of (channel u8, duty u16)
+SCHEMA = {
+    1: ('servo', 'write', 'duties', ('duties',)),
+    2: ('servo', 'move', '<Bbff', ('channel', 'direction', 'speed', 'duration')),
+    3: ('servo', 'off_all', '', ()),
+    4: ('stepper', 'move', '<iif', ('steps', 'direction', 'speed')),
+    5: ('serial', 'tx', 'json', ('message',)),
+    6: ('serial', 'rx', 'json', ('message',)),
+    7: ('robot', 'phase', 'json', ('data',)),
+    8: ('vision', 'detection', 'json', ('data',)),
+}
+EVENT_IDS = {(subsystem, event): event_id for event_id, (subsystem, event, _, _) in SCHEMA.items()}
+_STRUCTS = {event_id: struct.Struct(fmt) for event_id, (_, _, fmt, _) in SCHEMA.items()
+            if fmt not in ('json', 'duties')}
+_DUTY = struct.Struct('<BH')
+
+Event = namedtuple('Event', ['t', 'subsystem', 'event', 'fields'])
+
+
+def _encode(event_id, values):
+    fmt = SCHEMA[event_id][2]
+    if fmt == 'json':
+        return json.dumps(values[0], separators=(',', ':'), default=str).encode()
+    if fmt == 'duties':
+        return b''.join(_DUTY.pack(channel, int(duty) & 0xFFFF) for channel, duty in values[0].items())
+    return _STRUCTS[event_id].pack(*values)
+
+
+def _decode(event_id, payload):
+    subsystem, event, fmt, names = SCHEMA[event_id]
+    if fmt == 'json':
+        values = (json.loads(payload.decode()),)
+    elif fmt == 'duties':
+        values = ({channel: duty for channel, duty in _DUTY.iter_unpack(payload)},)
+    else:
+        values = _STRUCTS[event_id].unpack(payload)
+    return subsystem, event, dict(zip(names, values))
+
+
+class EventLog:
+    """Append-only binary event log on rotating memory-mapped segments"""
+
+    def __init__(self, segment_size: int = DEFAULT_SEGMENT_SIZE, max_segments: int = DEFAULT_MAX_SEGMENTS):
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.enabled = False
+        self.directory = None
+        self.session = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._offset = 0
+        self._index = 0
+        self._t0 = 0.0
+        self.dropped = 0
+
+    # --- lifecycle ---
+    def open(self, directory: str, session: str = None):
+        """
+        start a session in `directory` (one set of segment files per session)
+
+        The default id is the start time plus the pid, with a counter when that
+        session already has segments. Segments are created exclusively, so an
+        explicit `session` that exists raises FileExistsError instead of being overwritten.
+        """
+        with self._lock:
+            self._close_segment()
+            os.makedirs(directory, exist_ok=True)
+            self.directory = directory
+            self.session = session or self._new_session_id()
+            self._index = 0
+            self._t0 = time.monotonic()
+            self._wall0 = time.time()
+            self._open_segment()
+            self.enabled = True
+        return self
+
+    def close(self):
+        with self._lock:
+            self.enabled = False
+            self._close_segment()
+
+    def _new_session_id(self) -> str:
+        base = session = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        n = 0
+        while glob.glob(os.path.join(self.directory, f'{session}-[0-9][0-9][0-9][0-9].seg')):
+            n += 1
+            session = f'{base}-{n}'
+        return session
+
+    def _segment_path(self, index):
+        return os.path.join(self.directory, f'{self.session}-{index:04d}.seg')
+
+    def _open_segment(self):
+        path = self._segment_path(self._index)
+        self._file = open(path, 'x+b')
+        self._file.truncate(self.segment_size)
+        self._map = mmap.mmap(self._file.fileno(), self.segment_size)
+        header = SEGMENT_HEADER.pack(MAGIC, self._wall0, self.session.encode()[:32])
+        self._map[:SEGMENT_HEADER.size] = header
+        self._offset = SEGMENT_HEADER.size
+        # drop the oldest segments of this session
+        stale = self._index - self.max_segments
+        if stale >= 0 and os.path.exists(self._segment_path(stale)):
+            os.remove(self._segment_path(stale))
+
+    def _close_segment(self):
+        if self._map is None:
+            return
+        self._map.flush()
+        self._map.close()
+        self._file.truncate(self._offset)
+        self._file.close()
+        self._map = self._file = None
+
+    # --- writing ---
+    def record(self, subsystem: str, event: str, *values):
+        """append one event; values follow the field order in SCHEMA"""
+        if not self.enabled:
+            return
+        t = time.monotonic() - self._t0
+        try:
+            event_id = EVENT_IDS[(subsystem, event)]
+            payload = _encode(event_id, values)
+        except (KeyError, TypeError, ValueError, struct.error) as e:
+            self._drop(subsystem, event, f'not encodable: {e}')
+            return
+        size = RECORD_HEADER.size + len(payload)
+        # must fit the u16 length and an empty segment, with room for the zero end marker
+        if len(payload) > 0xFFFF or SEGMENT_HEADER.size + size + RECORD_HEADER.size > self.segment_size:
+            self._drop(subsystem, event, f'{len(payload)} byte payload too large')
+            return
+        with self._lock:
+            if self._map is None:
+                return
+            if self._offset + size + RECORD_HEADER.size > self.segment_size:
+                try:
+                    self._close_segment()
+                    self._index += 1
+                    self._open_segment()
+                except OSError as e:
+                    log.error(f"event log disabled, cannot open segment {self._index}: {e}")
+                    self.enabled = False
+                    self._map = self._file = None
+                    return
+            RECORD_HEADER.pack_into(self._map, self._offset, t, event_id, len(payload))
+            self._map[self._offset + RECORD_HEADER.size:self._offset + size] = payload
+            self._offset += size
+
+    def _drop(self, subsystem: str, event: str, reason: str):
+        self.dropped += 1
+        log.warning(f"event log: dropped {subsystem}/{event} record ({reason})")
+
+    def flush(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+
+
+# --- reading ---
+def list_sessions(directory: str) -> list:
+    """session ids with segments in `directory`, oldest first"""
+    paths = glob.glob(os.path.join(directory, '*-[0-9][0-9][0-9][0-9].seg'))
+    return sorted({os.path.basename(p).rsplit('-', 1)[0] for p in paths})
+
+
+def read_segment(path: str):
+    """yield the Events stored in one segment file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, _, _ = SEGMENT_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f'{path}: not an event log segment')
+    offset = SEGMENT_HEADER.size
+    while offset + RECORD_HEADER.size <= len(data):
+        t, event_id, length = RECORD_HEADER.unpack_from(data, offset)
+        if event_id == 0:
+            break
+        start = offset + RECORD_HEADER.size
+        subsystem, event, fields = _decode(event_id, data[start:start + length])
+        yield Event(t, subsystem, event, fields)
+        offset = start + length
+
+
+def read_session(directory: str, session: str):
+    """yield every Event of a session in order across its segments"""
+    for path in sorted(glob.glob(os.path.join(directory, f'{session}-[0-9][0-9][0-9][0-9].seg'))):
+        yield from read_segment(path)
+
+
+def session_start(directory: str, session: str) -> float:
+    """wall-clock start time (epoch seconds) of a session"""
+    path = sorted(glob.glob(os.path.join(directory, f'{session}-[0-9][0-9][0-9][0-9].seg')))[0]
+    with open(path, 'rb') as f:
+        _, wall0, _ = SEGMENT_HEADER.unpack(f.read(SEGMENT_HEADER.size))
+    return wall0
+
+
+# process-wide log shared by control, communication and main
+EVENTS = EventLog()
+atexit.register(EVENTS.close)
+if os.environ.get('ARM_EVENT_LOG'):
+    EVENTS.open(os.environ['ARM_EVENT_LOG'])
@@ -0,0 +1,181 @@
+"""
+Low-overhead hot-path instrumentation with a Prometheus text endpoint.
+
+Stages (capture, decode, inference, post-processing, command dispatch, I2C
+write, serial round trip) are timed with `METRICS.time(name)` and counted
+with `METRICS.inc(name)`. Histograms keep Prometheus cumulative buckets plus
+a bounded window of recent samples for p50/p95/p99.
+
+Instrumentation is off unless ARM_METRICS=1 (or METRICS.enable()); when off,
+`time()` returns a shared no-op context manager and `inc()`/`observe()`
+return after one attribute check.
+"""
+import os
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+
+# seconds; covers I2C writes (~100 us) up to slow inference (~2 s)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5)
+QUANTILES = (0.5, 0.95, 0.99)
+PREFIX = 'arm_'
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a sliding window for quantiles"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window: int = 2048):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantiles(self) -> dict:
+        samples = sorted(self.recent)
+        if not samples:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in QUANTILES}
+
+
+class _Timer:
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())) if labels else ())
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+
+class MetricsRegistry:
+    """Named histograms (seconds) and counters, rendered in Prometheus text format"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def time(self, name: str, labels: dict = None):
+        """context manager timing a block into histogram `name`"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def observe(self, name: str, seconds: float, labels: dict = None):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name: str, amount: int = 1, labels: dict = None):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        """quantiles and counters as a JSON-friendly dict"""
+        with self._lock:
+            histograms = {
+                name + _format_labels(labels): dict(
+                    count=h.count, sum=h.sum,
+                    **{f'p{int(q * 100)}': v for q, v in h.quantiles().items()})
+                for (name, labels), h in self._histograms.items()
+            }
+            counters = {name + _format_labels(labels): v for (name, labels), v in self._counters.items()}
+        return {'enabled': self.enabled, 'histograms': histograms, 'counters': counters}
+
+    def render(self) -> str:
+        """Prometheus text exposition: histogram buckets, recent-window quantile gauges and counters"""
+        lines = []
+        with self._lock:
+            by_name = {}
+            for (name, labels), h in sorted(self._histograms.items()):
+                by_name.setdefault(name, []).append((labels, h))
+            for name, series in by_name.items():
+                metric = f'{PREFIX}{name}_seconds'
+                lines.append(f'# TYPE {metric} histogram')
+                for labels, h in series:
+                    cumulative = 0
+                    for bound, count in zip(list(h.buckets) + ['+Inf'], h.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{_format_labels(labels, {"le": bound})} {cumulative}')
+                    lines.append(f'{metric}_sum{_format_labels(labels)} {h.sum}')
+                    lines.append(f'{metric}_count{_format_labels(labels)} {h.count}')
+                lines.append(f'# TYPE {metric}_recent gauge')
+                for labels, h in series:
+                    for q, v in h.quantiles().items():
+                        lines.append(f'{metric}_recent{_format_labels(labels, {"quantile": q})} {v}')
+
+            counters = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append((labels, value))
+            for name, series in counters.items():
+                metric = f'{PREFIX}{name}_total'
+                lines.append(f'# TYPE {metric} counter')
+                for labels, value in series:
+                    lines.append(f'{metric}{_format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# process-wide registry shared by the capture, vision and control code
+METRICS = MetricsRegistry(enabled=os.environ.get('ARM_METRICS', '0').lower() in ('1', 'true', 'yes'))
@@ -0,0 +1,135 @@
+"""
+Joint-state telemetry recorded into a fixed-size NumPy ring buffer.
+
+Every commanded PCA9685 pulse, timed move, stepper position and VEX-reported
+angle is stored as one fixed-width record. Recording is a lock plus a few
+array stores, so it can stay enabled in the control hot path; readers pull
+increments with a since-cursor or dump the whole history compressed.
+"""
+import io
+import time
+import threading
+import numpy as np
+
+# record kinds
+PULSE = 1      # channel = PCA9685 channel, value = duty cycle (16 bit)
+MOVE = 2       # channel = PCA9685 channel, value = signed speed, duration = seconds
+STEPPER = 3    # channel = stepper index, value = position (steps), duration = move time
+VEX_ANGLE = 4  # channel = index in JOINTS, value = degrees
+
+KIND_NAMES = {PULSE: 'pulse', MOVE: 'move', STEPPER: 'stepper', VEX_ANGLE: 'vex_angle'}
+JOINTS = ('base', 'shoulder', 'elbow', 'wrist', 'gripper')
+
+RECORD_DTYPE = np.dtype([
+    ('seq', np.uint64),
+    ('t', np.float64),
+    ('kind', np.uint8),
+    ('channel', np.int16),
+    ('value', np.float32),
+    ('duration', np.float32),
+])
+
+
+class TelemetryRecorder:
+    """Ring buffer of telemetry records addressed by a monotonically increasing sequence number"""
+
+    def __init__(self, capacity: int = 65536, reloj=None):
+        """
+        :param capacity: number of records kept; older ones are overwritten
+        :param reloj: clock (control.reloj) used for timestamps; time.monotonic by default
+        """
+        self.capacity = capacity
+        self._now = reloj.ahora if reloj is not None else time.monotonic
+        self._buffer = np.zeros(capacity, dtype=RECORD_DTYPE)
+        self._seq = 0  # sequence number of the next record
+        self._lock = threading.Lock()
+
+    @property
+    def cursor(self) -> int:
+        """sequence number of the next record (pass it to since() to get only newer ones)"""
+        return self._seq
+
+    def record(self, kind: int, channel: int, value: float, duration: float = 0.0):
+        t = self._now()
+        with self._lock:
+            self._buffer[self._seq % self.capacity] = (self._seq, t, kind, channel, value, duration)
+            self._seq += 1
+
+    def record_many(self, kind: int, values: dict, duration: float = 0.0):
+        """record {channel: value} sharing one timestamp (e.g. one I2C burst)"""
+        if not values:
+            return
+        t = self._now()
+        with self._lock:
+            # bursts are a handful of channels: per-row stores beat building index arrays
+            seq = self._seq
+            for channel, value in values.items():
+                self._buffer[seq % self.capacity] = (seq, t, kind, channel, value, duration)
+                seq += 1
+            self._seq = seq
+
+    def record_pulses(self, duties: dict):
+        """record a PCA9685 write ({channel: duty cycle})"""
+        self.record_many(PULSE, duties)
+
+    def record_move(self, channel: int, speed: float, duration: float):
+        """record a timed servo move (speed signed by direction)"""
+        self.record(MOVE, channel, speed, duration)
+
+    def record_stepper(self, position: int, duration: float = 0.0, index: int = 0):
+        """record the stepper position after a move"""
+        self.record(STEPPER, index, position, duration)
+
+    def record_angles(self, angles: dict):
+        """record a VEX `current_angles` message ({joint: degrees})"""
+        values = {}
+        for joint, angle in angles.items():
+            if joint in JOINTS:
+                try:
+                    values[JOINTS.index(joint)] = float(angle)
+                except (TypeError, ValueError):
+                    continue
+        self.record_many(VEX_ANGLE, values)
+
+    def since(self, cursor: int = 0, limit: int = None):
+        """
+        records with seq >= cursor, oldest first
+
+        :return: (records, next_cursor, dropped) where dropped counts records
+                 that were overwritten before the reader caught up
+        """
+        with self._lock:
+            end = self._seq
+            oldest = max(0, end - self.capacity)
+            start = max(cursor, oldest)
+            if limit is not None:
+                end = min(end, start + limit)
+            idx = np.arange(start, end) % self.capacity
+            records = self._buffer[idx].copy()
+        return records, end, max(0, oldest - cursor)
+
+    def increment(self, cursor: int = 0, limit: int = 5000) -> dict:
+        """since() as a JSON-friendly payload for the web endpoints"""
+        records, next_cursor, dropped = self.since(cursor, limit)
+        return {'records': self.to_dicts(records), 'cursor': next_cursor, 'dropped': dropped}
+
+    def dump(self) -> bytes:
+        """whole history as a compressed .npz (arrays per field, oldest first)"""
+        records, _, _ = self.since(0)
+        out = io.BytesIO()
+        np.savez_compressed(out, **{name: records[name] for name in RECORD_DTYPE.names},
+                            kind_names=np.array([KIND_NAMES[k] for k in sorted(KIND_NAMES)]),
+                            joints=np.array(JOINTS))
+        return out.getvalue()
+
+    @staticmethod
+    def to_dicts(records) -> list:
+        """records as JSON-friendly dicts"""
+        return [{
+            'seq': int(r['seq']),
+            't': float(r['t']),
+            'kind': KIND_NAMES.get(int(r['kind']), int(r['kind'])),
+            'channel': int(r['channel']),
+            'value': float(r['value']),
+            'duration': float(r['duration'])
+        } for r in records]
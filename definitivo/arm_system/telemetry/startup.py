@@ -0,0 +1,105 @@
+"""
+Startup-time profile of the entry points.
+
+Heavy modules (ultralytics/torch, cv2 camera capture) and devices (I2C bus,
+GPIO, serial port, camera) are loaded on first use instead of at startup.
+STARTUP records how long each of those phases took and when it happened,
+relative to the start of the interpreter, so the report shows both the time
+until the menu is ready and what the lazily loaded parts cost later:
+
+    with STARTUP.phase('serial'):
+        ...
+    STARTUP.ready()      # the entry point is usable (menu shown)
+    STARTUP.report()     # log the phases recorded so far
+
+With ARM_STARTUP_PROFILE=1 the entry points log the report when they are
+ready and again at exit (with the first-use phases). For a per-module
+breakdown of the imports use `python -X importtime main.py`.
+"""
+import os
+import time
+import logging as log
+import threading
+from collections import namedtuple
+
+Phase = namedtuple('Phase', ['name', 'start', 'duration', 'after_ready'])
+
+
+def _process_start() -> float:
+    """time.perf_counter() value at interpreter start (Linux), or at this import elsewhere"""
+    now = time.perf_counter()
+    try:
+        with open('/proc/self/stat') as f:
+            # field 22, counted after the parenthesised command name (which may contain spaces)
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        age = uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+        return now - max(0.0, age)
+    except (OSError, ValueError, IndexError):
+        return now
+
+
+class StartupProfile:
+    def __init__(self, verbose: bool = False):
+        self.origin = _process_start()
+        self.verbose = verbose
+        self.phases = []
+        self.ready_at = None
+        self._lock = threading.Lock()
+
+    def phase(self, name: str):
+        """context manager timing one startup or first-use phase"""
+        return _PhaseTimer(self, name)
+
+    def _add(self, name: str, start: float, end: float):
+        with self._lock:
+            self.phases.append(Phase(name, start - self.origin, end - start, self.ready_at is not None))
+
+    def ready(self):
+        """the entry point is usable; phases after this are first-use costs"""
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter() - self.origin
+            if self.verbose:
+                self.report()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            phases = list(self.phases)
+        return {
+            'ready_s': self.ready_at,
+            'phases': [{'name': p.name, 'start_s': round(p.start, 4), 'duration_s': round(p.duration, 4),
+                        'after_ready': p.after_ready} for p in phases],
+        }
+
+    def report(self) -> str:
+        with self._lock:
+            phases = list(self.phases)
+        lines = ['startup profile (s from interpreter start):']
+        for p in phases:
+            when = 'first use' if p.after_ready else 'startup'
+            lines.append(f'  {p.start:8.3f}  {p.duration:8.3f}  {p.name} ({when})')
+        if self.ready_at is not None:
+            lines.append(f'  ready after {self.ready_at:.3f} s')
+        text = '\n'.join(lines)
+        log.info(text)
+        return text
+
+
+class _PhaseTimer:
+    __slots__ = ('profile', 'name', 'start')
+
+    def __init__(self, profile: StartupProfile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile._add(self.name, self.start, time.perf_counter())
+        return False
+
+
+STARTUP = StartupProfile(verbose=os.environ.get('ARM_STARTUP_PROFILE', '0').lower() in ('1', 'true', 'yes'))
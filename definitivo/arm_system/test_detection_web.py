@@ -5,192 +5,244 @@ Visualiza la cámara desde el navegador en http://<ip-raspberry>:5000
 """
 import cv2
 import time
-import subprocess
 import numpy as np
-from flask import Flask, Response
-from ultralytics import YOLO
+from flask import Flask, Response, jsonify
 from control.robot_controller import ControladorRobotico
+from telemetry.metrics import METRICS, CONTENT_TYPE
+from perception.vision.camera.decode import reduction_for
+from perception.vision.camera.calibration import load_calibration
+from perception.vision.range_estimator import RangeEstimator
+from control.servo_visual import ServoVisual, EjeServoVisual
+from perception.vision.service.client import connect_vision, detection_arrays
+from perception.vision.service.pipeline import VisionPipeline
 import threading
 
 # Flask app
 app = Flask(__name__)
 
-# Cargar el modelo YOLO
-print("Cargando modelo YOLO...")
-model = YOLO("perception/vision/detection/models/torch/yolo11n.pt")
-print("Modelo cargado.")
-
-# Inicializar controlador del brazo (SIN motor paso a paso)
-print("Inicializando controlador del brazo...")
-robot = ControladorRobotico(habilitar_stepper=False)
+# Servicio de visión: si el demonio está en marcha, la cámara y el modelo son los suyos
+# (python -m perception.vision.service); si no, este script abre los propios
+VISION = connect_vision()
 
 # Configuración
 WIDTH = 1280  # ✅ MAYOR RESOLUCIÓN = Mayor campo de visión
 HEIGHT = 720  # ✅ Aspect ratio 16:9 para mejor visión periférica
 FPS = 15      # ✅ Reducido para mejor rendimiento (suficiente para detección)
 TARGET_CLASSES = ['bottle', 'cup', 'cell phone', 'book']
+if VISION is not None:
+    WIDTH, HEIGHT = VISION.width, VISION.height
 CENTER_X = WIDTH // 2
 CENTER_Y = HEIGHT // 2
 DEAD_ZONE_X = 100  # Zona muerta proporcional a nueva resolución
 DEAD_ZONE_Y = 50   # ✅ REDUCIDO para permitir acercarse más (antes: 80px)
+INFERENCE_SIZE = 416
+# La detección recibe el frame decodificado a 1/REDUCTION (escalado DCT de libjpeg, 640x360 para 416);
+# la resolución completa solo se decodifica para el stream web. Las cajas se reescalan a WIDTH x HEIGHT.
+REDUCTION = reduction_for(WIDTH, HEIGHT, INFERENCE_SIZE)
+# Variante del manifiesto (None: ARM_MODEL_VARIANT o la más rápida y precisa para esta CPU)
+MODEL_VARIANT = None
+
+def draw_overlay(frame, state):
+    """Dibujar detecciones, centro/zona muerta y estado (state: detection_results + 'auto') sobre el frame"""
+    if not state:
+        return
+    # Dibujar todas las detecciones
+    for det in state['detections']:
+        x1, y1, x2, y2 = det['box']
+        class_name = det['class']
+        conf = det['conf']
+        is_target = det['is_target']
+        
+        # Color: rojo para target, verde para alta confianza, amarillo para baja
+        if is_target and state['best'] and state['best'][0] == class_name:
+            color = (0, 0, 255)  # Rojo para el target seleccionado
+        elif conf > 0.7:
+            color = (0, 255, 0)  # Verde
+        else:
+            color = (0, 255, 255)  # Amarillo
+        
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        label = f'{class_name} {conf:.2f}'
+        cv2.putText(frame, label, (x1, y1 - 10),
+                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    
+    # Dibujar centro y zona muerta
+    cv2.circle(frame, (CENTER_X, CENTER_Y), 5, (255, 0, 255), -1)
+    cv2.rectangle(frame, 
+                (CENTER_X - DEAD_ZONE_X, CENTER_Y - DEAD_ZONE_Y),
+                (CENTER_X + DEAD_ZONE_X, CENTER_Y + DEAD_ZONE_Y),
+                (255, 0, 255), 1)
+    
+    # Línea al target si existe
+    if state['target_pos']:
+        tx, ty = state['target_pos']
+        cv2.line(frame, (CENTER_X, CENTER_Y), (tx, ty), (0, 0, 255), 2)
+    
+    # Status
+    status_text = "AUTO: ON" if state['auto'] else "AUTO: OFF"
+    status_color = (0, 255, 0) if state['auto'] else (0, 0, 255)
+    cv2.putText(frame, status_text, (10, 30),
+              cv2.FONT_HERSHEY_SIMPLEX, 0.8, status_color, 2)
+    
+    # Latencia
+    cv2.putText(frame, f'Deteccion: {state["latency"]:.0f}ms', (10, 60),
+              cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+    
+    # Target info
+    if state['best']:
+        cv2.putText(frame, f'Target: {state["best"][0]} ({state["best"][1]:.2f})', 
+                  (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+
+if VISION is None:
+    # Sin servicio: captura+decodificación, YOLO y dibujo+JPEG en procesos separados (cada uno en su núcleo,
+    # sin competir por el GIL); los frames pasan por memoria compartida sin copiarse. Los procesos se crean
+    # con fork: el pipeline arranca antes de abrir el hardware del brazo y de lanzar threads.
+    print("Iniciando pipeline de visión (captura | YOLO | JPEG)...")
+    PIPELINE = VisionPipeline(MODEL_VARIANT, WIDTH, HEIGHT, FPS, imgsz=INFERENCE_SIZE, conf=0.45,
+                              reduction=REDUCTION, draw=draw_overlay).start()
+else:
+    print(f"Usando el servicio de visión: {VISION.width}x{VISION.height}, modelo imgsz={VISION.imgsz}")
+    PIPELINE = None
+
+# Inicializar controlador del brazo (SIN motor paso a paso)
+print("Inicializando controlador del brazo...")
+robot = ControladorRobotico(habilitar_stepper=False)
+# Bucle de control central: la detección solo encola consignas
+robot.iniciar_bucle(frecuencia_hz=200)
+
+# Distancia cámara-objeto por tamaño de caja y tamaño real de cada clase (sustituye al 8% de pantalla)
+_calibracion = load_calibration()
+RANGE_ESTIMATOR = (RangeEstimator.from_calibration(_calibracion, offset_mm=0.0) if _calibracion is not None
+                   else RangeEstimator(image_size=(WIDTH, HEIGHT)))
+GRAB_RANGE_MM = 350  # objeto "cerca" (al alcance de la pinza)
 
 # Variables globales
 auto_movement_enabled = True  # ¡ACTIVADO AUTOMÁTICAMENTE AL INICIAR!
-last_frame = None
-last_annotated_frame = None  # Frame con detecciones dibujadas
+last_full_frame = None  # frame completo del servicio de visión (para el stream)
+last_service_result = None  # últimas detecciones del servicio de visión
+last_stream_jpeg = None  # último frame anotado del pipeline: (seq, instante, JPEG)
 frame_lock = threading.Lock()
-last_movement_time = 0
-MOVEMENT_COOLDOWN = 0.8  # Aumentado para movimientos más controlados
 detection_results = None  # Cache de detecciones
 results_lock = threading.Lock()
-object_centered_count = 0  # Contador de frames centrados
-CENTERED_THRESHOLD = 5  # Frames necesarios centrado para considerar "listo para agarrar"
+CENTERED_THRESHOLD = 2  # Detecciones seguidas centradas y sin movimiento para considerar "listo para agarrar"
 grab_in_progress = False  # Flag para evitar múltiples agarres
 
-def calculate_movement(obj_x, obj_y):
-    """Calcular movimiento necesario"""
-    error_x = obj_x - CENTER_X
-    error_y = obj_y - CENTER_Y
-    
-    if abs(error_x) < DEAD_ZONE_X:
-        error_x = 0
-    if abs(error_y) < DEAD_ZONE_Y:
-        error_y = 0
-    
-    if error_x == 0 and error_y == 0:
-        return None
-    
-    # TIEMPOS MÁS CORTOS para movimientos más suaves y controlados
-    time_horizontal = max(0.1, min(abs(error_x) / WIDTH * 0.3, 0.25))  # Máximo 0.25s
-    time_vertical = max(0.1, min(abs(error_y) / HEIGHT * 0.25, 0.2))  # Máximo 0.2s
-    
-    dir_horizontal = 1 if error_x > 0 else -1
-    dir_vertical = 1 if error_y > 0 else -1
-    
-    return {
-        'horizontal': (dir_horizontal, time_horizontal) if error_x != 0 else None,
-        'vertical': (dir_vertical, time_vertical) if error_y != 0 else None
-    }
+# Servo visual: PI sobre el error vertical con compensación del retardo cámara + inferencia.
+# Sin cooldown: cada detección recalcula la consigna del hombro y sustituye la activa.
+# (eje horizontal pendiente: el motor paso a paso está deshabilitado)
+SERVO = ServoVisual(
+    robot,
+    {'y': EjeServoVisual('shoulder', tolerancia_px=DEAD_ZONE_Y)},
+    focal_px=RANGE_ESTIMATOR.fx * WIDTH / RANGE_ESTIMATOR.image_size[0],
+    centro=(CENTER_X, CENTER_Y),
+    ticks_centrado=CENTERED_THRESHOLD,
+)
 
-def move_to_object(movement):
-    """Mover el brazo"""
-    global last_movement_time
-    
-    if movement is None:
-        return True
-    
-    current_time = time.time()
-    if current_time - last_movement_time < MOVEMENT_COOLDOWN:
-        return False
+def service_frames():
+    """Thread que recibe frames y detecciones del servicio de visión (sustituye al pipeline local)"""
+    global last_full_frame, last_service_result
     
-    try:
-        # SOLO SERVOS - comentar motor paso a paso hasta arreglarlo
-        # if movement['horizontal']:
-        #     direction, duration = movement['horizontal']
-        #     distance_mm = int(duration * 30)
-        #     print(f"  → HORIZONTAL: dir={direction}, dist={distance_mm}mm")
-        #     robot.mover_brazo(distance_mm, direccion=direction, velocidad=800)
-        
-        if movement['vertical']:
-            direction, duration = movement['vertical']
-            # Movimientos MUY CORTOS (máx 0.2s)
-            duration = min(duration, 0.2)
-            print(f"  ↕ VERTICAL: dir={direction}, tiempo={duration:.2f}s")
-            robot.mover_hombro_tiempo(direction, duration, velocidad=0.3)
-            
-            # IMPORTANTE: Detener explícitamente el servo
-            time.sleep(0.1)  # Pequeño delay
-            robot.controlador_servo.detener_servo('hombro')
-            print(f"  ⏹ Servo DETENIDO")
-            
-    except Exception as e:
-        print(f"  ✗ ERROR al mover: {e}")
-        return False
-    
-    last_movement_time = current_time
-    return False
+    VISION.subscribe(frames=True, detections=True, min_conf=0.45)
+    print(f"Suscrito al servicio de visión ({VISION.socket_path})")
+    for event in VISION.events():
+        data = event['data']
+        if event['type'] == 'frame':
+            frame = VISION.read_frame(data)
+            if frame is not None:
+                METRICS.inc('frames_captured')
+                with frame_lock:
+                    last_full_frame = frame
+        elif event['type'] == 'detections':
+            with frame_lock:
+                last_service_result = data
+    print("✗ Servicio de visión desconectado")
 
-def capture_frames():
-    """Thread para capturar frames RAW (sin detección)"""
-    global last_frame
-    
-    cmd = [
-        'rpicam-vid',
-        '--inline',
-        '--codec', 'mjpeg',
-        '--width', str(WIDTH),
-        '--height', str(HEIGHT),
-        '--framerate', str(FPS),
-        '-t', '0',
-        '-o', '-',
-        '--nopreview',
-        '--rotation', '180'
-    ]
-    
-    process = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.DEVNULL,
-        bufsize=10**8  # Buffer grande para resolución 1280x720
-    )
-    
-    jpeg_buffer = b''
+def pipeline_jpegs():
+    """Thread que recoge los frames ya anotados y codificados por el pipeline (sustituye a la captura local)"""
+    global last_stream_jpeg
     
     print(f"Stream de cámara iniciado: {WIDTH}x{HEIGHT} @ {FPS}fps")
-    
+    while True:
+        item = PIPELINE.jpeg(timeout=1.0)
+        if item is not None:
+            METRICS.inc('frames_captured')
+            with frame_lock:
+                last_stream_jpeg = item
+
+# Secuencia de agarre: (mensaje, articulación, dirección, segundos, velocidad, pausa posterior)
+PASOS_AGARRE = (
+    ("  1. Extendiendo brazo...", 'elbow', 1, 1.5, 0.5, 0.5),
+    ("  2. Abriendo pinza...", 'gripper', 1, 1.0, 0.5, 1.0),
+    ("  3. Levantando...", 'shoulder', -1, 0.8, 0.4, 0.5),
+    ("  4. Cerrando pinza...", 'gripper', -1, 1.0, 0.5, 1.0),
+    ("  5. Retrayendo...", 'shoulder', 1, 1.0, 0.5, 0.5),
+    (None, 'elbow', -1, 1.5, 0.5, 0.0),
+)
+agarre_lock = threading.Lock()
+
+def secuencia_agarre():
+    """Ejecutar la secuencia de agarre a través del bucle de control
+
+    Mientras dura, el servo visual queda en pausa (grab_in_progress) y sus consignas pendientes
+    se descartan, así el PI y el agarre nunca mandan a la vez sobre el mismo servo. Cada paso
+    se encola en el bucle y se espera a que termine. Devuelve False si ya hay un agarre en curso.
+    """
+    global grab_in_progress
+    if not agarre_lock.acquire(blocking=False):
+        return False
+    grab_in_progress = True
     try:
-        while True:
-            chunk = process.stdout.read(8192)  # ✅ Buffer mayor para 720p (antes: 4096)
-            if not chunk:
-                break
-            
-            jpeg_buffer += chunk
-            
-            start_marker = jpeg_buffer.find(b'\xff\xd8')
-            end_marker = jpeg_buffer.find(b'\xff\xd9')
-            
-            if start_marker != -1 and end_marker != -1 and end_marker > start_marker:
-                jpeg_data = jpeg_buffer[start_marker:end_marker+2]
-                jpeg_buffer = jpeg_buffer[end_marker+2:]
-                
-                frame = cv2.imdecode(np.frombuffer(jpeg_data, dtype=np.uint8), cv2.IMREAD_COLOR)
-                
-                if frame is not None:
-                    with frame_lock:
-                        last_frame = frame.copy()
-    
+        robot.bucle.detener_todo()
+        robot.bucle.esperar()
+        SERVO.reiniciar()
+        for mensaje, articulacion, direccion, segundos, velocidad, pausa in PASOS_AGARRE:
+            if mensaje:
+                print(mensaje)
+            tiempo = robot.enviar_movimiento(articulacion, direccion, segundos, velocidad=velocidad, origen='agarre')
+            robot.bucle.esperar(articulacion, timeout=tiempo + 1.0)
+            time.sleep(pausa)
+        return True
     finally:
-        process.terminate()
-        process.wait()
+        # el próximo objetivo empieza sin integral ni historial
+        SERVO.reiniciar()
+        grab_in_progress = False
+        agarre_lock.release()
 
 def detection_thread():
     """Thread dedicado SOLO a detección YOLO"""
-    global detection_results, auto_movement_enabled, object_centered_count, grab_in_progress
+    global detection_results, auto_movement_enabled, grab_in_progress
     
     print("Thread de detección iniciado...")
     frame_count = 0
+    last_seq = None
     
     while True:
-        # Obtener frame
-        with frame_lock:
-            if last_frame is None:
-                time.sleep(0.1)
+        if VISION is not None:
+            # Detecciones ya calculadas por el servicio (cajas en resolución completa)
+            with frame_lock:
+                result = last_service_result
+            if result is None or result['seq'] == last_seq:
+                time.sleep(0.01)
                 continue
-            frame = last_frame.copy()
+            last_seq = result['seq']
+            frame_time = result['timestamp']
+            latency = result['latency']
+            postprocess_start = time.perf_counter()
+            bboxes, confs, classes, _ = detection_arrays(result['detections'])
+            names = VISION.names
+        else:
+            # Detecciones del proceso de inferencia (cajas ya en resolución completa)
+            result = PIPELINE.detections(timeout=0.5)
+            if result is None:
+                continue
+            frame_time = result['timestamp']
+            latency = result['latency']
+            postprocess_start = time.perf_counter()
+            bboxes, confs, classes = result['boxes'], result['confs'], result['classes']
+            names = result['names']
         
         frame_count += 1
-        
-        # ✅ Detectar CADA FRAME (no saltear) - Pi 5 puede manejarlo con FPS reducido
-        # Antes: cada 3 frames → Ahora: cada frame
-        
-        # DETECCIÓN YOLO - OPTIMIZADA
-        start_time = time.time()
-        # ✅ imgsz=416 para MAYOR VELOCIDAD (en lugar de 640)
-        # Suficiente para detectar objetos grandes de cerca
-        results = model(frame, conf=0.45, verbose=False, imgsz=416)  # ✅ Confianza reducida + tamaño menor
-        latency = (time.time() - start_time) * 1000
-        
-        boxes_obj = results[0].boxes
+        METRICS.inc('frames_inferred')
         
         best_detection = None
         best_confidence = 0
@@ -198,14 +250,13 @@ def detection_thread():
         target_center_y = None
         all_detections = []
         
-        if boxes_obj is not None and len(boxes_obj) > 0:
-            bboxes = boxes_obj.xyxy.cpu().numpy()
-            confs = boxes_obj.conf.cpu().numpy()
-            classes = boxes_obj.cls.cpu().numpy()
+        if len(bboxes) > 0:
+            # distancia de todas las cajas del frame en una sola pasada
+            ranges, _ = RANGE_ESTIMATOR.estimate(bboxes, [names[int(c)] for c in classes], (WIDTH, HEIGHT))
             
             for i, box in enumerate(bboxes):
                 x1, y1, x2, y2 = map(int, box)
-                class_name = model.names[int(classes[i])]
+                class_name = names[int(classes[i])]
                 conf = float(confs[i])
                 
                 # Calcular tamaño del objeto (para saber si está cerca)
@@ -220,7 +271,8 @@ def detection_thread():
                     'is_target': class_name in TARGET_CLASSES,
                     'area': box_area,
                     'width': box_width,
-                    'height': box_height
+                    'height': box_height,
+                    'range': float(ranges[i])
                 })
                 
                 if class_name in TARGET_CLASSES and conf > best_confidence:
@@ -229,6 +281,8 @@ def detection_thread():
                     target_center_x = (x1 + x2) // 2
                     target_center_y = (y1 + y2) // 2
         
+        METRICS.observe('postprocess', time.perf_counter() - postprocess_start)
+
         # Guardar resultados
         with results_lock:
             detection_results = {
@@ -238,27 +292,33 @@ def detection_thread():
                 'latency': latency,
                 'timestamp': time.time()
             }
+        if PIPELINE is not None:
+            # el proceso de codificación dibuja este estado sobre los frames siguientes
+            PIPELINE.set_overlay(dict(detection_results, auto=auto_movement_enabled))
         
         # Mover si auto está activado
         if best_detection and auto_movement_enabled and target_center_x and not grab_in_progress:
-            movement = calculate_movement(target_center_x, target_center_y)
-            
             # DEBUG: Imprimir siempre lo que está detectando
             class_name = best_detection[0]
             error_x = target_center_x - CENTER_X
             error_y = target_center_y - CENTER_Y
             
-            # Calcular si objeto está lo suficientemente cerca (por tamaño)
-            # Buscar el objeto detectado en all_detections para obtener su área
+            # Calcular si objeto está lo suficientemente cerca (distancia estimada por clase)
+            # Buscar el objeto detectado en all_detections para obtener su área y distancia
             target_area = 0
+            target_range = float('nan')
             for det in all_detections:
                 if det['class'] == class_name and det['is_target']:
                     target_area = det['area']
+                    target_range = det['range']
                     break
             
-            # Objeto "cerca" si ocupa más del 8% de la pantalla (1280x720 = 921,600px)
             total_pixels = WIDTH * HEIGHT
-            is_close = (target_area / total_pixels) > 0.08  # 8% de la pantalla
+            if np.isfinite(target_range):
+                is_close = target_range <= GRAB_RANGE_MM
+            else:
+                # clase sin tamaño conocido: objeto "cerca" si ocupa más del 8% de la pantalla
+                is_close = (target_area / total_pixels) > 0.08
             
             print(f"\n[DEBUG] Detectado: {class_name}")
             print(f"  Posición: ({target_center_x}, {target_center_y})")
@@ -266,129 +326,68 @@ def detection_thread():
             print(f"  Error X: {error_x} (zona muerta: ±{DEAD_ZONE_X})")
             print(f"  Error Y: {error_y} (zona muerta: ±{DEAD_ZONE_Y})")
             print(f"  Área objeto: {target_area}px² ({target_area/total_pixels*100:.1f}% pantalla)")
+            print(f"  Distancia estimada: {target_range:.0f}mm (agarre: ≤{GRAB_RANGE_MM}mm)")
             print(f"  ¿Está cerca?: {'SÍ ✓' if is_close else 'NO'}")
-            print(f"  Movimiento calculado: {movement}")
             
-            if movement:
-                # Resetear contador si se está moviendo
-                object_centered_count = 0
+            # El servo visual envía (sin bloquear) la corrección vertical de este frame
+            with METRICS.time('command_dispatch', {'origin': 'vision'}):
+                centered = SERVO.actualizar((target_center_x, target_center_y), frame_time)
+            centered = centered and abs(error_x) < DEAD_ZONE_X
+            print(f"  Ticks centrado: {SERVO.ticks}/{CENTERED_THRESHOLD}")
+            
+            if not centered:
                 print(f"[AUTO] Target: {class_name} - MOVIENDO...")
-                move_to_object(movement)
+            elif is_close:
+                # Centrado y cerca → AGARRAR
+                print(f"[AUTO] Target: {class_name} CENTRADO ✓")
+                print("\n" + "="*60)
+                print("🎯 OBJETO CENTRADO Y CERCA - INICIANDO SECUENCIA DE AGARRE")
+                print("="*60)
+                if secuencia_agarre():
+                    print("✅ SECUENCIA COMPLETADA")
+                    print("="*60 + "\n")
+                    # Pausar auto por 5 segundos
+                    time.sleep(5)
             else:
-                # Objeto centrado
-                if is_close:
-                    object_centered_count += 1
-                    print(f"[AUTO] Target: {class_name} CENTRADO ✓ [{object_centered_count}/{CENTERED_THRESHOLD}]")
-                    
-                    # Si está centrado y cerca por suficientes frames → AGARRAR
-                    if object_centered_count >= CENTERED_THRESHOLD:
-                        print("\n" + "="*60)
-                        print("🎯 OBJETO CENTRADO Y CERCA - INICIANDO SECUENCIA DE AGARRE")
-                        print("="*60)
-                        grab_in_progress = True
-                        try:
-                            # Secuencia de agarre
-                            print("  1. Extendiendo brazo...")
-                            robot.mover_codo_tiempo(1, 1.5, velocidad=0.5)
-                            time.sleep(0.5)
-                            
-                            print("  2. Abriendo pinza...")
-                            robot.accion_recoger()
-                            time.sleep(1.0)
-                            
-                            print("  3. Levantando...")
-                            robot.mover_hombro_tiempo(-1, 0.8, velocidad=0.4)
-                            time.sleep(0.5)
-                            
-                            print("  4. Cerrando pinza...")
-                            robot.accion_soltar()
-                            time.sleep(1.0)
-                            
-                            print("  5. Retrayendo...")
-                            robot.mover_hombro_tiempo(1, 1.0, velocidad=0.5)
-                            time.sleep(0.5)
-                            robot.mover_codo_tiempo(-1, 1.5, velocidad=0.5)
-                            
-                            print("✅ SECUENCIA COMPLETADA")
-                            print("="*60 + "\n")
-                            
-                            # Resetear y pausar auto por 5 segundos
-                            object_centered_count = 0
-                            time.sleep(5)
-                        finally:
-                            grab_in_progress = False
-                else:
-                    # Centrado pero NO cerca
-                    object_centered_count = 0
-                    print(f"[AUTO] Target: {class_name} CENTRADO pero LEJOS - esperando acercarse más...")
+                # Centrado pero NO cerca
+                print(f"[AUTO] Target: {class_name} CENTRADO pero LEJOS - esperando acercarse más...")
         else:
-            # No hay detección o auto desactivado
-            object_centered_count = 0
+            # No hay detección o auto desactivado: el próximo objetivo empieza sin integral ni historial
+            SERVO.reiniciar()
         
         time.sleep(0.01)  # Small delay
 
 def generate_frames():
     """Generar frames para stream CON detecciones dibujadas"""
+    sent = None
     while True:
-        # Obtener frame original
-        with frame_lock:
-            if last_frame is None:
+        if PIPELINE is not None:
+            # Ya dibujado y codificado por el proceso de codificación
+            with frame_lock:
+                item = last_stream_jpeg
+            if item is None or item[0] == sent:
+                time.sleep(0.01)
+                continue
+            sent = item[0]
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + item[2] + b'\r\n')
+            continue
+        
+        if VISION is not None:
+            # Frame completo del servicio (copia: se dibuja encima)
+            with frame_lock:
+                frame = last_full_frame
+            if frame is None:
                 time.sleep(0.1)
                 continue
-            frame = last_frame.copy()
+            frame = frame.copy()
         
         # Obtener resultados de detección
         with results_lock:
             results = detection_results
         
-        # Dibujar detecciones
         if results:
-            # Dibujar todas las detecciones
-            for det in results['detections']:
-                x1, y1, x2, y2 = det['box']
-                class_name = det['class']
-                conf = det['conf']
-                is_target = det['is_target']
-                
-                # Color: rojo para target, verde para alta confianza, amarillo para baja
-                if is_target and results['best'] and results['best'][0] == class_name:
-                    color = (0, 0, 255)  # Rojo para el target seleccionado
-                elif conf > 0.7:
-                    color = (0, 255, 0)  # Verde
-                else:
-                    color = (0, 255, 255)  # Amarillo
-                
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                label = f'{class_name} {conf:.2f}'
-                cv2.putText(frame, label, (x1, y1 - 10),
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-            
-            # Dibujar centro y zona muerta
-            cv2.circle(frame, (CENTER_X, CENTER_Y), 5, (255, 0, 255), -1)
-            cv2.rectangle(frame, 
-                        (CENTER_X - DEAD_ZONE_X, CENTER_Y - DEAD_ZONE_Y),
-                        (CENTER_X + DEAD_ZONE_X, CENTER_Y + DEAD_ZONE_Y),
-                        (255, 0, 255), 1)
-            
-            # Línea al target si existe
-            if results['target_pos']:
-                tx, ty = results['target_pos']
-                cv2.line(frame, (CENTER_X, CENTER_Y), (tx, ty), (0, 0, 255), 2)
-            
-            # Status
-            status_text = "AUTO: ON" if auto_movement_enabled else "AUTO: OFF"
-            status_color = (0, 255, 0) if auto_movement_enabled else (0, 0, 255)
-            cv2.putText(frame, status_text, (10, 30),
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.8, status_color, 2)
-            
-            # Latencia
-            cv2.putText(frame, f'Deteccion: {results["latency"]:.0f}ms', (10, 60),
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
-            
-            # Target info
-            if results['best']:
-                cv2.putText(frame, f'Target: {results["best"][0]} ({results["best"][1]:.2f})', 
-                          (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+            draw_overlay(frame, dict(results, auto=auto_movement_enabled))
         
         # Encodear a JPEG con calidad media para velocidad
         ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 75])
@@ -436,19 +435,19 @@ def auto_off():
     auto_movement_enabled = False
     return "AUTO DESACTIVADO"
 
+@app.route('/metrics')
+def metrics():
+    """Métricas de la ruta crítica en formato Prometheus (activar con ARM_METRICS=1)"""
+    return Response(METRICS.render(), content_type=CONTENT_TYPE)
+
+@app.route('/loop_metrics')
+def loop_metrics():
+    return jsonify(robot.bucle.metricas.como_dict())
+
 @app.route('/grab')
 def grab():
-    robot.mover_codo_tiempo(1, 1.5, velocidad=0.5)
-    time.sleep(0.5)
-    robot.accion_recoger()
-    time.sleep(1.0)
-    robot.mover_hombro_tiempo(-1, 0.8, velocidad=0.4)
-    time.sleep(0.5)
-    robot.accion_soltar()
-    time.sleep(1.0)
-    robot.mover_hombro_tiempo(1, 1.0, velocidad=0.5)
-    time.sleep(0.5)
-    robot.mover_codo_tiempo(-1, 1.5, velocidad=0.5)
+    if not secuencia_agarre():
+        return "AGARRE YA EN CURSO", 409
     return "SECUENCIA COMPLETADA"
 
 if __name__ == '__main__':
@@ -457,8 +456,8 @@ if __name__ == '__main__':
     print("="*60)
     print("Iniciando threads...")
     
-    # Iniciar thread de captura (frames RAW)
-    capture_thread = threading.Thread(target=capture_frames, daemon=True)
+    # Iniciar thread de captura (frames anotados del pipeline, o frames del servicio de visión)
+    capture_thread = threading.Thread(target=pipeline_jpegs if VISION is None else service_frames, daemon=True)
     capture_thread.start()
     
     # Esperar a que haya frames
@@ -483,4 +482,8 @@ if __name__ == '__main__':
     print("="*60 + "\n")
     
     # Iniciar servidor web
-    app.run(host='0.0.0.0', port=5000, threaded=True)
+    try:
+        app.run(host='0.0.0.0', port=5000, threaded=True)
+    finally:
+        if PIPELINE is not None:
+            PIPELINE.close()
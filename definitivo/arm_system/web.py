@@ -4,14 +4,22 @@ Web Interface for Robot Arm Control
 Provides a web-based interface to control the robot arm with sliders and buttons
 """
 
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, Response, render_template_string, request, jsonify
 import time
 import logging as log
 
 try:
     from .control.robot_controller import RobotController
+    from .control.ejecutor_movimientos import EjecutorMovimientos
+    from .control.cola_comandos import ColaComandos
+    from .telemetry.recorder import TelemetryRecorder
+    from .telemetry.metrics import METRICS, CONTENT_TYPE
 except ImportError:
     from control.robot_controller import RobotController
+    from control.ejecutor_movimientos import EjecutorMovimientos
+    from control.cola_comandos import ColaComandos
+    from telemetry.recorder import TelemetryRecorder
+    from telemetry.metrics import METRICS, CONTENT_TYPE
 
 log.basicConfig(level=log.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -19,7 +27,11 @@ app = Flask(__name__)
 
 class WebController:
     def __init__(self):
-        self.robot_controller = RobotController()
+        self.telemetry = TelemetryRecorder()
+        self.robot_controller = RobotController(telemetria=self.telemetry)
+        # Slider moves go through a per-joint queue: a newer angle replaces a pending one
+        self.executor = EjecutorMovimientos(detener=self.robot_controller.controlador_servo.detener_todos)
+        self.command_queue = ColaComandos(self.executor, self._run_move)
         self.current_angles = {
             'base': 180,
             'shoulder': 45,
@@ -28,14 +40,36 @@ class WebController:
         }
         log.info("Web Controller initialized")
 
-    def move_joint(self, joint, angle):
-        """Move a specific joint to angle"""
+    def validate_move(self, joint, angle):
+        """Validate a joint move, returning (valid, message, angle)"""
         try:
             angle = int(angle)
+        except (TypeError, ValueError):
+            return False, f"Invalid angle: {angle}", None
+
+        if joint not in self.current_angles:
+            return False, f"Invalid joint: {joint}", None
+        # Validate ranges - all servos configured for 360°
+        if not (0 <= angle <= 360):
+            return False, f"{joint.title()} angle must be 0-360°", None
+        return True, "", angle
+
+    def queue_move(self, joint, angle):
+        """Queue a joint move without waiting; returns (job, queue action) or (None, error)"""
+        valid, message, angle = self.validate_move(joint, angle)
+        if not valid:
+            return None, message
+        return self.command_queue.enviar(joint, {'angle': angle})
+
+    def _run_move(self, joint, command, job):
+        return self.move_joint(joint, command['angle'])
 
-            # Validate ranges - all servos configured for 360°
-            if not (0 <= angle <= 360):
-                return False, f"{joint.title()} angle must be 0-360°"
+    def move_joint(self, joint, angle):
+        """Move a specific joint to angle"""
+        try:
+            valid, message, angle = self.validate_move(joint, angle)
+            if not valid:
+                return False, message
 
             # Move joint
             if joint == 'base':
@@ -53,38 +87,56 @@ class WebController:
         except Exception as e:
             return False, f"Error moving {joint}: {e}"
 
-    def go_home(self):
-        """Move to home position"""
-        try:
-            self.robot_controller.move_base(180, speed=3)
-            time.sleep(0.5)
-            self.robot_controller.move_shoulder(45, speed=3)
+    def _run_sequence(self, moves, job=None):
+        """Move joints one after another, stopping early if the job is cancelled"""
+        for i, (joint, angle) in enumerate(moves):
+            if job is not None and job.cancelado:
+                return False, "Sequence cancelled"
+            success, msg = self.move_joint(joint, angle)
+            if not success:
+                return False, msg
+            if job is not None:
+                job.reportar((i + 1) / len(moves), msg)
             time.sleep(0.5)
-            self.robot_controller.move_elbow(90, speed=3)
-            time.sleep(0.5)
-            self.robot_controller.move_gripper(0, speed=3)
+        return True, ""
 
-            self.current_angles = {'base': 180, 'shoulder': 45, 'elbow': 90, 'gripper': 0}
+    def go_home(self, job=None):
+        """Move to home position (runs as an executor job, see queue_home)"""
+        try:
+            success, msg = self._run_sequence([('base', 180), ('shoulder', 45), ('elbow', 90), ('gripper', 0)], job)
+            if not success:
+                return False, msg
             return True, "Moved to home position"
         except Exception as e:
             return False, f"Error going home: {e}"
 
-    def test_sequence(self):
-        """Run test sequence"""
+    def test_sequence(self, job=None):
+        """Run test sequence (runs as an executor job, see queue_test)"""
         try:
             # Test each joint
-            for joint, angle in [('base', 90), ('shoulder', 60), ('elbow', 120), ('gripper', 90)]:
-                success, msg = self.move_joint(joint, angle)
-                if not success:
-                    return False, msg
-                time.sleep(0.5)
+            success, msg = self._run_sequence([('base', 90), ('shoulder', 60), ('elbow', 120), ('gripper', 90)], job)
+            if not success:
+                return False, msg
 
             # Return to home
-            self.go_home()
+            success, msg = self.go_home(job)
+            if not success:
+                return False, msg
             return True, "Test sequence completed"
         except Exception as e:
             return False, f"Test failed: {e}"
 
+    # Sequences run on the executor thread, like queued /move jobs, so they never drive servos concurrently
+    def queue_home(self):
+        return self.executor.enviar('home', self.go_home)
+
+    def queue_test(self):
+        return self.executor.enviar('test', self.test_sequence)
+
+    def emergency_stop(self):
+        """Cancel every job and stop the servos, bypassing the queue"""
+        self.executor.parada_emergencia()
+
 # Global controller instance
 controller = WebController()
 
@@ -219,6 +271,14 @@ HTML_TEMPLATE = """
             transform: translateY(-2px);
             box-shadow: 0 5px 15px rgba(240, 147, 251, 0.4);
         }
+        .btn-danger {
+            background: linear-gradient(135deg, #e53935 0%, #b71c1c 100%);
+            color: white;
+        }
+        .btn-danger:hover {
+            transform: translateY(-2px);
+            box-shadow: 0 5px 15px rgba(229, 57, 53, 0.4);
+        }
         .status {
             margin-top: 30px;
             padding: 20px;
@@ -338,6 +398,9 @@ HTML_TEMPLATE = """
             <button class="btn btn-warning" style="font-size: 1.2em; padding: 15px 30px; margin: 0 10px;" onclick="testSequence()">
                 🧪 Probar Movimientos
             </button>
+            <button class="btn btn-danger" style="font-size: 1.2em; padding: 15px 30px; margin: 0 10px;" onclick="emergencyStop()">
+                🛑 Parada de Emergencia
+            </button>
         </div>
 
         <!-- Current Angles Display -->
@@ -477,6 +540,19 @@ HTML_TEMPLATE = """
             });
         }
 
+        function emergencyStop() {
+            fetch('/emergency_stop', {
+                method: 'POST'
+            })
+            .then(response => response.json())
+            .then(data => {
+                showStatus(data.success ? 'success' : 'error', data.message);
+            })
+            .catch(error => {
+                showStatus('error', 'Error de conexión: ' + error);
+            });
+        }
+
         function updateCurrentAngles(angles) {
             // Only update if we have valid angles
             if (angles && typeof angles === 'object') {
@@ -542,32 +618,76 @@ def move():
     joint = data.get('joint')
     angle = data.get('angle')
 
-    success, message = controller.move_joint(joint, angle)
+    with METRICS.time('command_dispatch', {'origin': 'web'}):
+        job, action = controller.queue_move(joint, angle)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': action,
+            'angles': controller.current_angles
+        })
 
+    target = job.datos['angle']
     return jsonify({
-        'success': success,
-        'message': message,
-        'angles': controller.current_angles
+        'success': True,
+        'message': f"{joint.title()} → {target}° ({action})",
+        'job_id': job.id,
+        'queue_action': action,
+        # Report the queued target so the UI does not snap back while the move is pending
+        'angles': dict(controller.current_angles, **{joint: target})
     })
 
 @app.route('/home', methods=['POST'])
 def home():
-    success, message = controller.go_home()
+    job = controller.queue_home()
     return jsonify({
-        'success': success,
-        'message': message,
+        'success': True,
+        'message': f"Home sequence queued (job {job.id})",
+        'job_id': job.id,
         'angles': controller.current_angles
-    })
+    }), 202
 
 @app.route('/test', methods=['POST'])
 def test():
-    success, message = controller.test_sequence()
+    job = controller.queue_test()
     return jsonify({
-        'success': success,
-        'message': message,
+        'success': True,
+        'message': f"Test sequence queued (job {job.id})",
+        'job_id': job.id,
+        'angles': controller.current_angles
+    }), 202
+
+@app.route('/emergency_stop', methods=['POST'])
+def emergency_stop():
+    """Stop every movement at once (does not go through the job queue)"""
+    controller.emergency_stop()
+    return jsonify({
+        'success': True,
+        'message': "Emergency stop: all jobs cancelled, servos stopped",
         'angles': controller.current_angles
     })
 
+@app.route('/queue')
+def queue_stats():
+    return jsonify(controller.command_queue.estadisticas())
+
+@app.route('/telemetry')
+def telemetry():
+    """Telemetry records newer than ?since=<cursor>"""
+    cursor = request.args.get('since', 0, type=int)
+    return jsonify(controller.telemetry.increment(cursor))
+
+@app.route('/telemetry/dump')
+def telemetry_dump():
+    """Full telemetry history as a compressed .npz"""
+    return Response(controller.telemetry.dump(), mimetype='application/octet-stream',
+                    headers={'Content-Disposition': 'attachment; filename="telemetry.npz"'})
+
+@app.route('/metrics')
+def metrics():
+    """Hot-path metrics in Prometheus text format (enable with ARM_METRICS=1)"""
+    return Response(METRICS.render(), content_type=CONTENT_TYPE)
+
 @app.route('/angles')
 def get_angles():
     return jsonify(controller.current_angles)
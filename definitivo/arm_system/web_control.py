@@ -2,27 +2,59 @@
 """
 Web Interface for Robot Arm Control
 Provides a web-based interface to control the robot arm with sliders and buttons
+
+ASGI server (Starlette + uvicorn): motion commands are queued on a single
+motion executor and answered immediately with a job id. Progress and joint
+state are streamed over Server-Sent Events (/events) and WebSocket (/ws).
+/emergency_stop bypasses the queue and never waits for a running motion.
 """
 
-from flask import Flask, render_template_string, request, jsonify
-import time
+import json
+import asyncio
 import logging as log
 
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.websockets import WebSocketDisconnect
+
 try:
     from .control.robot_controller import ControladorRobotico
+    from .control.ejecutor_movimientos import EjecutorMovimientos
+    from .control.cola_comandos import ColaComandos, fusionar_tiempo
+    from .telemetry.recorder import TelemetryRecorder
+    from .telemetry.metrics import METRICS, CONTENT_TYPE
 except ImportError:
     from control.robot_controller import ControladorRobotico
+    from control.ejecutor_movimientos import EjecutorMovimientos
+    from control.cola_comandos import ColaComandos, fusionar_tiempo
+    from telemetry.recorder import TelemetryRecorder
+    from telemetry.metrics import METRICS, CONTENT_TYPE
 
 log.basicConfig(level=log.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-app = Flask(__name__)
-
 class ControladorWeb:
     """Controlador web para interfaz del brazo robótico"""
 
-    def __init__(self):
-        """Inicializar controlador web"""
-        self.controlador_robot = ControladorRobotico()
+    TIEMPO_MAX = 5.0  # Máximo de un movimiento (también tras fusionar comandos)
+
+    def __init__(self, reloj=None, simulado=False):
+        """Inicializar controlador web
+
+        Args:
+            reloj: Reloj para temporizar los movimientos (RelojReal por defecto)
+            simulado: Usar hardware simulado (sin PCA9685 ni GPIO)
+        """
+        self.telemetria = TelemetryRecorder(reloj=reloj)
+        self.controlador_robot = ControladorRobotico(reloj=reloj, simulado=simulado, telemetria=self.telemetria)
+        self.reloj = self.controlador_robot.reloj
+        # Los pasos de cada movimiento se ejecutan en el bucle de control central
+        self.bucle = self.controlador_robot.iniciar_bucle()
+        # Un solo ejecutor: los trabajos de todos los clientes se ejecutan en orden
+        self.ejecutor = EjecutorMovimientos(detener=self.detener_hardware)
+        # Los /move de los sliders se fusionan por articulación antes de ejecutarse
+        self.cola = ColaComandos(self.ejecutor, self._ejecutar_comando, fusionar_tiempo(self.TIEMPO_MAX))
         self.angulos_actuales = {
             'base': 180,
             'shoulder': 45,
@@ -31,56 +63,84 @@ class ControladorWeb:
         }
         self.retardo_movimiento = 0.1  # Retardo entre movimientos
         self.velocidad = 2  # Velocidad más lenta para mejor precisión
+        self.pasos_suavizado = 10
         log.info("Controlador web inicializado")
 
-    def movimiento_suave_tiempo(self, articulación, tiempo_segundos, direccion, pasos=10):
-        """Movimiento suave basado en tiempo"""
+    def _mover_paso(self, articulación, direccion, tiempo_segundos, trabajo=None):
+        """Ejecutar un paso temporizado en el bucle de control y esperar a que termine
+
+        Si el trabajo se cancela durante la espera, el servo se detiene en el siguiente tick.
+        """
+        tiempo_real = self.controlador_robot.enviar_movimiento(articulación, direccion, tiempo_segundos,
+                                                               velocidad=self.velocidad, origen='web')
+        limite = self.reloj.ahora() + tiempo_real + 1.0
+        while self.bucle.ocupado(articulación) and self.reloj.ahora() < limite:
+            if trabajo is not None and trabajo.cancelado:
+                self.bucle.enviar(articulación, 0, 0.0, origen='web')
+                break
+            self.reloj.dormir(self.bucle.periodo)
+        return tiempo_real
+
+    def movimiento_suave_tiempo(self, articulación, tiempo_segundos, direccion, pasos=10, trabajo=None,
+                                progreso=(0.0, 1.0)):
+        """Movimiento suave basado en tiempo
+
+        Args:
+            trabajo: Trabajo del ejecutor para publicar progreso y atender cancelaciones
+            progreso: tramo (inicio, fin) del progreso del trabajo que cubre este movimiento
+        """
         try:
             tiempo_paso = tiempo_segundos / pasos
+            inicio, fin = progreso
 
             for paso in range(pasos):
-                if articulación == 'base':
-                    self.controlador_robot.mover_base_tiempo(direccion, tiempo_paso, velocidad=self.velocidad)
-                elif articulación == 'shoulder':
-                    self.controlador_robot.mover_hombro_tiempo(direccion, tiempo_paso, velocidad=self.velocidad)
-                elif articulación == 'elbow':
-                    self.controlador_robot.mover_codo_tiempo(direccion, tiempo_paso, velocidad=self.velocidad)
-                elif articulación == 'gripper':
-                    self.controlador_robot.mover_pinza_tiempo(direccion, tiempo_paso, velocidad=self.velocidad)
-
-                time.sleep(self.retardo_movimiento / pasos)
+                if trabajo is not None and trabajo.cancelado:
+                    return False, f"Movimiento de {articulación} cancelado"
+                self._mover_paso(articulación, direccion, tiempo_paso, trabajo)
+                self.reloj.dormir(self.retardo_movimiento / pasos)
+                if trabajo is not None:
+                    trabajo.reportar(inicio + (fin - inicio) * (paso + 1) / pasos)
 
             return True, f"{articulación.title()} movido suavemente {tiempo_segundos:.1f}s en dirección {direccion}"
 
         except Exception as e:
             return False, f"Error en movimiento suave {articulación}: {e}"
 
-    def mover_articulación_tiempo(self, articulación, tiempo_segundos, direccion):
-        """Mover articulación específica por tiempo con validación"""
+    def validar_movimiento(self, articulación, tiempo_segundos, direccion):
+        """Validar parámetros de movimiento
+
+        Returns:
+            (válido, mensaje, tiempo_segundos, direccion) con los valores convertidos
+        """
         try:
             tiempo_segundos = float(tiempo_segundos)
             direccion = int(direccion)
-
-            # Validar parámetros
-            if not (0.1 <= tiempo_segundos <= 5.0):
-                return False, f"Tiempo debe estar entre 0.1-5.0 segundos"
-
-            if direccion not in [-1, 1]:
-                return False, f"Dirección debe ser -1 o 1"
+        except (TypeError, ValueError):
+            return False, "Tiempo y dirección deben ser numéricos", None, None
+
+        if not (0.1 <= tiempo_segundos <= self.TIEMPO_MAX):
+            return False, f"Tiempo debe estar entre 0.1-{self.TIEMPO_MAX:.1f} segundos", None, None
+        if direccion not in [-1, 1]:
+            return False, f"Dirección debe ser -1 o 1", None, None
+        if articulación not in self.controlador_robot.SENTIDOS:
+            return False, f"Articulación {articulación} no válida", None, None
+        return True, "", tiempo_segundos, direccion
+
+    def mover_articulación_tiempo(self, articulación, tiempo_segundos, direccion, trabajo=None):
+        """Mover articulación específica por tiempo con validación"""
+        try:
+            válido, mensaje, tiempo_segundos, direccion = self.validar_movimiento(articulación, tiempo_segundos, direccion)
+            if not válido:
+                return False, mensaje
 
             # Ejecutar movimiento con límites físicos
-            if articulación == 'base':
-                tiempo_real = self.controlador_robot.mover_base_tiempo(direccion, tiempo_segundos, velocidad=self.velocidad)
-            elif articulación == 'shoulder':
-                tiempo_real = self.controlador_robot.mover_hombro_tiempo(direccion, tiempo_segundos, velocidad=self.velocidad)
-            elif articulación == 'elbow':
-                tiempo_real = self.controlador_robot.mover_codo_tiempo(direccion, tiempo_segundos, velocidad=self.velocidad)
-            elif articulación == 'gripper':
-                tiempo_real = self.controlador_robot.mover_pinza_tiempo(direccion, tiempo_segundos, velocidad=self.velocidad)
-            else:
-                return False, f"Articulación {articulación} no válida"
-
-            time.sleep(self.retardo_movimiento)
+            tiempo_real = self._mover_paso(articulación, direccion, tiempo_segundos, trabajo)
+            if trabajo is not None and trabajo.cancelado:
+                return False, f"Movimiento de {articulación} cancelado"
+
+            # Sin retardo si el operador ya mandó el siguiente comando para esta articulación
+            if not self.cola.pendiente(articulación):
+                self.reloj.dormir(self.retardo_movimiento)
 
             direction_name = "positiva" if direccion == 1 else "negativa"
             return True, f"{articulación.title()} movido {tiempo_real:.1f}s en dirección {direction_name}"
@@ -88,7 +148,22 @@ class ControladorWeb:
         except Exception as e:
             return False, f"Error moviendo {articulación}: {e}"
 
-    def ir_a_home(self):
+    def _ejecutar_comando(self, articulación, comando, trabajo):
+        """Ejecutar un comando (posiblemente fusionado) de la cola de /move"""
+        return self.mover_articulación_tiempo(articulación, comando['time'], comando['direction'], trabajo=trabajo)
+
+    def _secuencia(self, movimientos, pasos, pausa, trabajo=None):
+        """Ejecutar una lista de movimientos suaves repartiendo el progreso del trabajo"""
+        total = len(movimientos)
+        for i, (articulación, tiempo, direccion) in enumerate(movimientos):
+            éxito, mensaje = self.movimiento_suave_tiempo(articulación, tiempo, direccion, pasos=pasos,
+                                                         trabajo=trabajo, progreso=(i / total, (i + 1) / total))
+            if not éxito:
+                return False, mensaje
+            self.reloj.dormir(pausa)
+        return True, ""
+
+    def ir_a_home(self, trabajo=None):
         """Mover a posición home usando movimientos temporizados"""
         try:
             # Movimientos para regresar a posición home (aproximada)
@@ -99,19 +174,19 @@ class ControladorWeb:
                 ('gripper', 0.5, 1)    # Abrir pinza
             ]
 
-            for articulación, tiempo, direccion in movimientos_home:
-                éxito, mensaje = self.movimiento_suave_tiempo(articulación, tiempo, direccion, pasos=15)
-                if not éxito:
-                    return False, mensaje
-                time.sleep(0.3)
+            éxito, mensaje = self._secuencia(movimientos_home, 15, 0.3, trabajo)
+            if not éxito:
+                return False, mensaje
 
             # Resetear contadores de tiempo
             self.controlador_robot.resetear_tiempos()
+
             return True, "Movido suavemente a posición home"
+
         except Exception as e:
             return False, f"Error yendo a home: {e}"
 
-    def secuencia_prueba(self):
+    def secuencia_prueba(self, trabajo=None):
         """Ejecutar secuencia de prueba con movimientos temporizados"""
         try:
             movimientos_prueba = [
@@ -125,20 +200,75 @@ class ControladorWeb:
                 ('gripper', 0.3, 1)    # Pinza abrir
             ]
 
-            for articulación, tiempo, direccion in movimientos_prueba:
-                éxito, mensaje = self.movimiento_suave_tiempo(articulación, tiempo, direccion, pasos=20)
-                if not éxito:
-                    return False, mensaje
-                time.sleep(0.5)
+            éxito, mensaje = self._secuencia(movimientos_prueba, 20, 0.5, trabajo)
+            if not éxito:
+                return False, mensaje
 
             # Regresar a home
-            self.ir_a_home()
+            if trabajo is not None and trabajo.cancelado:
+                return False, "Secuencia de prueba cancelada"
+            éxito, mensaje = self.ir_a_home(trabajo=trabajo)
+            if not éxito:
+                return False, mensaje
+
             return True, "Secuencia de prueba con tiempo completada"
+
         except Exception as e:
             return False, f"Prueba fallida: {e}"
 
+    def detener_hardware(self):
+        """Descartar consignas pendientes y aplicar hold a todos los servos"""
+        self.bucle.detener_todo()
+
+    def parada_emergencia(self):
+        """Cancelar todos los trabajos, detener servos y resetear contadores"""
+        self.ejecutor.parada_emergencia()
+        self.controlador_robot.resetear_tiempos()
+
+    def estado(self) -> dict:
+        """Estado de las articulaciones publicado a los clientes"""
+        return {
+            'times': self.controlador_robot.obtener_estado_tiempos(),
+            'busy': self.bucle.ocupado(),
+            'queue': self.cola.estadisticas()
+        }
+
+
+class DifusorEventos:
+    """Reenvía los eventos del ejecutor (hilo) a las colas asyncio de cada cliente"""
+
+    def __init__(self, controlador):
+        self.controlador = controlador
+        self._clientes = set()
+        self._loop = None
+        controlador.ejecutor.suscribir(self._recibir)
+
+    def conectar(self):
+        self._loop = asyncio.get_running_loop()
+        cola = asyncio.Queue(maxsize=100)
+        self._clientes.add(cola)
+        return cola
+
+    def desconectar(self, cola):
+        self._clientes.discard(cola)
+
+    def _recibir(self, evento):
+        if self._loop is None:
+            return
+        evento = dict(evento, event='job', **self.controlador.estado())
+        self._loop.call_soon_threadsafe(self._repartir, evento)
+
+    def _repartir(self, evento):
+        for cola in list(self._clientes):
+            if cola.full():
+                # Cliente lento: descartar el evento más antiguo
+                cola.get_nowait()
+            cola.put_nowait(evento)
+
+
 # Instancia global del controlador
 controlador = ControladorWeb()
+difusor = DifusorEventos(controlador)
 
 # HTML Template
 HTML_TEMPLATE = """
@@ -573,6 +703,25 @@ HTML_TEMPLATE = """
 
         window.updatingFromServer = false;
 
+        // Job progress and joint state pushed by the server (Server-Sent Events)
+        const events = new EventSource('/events');
+        events.addEventListener('job', function(e) {
+            const job = JSON.parse(e.data);
+            const pct = Math.round(job.progress * 100);
+            if (job.state === 'ejecutando') {
+                showStatus('success', `Trabajo ${job.job_id} (${job.type}): ${pct}%`);
+            } else if (job.state === 'completado') {
+                showStatus('success', job.message);
+            } else if (job.state === 'error' || job.state === 'cancelado') {
+                showStatus(job.state === 'error' ? 'error' : 'warning', `Trabajo ${job.job_id}: ${job.message}`);
+            }
+            if (job.times) updateCurrentTimes(job.times);
+        });
+        events.addEventListener('state', function(e) {
+            const state = JSON.parse(e.data);
+            if (state.times) updateCurrentTimes(state.times);
+        });
+
         // Auto-update times to current values (only once at startup)
         setTimeout(() => {
             fetch('/times')
@@ -601,86 +750,219 @@ HTML_TEMPLATE = """
 </html>
 """
 
-@app.route('/')
-def index():
-    return render_template_string(HTML_TEMPLATE, angles={'base': 0.0, 'shoulder': 0.0, 'elbow': 0.0, 'gripper': 0.0})
-
-@app.route('/move', methods=['POST'])
-def move():
-    data = request.get_json()
-    joint = data.get('joint')
-    time_seconds = data.get('time', 0.5)  # Default 0.5 seconds
-    direction = data.get('direction', 1)  # Default positive direction
-
-    success, message = controlador.mover_articulación_tiempo(joint, time_seconds, direction)
-
-    return jsonify({
-        'success': success,
-        'message': message,
-        'times': controlador.controlador_robot.obtener_estado_tiempos()
-    })
-
-@app.route('/home', methods=['POST'])
-def home():
-    success, message = controlador.ir_a_home()
-    return jsonify({
-        'success': success,
-        'message': message,
-        'angles': controlador.angulos_actuales,
-        'times': controlador.controlador_robot.obtener_estado_tiempos()
-    })
-
-@app.route('/test', methods=['POST'])
-def test():
-    success, message = controlador.secuencia_prueba()
-    return jsonify({
-        'success': success,
-        'message': message,
-        'angles': controlador.angulos_actuales,
-        'times': controlador.controlador_robot.obtener_estado_tiempos()
-    })
-
-@app.route('/times')
-def get_times():
-    return jsonify(controlador.controlador_robot.obtener_estado_tiempos())
-
-@app.route('/config', methods=['POST'])
-def config():
-    data = request.get_json()
+async def index(request):
+    return HTMLResponse(HTML_TEMPLATE)
+
+def despachar(accion, data):
+    """Ejecutar una acción de control común a HTTP y WebSocket
+
+    Returns:
+        (código HTTP, dict de respuesta)
+    """
+    with METRICS.time('command_dispatch', {'origin': 'web'}):
+        return _despachar(accion, data)
+
+def _despachar(accion, data):
+    if accion == 'emergency_stop':
+        controlador.parada_emergencia()
+        return 200, {
+            'success': True,
+            'message': 'Parada de emergencia ejecutada - todos los servos detenidos',
+            'times': controlador.controlador_robot.obtener_estado_tiempos()
+        }
+
+    if accion == 'move':
+        joint = data.get('joint')
+        time_seconds = data.get('time', 0.5)  # Default 0.5 seconds
+        direction = data.get('direction', 1)  # Default positive direction
+        válido, mensaje, time_seconds, direction = controlador.validar_movimiento(joint, time_seconds, direction)
+        if not válido:
+            return 400, {'success': False, 'message': mensaje}
+        trabajo, acción = controlador.cola.enviar(joint, {'direction': direction, 'time': time_seconds})
+        return 202, dict(trabajo.como_dict(), success=True, queue_action=acción, time=trabajo.datos['time'],
+                         message=f"Trabajo {trabajo.id} {acción} ({trabajo.datos['time']:.1f}s)",
+                         times=controlador.controlador_robot.obtener_estado_tiempos())
+    elif accion == 'home':
+        trabajo = controlador.ejecutor.enviar('home', lambda t: controlador.ir_a_home(trabajo=t))
+    elif accion == 'test':
+        trabajo = controlador.ejecutor.enviar('test', lambda t: controlador.secuencia_prueba(trabajo=t))
+    elif accion == 'cancel':
+        cancelado = controlador.ejecutor.cancelar(str(data.get('job_id')))
+        return (200 if cancelado else 404), {'success': cancelado, 'job_id': data.get('job_id')}
+    else:
+        return 400, {'success': False, 'message': f'Acción no válida: {accion}'}
+
+    return 202, dict(trabajo.como_dict(), success=True, message=f"Trabajo {trabajo.id} encolado",
+                     times=controlador.controlador_robot.obtener_estado_tiempos())
+
+async def _json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return {}
+
+async def move(request):
+    código, respuesta = despachar('move', await _json(request))
+    return JSONResponse(respuesta, status_code=código)
+
+async def home(request):
+    código, respuesta = despachar('home', {})
+    return JSONResponse(respuesta, status_code=código)
+
+async def test(request):
+    código, respuesta = despachar('test', {})
+    return JSONResponse(respuesta, status_code=código)
+
+async def get_job(request):
+    trabajo = controlador.ejecutor.obtener(request.path_params['job_id'])
+    if trabajo is None:
+        return JSONResponse({'success': False, 'message': 'Trabajo no encontrado'}, status_code=404)
+    return JSONResponse(trabajo.como_dict())
+
+async def cancel_job(request):
+    código, respuesta = despachar('cancel', {'job_id': request.path_params['job_id']})
+    return JSONResponse(respuesta, status_code=código)
+
+async def queue_stats(request):
+    return JSONResponse(controlador.cola.estadisticas())
+
+async def list_jobs(request):
+    return JSONResponse(controlador.ejecutor.trabajos())
+
+def _cursor(request):
+    """Cursor de telemetría desde ?since= o la cabecera Last-Event-ID (reconexión SSE)"""
+    try:
+        return int(request.query_params.get('since') or request.headers.get('last-event-id') or 0)
+    except ValueError:
+        return 0
+
+async def telemetry(request):
+    """Registros de telemetría nuevos desde ?since=<cursor>"""
+    return JSONResponse(controlador.telemetria.increment(_cursor(request)))
+
+async def telemetry_stream(request):
+    """SSE incremental de telemetría; el id de cada evento es el cursor para reanudar"""
+    cursor = _cursor(request)
+
+    async def flujo():
+        nonlocal cursor
+        while not await request.is_disconnected():
+            datos = controlador.telemetria.increment(cursor)
+            if datos['records'] or datos['dropped']:
+                cursor = datos['cursor']
+                yield f"id: {cursor}\nevent: telemetry\ndata: {json.dumps(datos)}\n\n"
+            await asyncio.sleep(0.2)
+
+    return StreamingResponse(flujo(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache'})
+
+async def telemetry_dump(request):
+    """Historial completo comprimido (.npz)"""
+    # np.savez_compressed tarda: fuera del event loop para no bloquear /ws, SSE ni el resto de rutas
+    datos = await run_in_threadpool(controlador.telemetria.dump)
+    return Response(datos, media_type='application/octet-stream',
+                    headers={'Content-Disposition': 'attachment; filename="telemetry.npz"'})
+
+async def metrics(request):
+    """Métricas de la ruta crítica en formato Prometheus (activar con ARM_METRICS=1)"""
+    return Response(METRICS.render(), headers={'Content-Type': CONTENT_TYPE})
+
+async def get_times(request):
+    return JSONResponse(controlador.controlador_robot.obtener_estado_tiempos())
+
+async def config(request):
+    data = await _json(request)
     setting = data.get('setting')
     value = data.get('value')
 
     if setting == 'speed':
         controlador.velocidad = max(1, min(10, value))
-        return jsonify({'success': True, 'value': controlador.velocidad})
+        return JSONResponse({'success': True, 'value': controlador.velocidad})
     elif setting == 'smooth_steps':
         controlador.pasos_suavizado = max(5, min(30, value))
-        return jsonify({'success': True, 'value': controlador.pasos_suavizado})
+        return JSONResponse({'success': True, 'value': controlador.pasos_suavizado})
 
-    return jsonify({'success': False, 'message': 'Configuración no válida'})
+    return JSONResponse({'success': False, 'message': 'Configuración no válida'})
 
-@app.route('/emergency_stop', methods=['POST'])
-def emergency_stop():
-    """Detener todos los movimientos inmediatamente"""
+async def emergency_stop(request):
+    """Detener todos los movimientos inmediatamente (no pasa por la cola de trabajos)"""
     try:
-        # Detener todos los servos
-        controlador.controlador_robot.controlador_servo.detener_todos()
-
-        # Resetear contadores de tiempo
-        controlador.controlador_robot.resetear_tiempos()
-
-        return jsonify({
-            'success': True,
-            'message': 'Parada de emergencia ejecutada - todos los servos detenidos',
-            'times': controlador.controlador_robot.obtener_estado_tiempos()
-        })
+        código, respuesta = despachar('emergency_stop', {})
+        return JSONResponse(respuesta, status_code=código)
     except Exception as e:
-        return jsonify({
+        return JSONResponse({
             'success': False,
             'message': f'Error en parada de emergencia: {e}'
         })
 
+async def _eventos(cola, intervalo=0.5):
+    """Eventos de trabajos y, si no hay ninguno en `intervalo`, el estado de las articulaciones"""
+    while True:
+        try:
+            yield await asyncio.wait_for(cola.get(), timeout=intervalo)
+        except asyncio.TimeoutError:
+            yield dict(event='state', **controlador.estado())
+
+async def events(request):
+    """Server-Sent Events con progreso de trabajos y estado de articulaciones"""
+    cola = difusor.conectar()
+
+    async def flujo():
+        try:
+            async for evento in _eventos(cola):
+                if await request.is_disconnected():
+                    break
+                yield f"event: {evento['event']}\ndata: {json.dumps(evento)}\n\n"
+        finally:
+            difusor.desconectar(cola)
+
+    return StreamingResponse(flujo(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache'})
+
+async def websocket_endpoint(websocket):
+    """WebSocket bidireccional: recibe acciones {"action": ...} y envía los mismos eventos que /events"""
+    await websocket.accept()
+    cola = difusor.conectar()
+
+    async def enviar_eventos():
+        async for evento in _eventos(cola):
+            await websocket.send_json(evento)
+
+    emisor = asyncio.create_task(enviar_eventos())
+    try:
+        while True:
+            data = await websocket.receive_json()
+            código, respuesta = despachar(data.get('action'), data)
+            await websocket.send_json(dict(respuesta, event='reply', status=código))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        emisor.cancel()
+        difusor.desconectar(cola)
+
+app = Starlette(routes=[
+    Route('/', index),
+    Route('/move', move, methods=['POST']),
+    Route('/home', home, methods=['POST']),
+    Route('/test', test, methods=['POST']),
+    Route('/jobs', list_jobs),
+    Route('/queue', queue_stats),
+    Route('/jobs/{job_id}', get_job),
+    Route('/jobs/{job_id}', cancel_job, methods=['DELETE']),
+    Route('/times', get_times),
+    Route('/metrics', metrics),
+    Route('/telemetry', telemetry),
+    Route('/telemetry/stream', telemetry_stream),
+    Route('/telemetry/dump', telemetry_dump),
+    Route('/config', config, methods=['POST']),
+    Route('/emergency_stop', emergency_stop, methods=['POST']),
+    Route('/events', events),
+    WebSocketRoute('/ws', websocket_endpoint),
+])
+
 if __name__ == '__main__':
+    import uvicorn
+
     print("🤖 Iniciando servidor web en http://localhost:5000")
     print("Asegúrate de que la alimentación del brazo esté CONECTADA")
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+    uvicorn.run(app, host='0.0.0.0', port=5000, log_level='info')
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the arm_system modules import each other as top-level packages (control, perception, telemetry)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'arm_system'))
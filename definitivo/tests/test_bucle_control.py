@@ -0,0 +1,64 @@
+import threading
+import time
+
+from control.bucle_control import BucleControl
+from control.reloj import RelojVirtual, RELOJ_REAL
+
+
+class ServosFalsos:
+    """ControladorServo mínimo que registra qué escribe y desde qué hilo"""
+
+    def __init__(self, reloj):
+        self.reloj = reloj
+        self.perfiles = {'shoulder': None, 'elbow': None, 'wrist': None, 'gripper': None}
+        self.escrituras = []
+
+    def fijar_velocidades(self, comandos):
+        self.escrituras.append((threading.current_thread().name, dict(comandos)))
+
+    def detener_todos(self):
+        self.escrituras.append((threading.current_thread().name, 'detener_todos'))
+
+
+def test_consigna_termina_con_hold():
+    reloj = RelojVirtual()
+    servos = ServosFalsos(reloj)
+    bucle = BucleControl(servos, reloj=reloj)
+    bucle.enviar('shoulder', 1, 0.1, 0.5)
+    bucle.tick(0.0)
+    bucle.tick(0.05)
+    bucle.tick(0.1)
+    assert [e[1] for e in servos.escrituras] == [{'shoulder': (1, 0.5)}, {'shoulder': (0, 0.0)}]
+
+
+def test_parada_aplica_hold_a_todos_desde_el_bucle():
+    reloj = RelojVirtual()
+    servos = ServosFalsos(reloj)
+    bucle = BucleControl(servos, reloj=reloj)
+    bucle._hilo = threading.current_thread()  # como si el bucle estuviera en marcha
+    bucle.enviar('elbow', -1, 2.0, 0.8)
+    bucle.tick(0.0)
+    bucle.detener_todo()
+    bucle.enviar('wrist', 1, 1.0)  # llega tras la parada en la misma ráfaga: se descarta
+    assert servos.escrituras[-1][1] == {'elbow': (-1, 0.8)}  # quien pide la parada no escribe
+    bucle.tick(0.01)
+    assert servos.escrituras[-1][1] == {nombre: (0, 0.0) for nombre in servos.perfiles}
+    assert not bucle.ocupado()
+
+
+def test_parada_con_bucle_en_marcha_la_escribe_su_hilo():
+    servos = ServosFalsos(RELOJ_REAL)
+    bucle = BucleControl(servos)
+    bucle.iniciar()
+    try:
+        bucle.enviar('shoulder', 1, 5.0)
+        time.sleep(0.05)
+        bucle.detener_todo()
+        time.sleep(0.05)
+    finally:
+        bucle._parar.set()
+        bucle._hilo.join(1.0)
+    hilo, ultima = servos.escrituras[-1]
+    assert hilo == 'bucle_control'
+    assert ultima == {nombre: (0, 0.0) for nombre in servos.perfiles}
+    assert all(h == 'bucle_control' for h, _ in servos.escrituras)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from perception.vision.camera.calibration import CameraCalibration, SCAN_BASE_ANGLE
+
+CAMERA_HEIGHT = 300.0
+PITCH = np.radians(15)  # camera tilted down from horizontal
+K = [[800, 0, 640], [0, 800, 360], [0, 0, 1]]
+
+
+def _calibration():
+    c, s = np.cos(PITCH), np.sin(PITCH)
+    # columns: camera x (right), y (down), z (forward) in the arm frame (x forward, y left, z up)
+    rotation = np.column_stack([(0, -1, 0), (-s, 0, -c), (c, 0, -s)])
+    return CameraCalibration(K, np.zeros(5), (1280, 720), rotation, (0, 0, CAMERA_HEIGHT))
+
+
+def _project(calibration, point):
+    camera = calibration.rotation.T @ (np.asarray(point, dtype=float) - calibration.translation)
+    return calibration.camera_matrix[:2, :2] @ (camera[:2] / camera[2]) + calibration.camera_matrix[:2, 2]
+
+
+def _box(calibration, x, y, height, radius=35):
+    """image box of an upright object of `height` mm standing on the table at (x, y)"""
+    corners = np.array([_project(calibration, (x + dx, y + dy, z)) for dx in (-radius, radius)
+                        for dy in (-radius, radius) for z in (0, height)])
+    return (*corners.min(axis=0), *corners.max(axis=0))
+
+
+def test_table_points_project_back():
+    calibration = _calibration()
+    points = [(380, 0, 0), (400, 80, 0), (600, -120, 0)]
+    pixels = [_project(calibration, p) for p in points]
+    np.testing.assert_allclose(calibration.pixels_to_table(pixels), points, atol=1.0)
+
+
+@pytest.mark.parametrize('height', [0, 210, 320])
+def test_box_target_is_where_the_object_stands(height):
+    # 320 mm: the top of the object is above the camera and its ray never reaches the table
+    calibration = _calibration()
+    target = calibration.box_to_target(_box(calibration, 400, 0, height))
+    assert target is not None
+    # the bottom edge is the near side of the object's footprint
+    assert target['distance'] == pytest.approx(400 - 35, abs=10)
+    assert target['angle'] == pytest.approx(SCAN_BASE_ANGLE, abs=1.0)
+
+
+def test_box_target_bearing():
+    calibration = _calibration()
+    target = calibration.box_to_target(_box(calibration, 400, 100, 210))
+    # the box centre column is only approximately the object's axis off the optical axis
+    assert target['y_mm'] == pytest.approx(100, abs=10)
+    # objects to the left (+y) need a smaller base angle
+    assert target['angle'] == pytest.approx(SCAN_BASE_ANGLE - np.degrees(np.arctan2(100, 400)), abs=3.0)
@@ -0,0 +1,53 @@
+import threading
+
+from control.cola_comandos import ColaComandos, fusionar_tiempo, ENCOLADO, FUSIONADO
+from control.ejecutor_movimientos import EjecutorMovimientos, COMPLETADO
+
+
+def _en_hilo(funcion, timeout=2.0):
+    """ejecutar funcion() en otro hilo; False si no termina (interbloqueo)"""
+    hilo = threading.Thread(target=funcion, daemon=True)
+    hilo.start()
+    hilo.join(timeout)
+    return not hilo.is_alive()
+
+
+def test_suscriptor_que_consulta_estadisticas_no_bloquea_enviar():
+    ejecutor = EjecutorMovimientos()
+    liberar = threading.Event()
+    cola = ColaComandos(ejecutor, lambda art, cmd, t: (liberar.wait(2.0), 'ok'), fusionar_tiempo(3.0))
+    # como DifusorEventos -> ControladorWeb.estado() en web_control.py
+    eventos = []
+    ejecutor.suscribir(lambda evento: eventos.append(cola.estadisticas()))
+
+    resultados = []
+    assert _en_hilo(lambda: resultados.append(cola.enviar('shoulder', {'direction': 1, 'time': 0.2})))
+    assert resultados[0][1] == ENCOLADO
+    assert eventos
+    liberar.set()
+    ejecutor.detener_hilo()
+
+
+def test_comandos_compatibles_se_fusionan_mientras_esperan():
+    ejecutor = EjecutorMovimientos()
+    ocupado, liberar = threading.Event(), threading.Event()
+    ejecutados = []
+
+    def ejecutar(articulacion, comando, trabajo):
+        if articulacion == 'elbow':
+            ocupado.set()
+            liberar.wait(2.0)
+        ejecutados.append((articulacion, comando))
+        return True, 'ok'
+
+    cola = ColaComandos(ejecutor, ejecutar, fusionar_tiempo(3.0))
+    cola.enviar('elbow', {'direction': 1, 'time': 0.1})  # ocupa el hilo del ejecutor
+    assert ocupado.wait(2.0)
+    primero, _ = cola.enviar('shoulder', {'direction': 1, 'time': 0.2})
+    segundo, accion = cola.enviar('shoulder', {'direction': 1, 'time': 0.3})
+    assert accion == FUSIONADO and segundo is primero
+    assert cola.pendiente('shoulder')
+    liberar.set()
+    ejecutor.detener_hilo()  # el hilo termina la cola antes de salir
+    assert primero.estado == COMPLETADO
+    assert ejecutados[-1] == ('shoulder', {'direction': 1, 'time': 0.5})
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from perception.vision.detection_accumulator import DetectionAccumulator, BURST_IMGSZ, NONE_CLASS
+
+NAMES = {0: 'apple', 1: 'orange', 2: 'bottle'}
+
+
+class _Array:
+    """torch-like tensor wrapper: .cpu().numpy()"""
+
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class _Boxes:
+    def __init__(self, rows):
+        rows = np.asarray(rows, dtype=float).reshape(-1, 6)
+        self.xyxy, self.conf, self.cls = _Array(rows[:, :4]), _Array(rows[:, 4]), _Array(rows[:, 5])
+
+    def __len__(self):
+        return len(self.xyxy.values)
+
+
+class _Result:
+    def __init__(self, rows):
+        self.boxes = _Boxes(rows)
+
+
+class FakeDetector:
+    """returns the scripted boxes (x1, y1, x2, y2, conf, class) of each frame in turn"""
+
+    def __init__(self, frames, imgsz=640, dynamic_input=True):
+        self.frames = list(frames)
+        self.imgsz = imgsz
+        self.dynamic_input = dynamic_input
+        self.calls = []
+
+    def inference(self, image, imgsz=None, conf=None):
+        self.calls.append(imgsz)
+        rows = self.frames.pop(0) if self.frames else []
+        return [_Result(rows)], NAMES
+
+
+def _accumulator(detector, **kwargs):
+    frame = np.zeros((360, 640, 3), np.uint8)
+    return DetectionAccumulator(detector, lambda: frame, **kwargs)
+
+
+def test_burst_size_is_reduced_for_dynamic_models():
+    detector = FakeDetector([], dynamic_input=True)
+    accumulator = _accumulator(detector)
+    assert accumulator.imgsz == BURST_IMGSZ
+    accumulator.observe()
+    assert set(detector.calls) == {BURST_IMGSZ}
+
+
+def test_burst_size_is_the_model_size_for_fixed_shape_exports():
+    detector = FakeDetector([], imgsz=416, dynamic_input=False)
+    accumulator = _accumulator(detector)
+    assert accumulator.imgsz == 416
+    accumulator.observe()
+    assert set(detector.calls) == {416}
+
+
+APPLE = [100, 100, 200, 220, 0.9, 0]
+
+
+def test_posterior_is_a_distribution_over_seen_classes_and_none():
+    accumulator = _accumulator(FakeDetector([]))
+    posterior = accumulator.posterior([{'apple': 0.8}, {'apple': 0.6, 'orange': 0.3}])
+    assert set(posterior) == {'apple', 'orange', NONE_CLASS}
+    assert sum(posterior.values()) == pytest.approx(1.0)
+    assert max(posterior, key=posterior.get) == 'apple'
+
+
+def test_posterior_without_evidence_is_no_object():
+    accumulator = _accumulator(FakeDetector([]))
+    posterior = accumulator.posterior([{}, {}])
+    assert posterior == {NONE_CLASS: pytest.approx(1.0)}
+
+
+def test_one_lucky_frame_does_not_decide():
+    accumulator = _accumulator(FakeDetector([]))
+    posterior = accumulator.posterior([{'apple': 0.9}, {}, {}])
+    assert max(posterior, key=posterior.get) == NONE_CLASS
+
+
+def test_observe_stops_once_confident():
+    detector = FakeDetector([[APPLE]] * 5)
+    result = _accumulator(detector).observe()
+    assert result['class'] == 'apple'
+    assert result['class_id'] == 0
+    assert result['frames'] == 2
+    assert len(detector.calls) == 2
+    assert result['confidence'] >= 0.9
+    np.testing.assert_allclose(result['box'], APPLE[:4])
+
+
+def test_observe_only_counts_boxes_on_the_tracked_object():
+    # the orange is elsewhere in the frame: it must not vote for the tracked apple
+    orange = [400, 50, 500, 150, 0.85, 1]
+    detector = FakeDetector([[APPLE, orange]] * 5)
+    result = _accumulator(detector).observe()
+    assert result['class'] == 'apple'
+    assert 'orange' not in result['probabilities']
+
+
+def test_observe_weights_the_box_by_confidence():
+    frames = [[[100, 100, 200, 200, 0.9, 0]], [[110, 100, 210, 200, 0.3, 0]]]
+    result = _accumulator(FakeDetector(frames), stop_confidence=1.0, max_frames=2,
+                          min_confidence=0.0).observe()
+    assert result['box'][0] == pytest.approx((100 * 0.9 + 110 * 0.3) / 1.2)
+
+
+def test_observe_without_object_returns_none():
+    assert _accumulator(FakeDetector([[]] * 5)).observe() is None
+
+
+def test_observe_without_frames_returns_none():
+    detector = FakeDetector([[APPLE]])
+    accumulator = DetectionAccumulator(detector, lambda: None)
+    assert accumulator.observe() is None
+    assert detector.calls == []
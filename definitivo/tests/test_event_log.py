@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from telemetry.event_log import EventLog, list_sessions, read_session
+
+
+def test_records_round_trip(tmp_path):
+    events = EventLog(segment_size=4096).open(str(tmp_path), 'sesion')
+    events.record('servo', 'move', 2, 1, 0.5, 1.25)
+    events.record('vision', 'detection', {'class': 'apple'})
+    events.close()
+    read = list(read_session(str(tmp_path), 'sesion'))
+    assert [(e.subsystem, e.event) for e in read] == [('servo', 'move'), ('vision', 'detection')]
+    assert read[1].fields == {'data': {'class': 'apple'}}
+
+
+@pytest.mark.parametrize('size', [5000, 70000])
+def test_oversized_record_is_dropped_without_raising(tmp_path, size):
+    events = EventLog(segment_size=4096).open(str(tmp_path), 'sesion')
+    events.record('vision', 'detection', {'class': 'apple'})
+    events.record('vision', 'detection', {'blob': 'x' * size})
+    events.record('vision', 'detection', {'class': 'orange'})
+    events.close()
+    assert events.dropped == 1
+    read = [e.fields['data'] for e in read_session(str(tmp_path), 'sesion')]
+    assert read == [{'class': 'apple'}, {'class': 'orange'}]
+
+
+def test_unencodable_record_is_dropped(tmp_path):
+    events = EventLog(segment_size=4096).open(str(tmp_path), 'sesion')
+    events.record('servo', 'move', 'canal', 1, 0.5, 1.0)
+    events.close()
+    assert events.dropped == 1
+
+
+def test_records_rotate_across_segments(tmp_path):
+    events = EventLog(segment_size=1024).open(str(tmp_path), 'sesion')
+    for i in range(100):
+        events.record('vision', 'detection', {'i': i})
+    events.close()
+    assert [e.fields['data']['i'] for e in read_session(str(tmp_path), 'sesion')] == list(range(100))
+
+
+def test_sessions_started_in_the_same_second_do_not_overwrite_each_other(tmp_path):
+    first = EventLog(segment_size=4096).open(str(tmp_path))
+    first.record('vision', 'detection', {'session': 1})
+    second = EventLog(segment_size=4096).open(str(tmp_path))
+    second.record('vision', 'detection', {'session': 2})
+    first.close()
+    second.close()
+
+    assert first.session != second.session
+    assert str(os.getpid()) in first.session
+    assert len(list_sessions(str(tmp_path))) == 2
+    assert [e.fields['data'] for e in read_session(str(tmp_path), first.session)] == [{'session': 1}]
+    assert [e.fields['data'] for e in read_session(str(tmp_path), second.session)] == [{'session': 2}]
+
+
+def test_explicit_session_is_never_truncated(tmp_path):
+    EventLog(segment_size=4096).open(str(tmp_path), 'sesion').close()
+    with pytest.raises(FileExistsError):
+        EventLog(segment_size=4096).open(str(tmp_path), 'sesion')
@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+
+from perception.vision.camera.frame_writer import FrameWriter
+
+
+def _frame():
+    return np.zeros((8, 8, 3), dtype=np.uint8)
+
+
+def test_sampling_keeps_every_nth_frame(tmp_path):
+    writer = FrameWriter(str(tmp_path), sample_every=3)
+    paths = [writer.submit(_frame()) for _ in range(6)]
+    writer.close()
+    assert [p is not None for p in paths] == [True, False, False, True, False, False]
+    assert writer.skipped == 4
+
+
+def test_forced_frames_bypass_sampling_without_shifting_it(tmp_path):
+    writer = FrameWriter(str(tmp_path), sample_every=3)
+    raw = []
+    detected = []
+    for _ in range(3):
+        raw.append(writer.submit(_frame()))
+        detected.append(writer.submit(_frame(), suffix='_detected', force=True))
+    raw.append(writer.submit(_frame()))
+    writer.flush()
+    writer.close()
+
+    assert all(detected)
+    assert [p is not None for p in raw] == [True, False, False, True]
+    assert all(os.path.exists(p) for p in detected)
+    assert len(set(detected + [p for p in raw if p])) == 5
+
+
+def test_disabled_writer_ignores_force(tmp_path):
+    writer = FrameWriter(str(tmp_path), sample_every=0)
+    assert writer.submit(_frame(), force=True) is None
@@ -0,0 +1,47 @@
+import threading
+
+from control.lazo_cerrado import ControladorLazoCerrado, FusionArticulaciones
+from control.reloj import RelojVirtual
+
+
+class ServosFalsos:
+    """ControladorServo mínimo que solo registra los mandos"""
+
+    def __init__(self, reloj):
+        self.reloj = reloj
+        self.escrituras = []
+
+    def fijar_velocidades(self, comandos):
+        self.escrituras.append(dict(comandos))
+
+
+def test_reloj_virtual_no_arranca_hilo_y_mover_a_converge():
+    reloj = RelojVirtual()
+    servos = ServosFalsos(reloj)
+    lazo = ControladorLazoCerrado(servos, FusionArticulaciones({'elbow': 0.0}), reloj=reloj)
+    hilos = threading.active_count()
+
+    lazo.iniciar()
+    assert lazo.activo
+    assert threading.active_count() == hilos
+
+    assert lazo.mover_a('elbow', 45.0, timeout=10.0)
+    assert abs(lazo.fusion.angulos()['elbow'] - 45.0) <= lazo.tolerancia
+    assert servos.escrituras[-1] == {'elbow': (0, 0.0)}
+
+    lazo.detener()
+    assert not lazo.activo
+
+
+def test_movimientos_en_lazo_abierto_avanzan_la_estimacion():
+    from main import Robot
+
+    robot = Robot(reloj=RelojVirtual(), simulado=True)
+    assert 'wrist' in robot.get_current_angles()
+    robot.robot_controller.move_shoulder(270, speed=50)  # 1 s a velocidad 0.5
+
+    assert robot.get_current_angles()['shoulder'] == 90 + 0.5 * 30.0
+    robot.robot_controller.controlador_servo.mover_varios_por_tiempo({'elbow': -1, 'wrist': 1}, 0.5, 1.0)
+    angulos = robot.get_current_angles()
+    assert angulos['elbow'] == 90 - 0.5 * 35.0
+    assert angulos['wrist'] == 90 + 0.5 * 90.0
@@ -0,0 +1,20 @@
+import pytest
+
+from perception.vision.detection.model_loader import ModelLoader
+
+NAMES = {0: 'person', 1: 'bottle', 2: 'cup', 3: 'apple'}
+
+
+def test_class_ids_select_configured_classes():
+    assert ModelLoader._class_ids(NAMES, ['cup', 'bottle', 'laptop']) == [1, 2]
+
+
+def test_class_ids_every_class_needs_no_filter():
+    assert ModelLoader._class_ids(NAMES, None) is None
+    assert ModelLoader._class_ids(NAMES, list(NAMES.values())) is None
+
+
+def test_class_ids_without_any_match_raise():
+    # an empty filter would run detection on every class
+    with pytest.raises(ValueError):
+        ModelLoader._class_ids(NAMES, ['laptop', 'book'])
@@ -0,0 +1,27 @@
+import pytest
+
+from control.pca9685_lote import BIT_COMPLETO, registros_desde_duty
+
+
+class _RegistrosPCA:
+    """Lo justo de PCA9685 para que PWMChannel escriba sus registros (ON, OFF)"""
+
+    def __init__(self):
+        self.pwm_regs = [None] * 16
+
+
+def test_extremos_del_duty_cycle():
+    assert registros_desde_duty(0xFFFF) == (BIT_COMPLETO, 0)
+    assert registros_desde_duty(0) == (0, BIT_COMPLETO)
+    assert registros_desde_duty(0x1000) == (0, 0x100)
+    with pytest.raises(ValueError):
+        registros_desde_duty(0x10000)
+
+
+def test_registros_iguales_que_adafruit_pca9685():
+    adafruit_pca9685 = pytest.importorskip('adafruit_pca9685')
+    pca = _RegistrosPCA()
+    canal = adafruit_pca9685.PWMChannel(pca, 0)
+    for duty in list(range(0, 0x40)) + list(range(0x40, 0xFFFF, 97)) + [0xFFFE, 0xFFFF]:
+        canal.duty_cycle = duty
+        assert registros_desde_duty(duty) == tuple(pca.pwm_regs[0]), duty
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from perception.vision.detection.preprocess import (  # noqa: E402
+    LetterboxGeometry, LetterboxPreprocessor, PAD_VALUE)
+
+
+class _Boxes:
+    def __init__(self, rows):
+        self.data = torch.tensor(rows, dtype=torch.float32)
+        self.orig_shape = None
+
+
+class _Result:
+    def __init__(self, rows=None):
+        self.boxes = _Boxes(rows) if rows is not None else None
+        self.orig_img = self.orig_shape = None
+
+
+def test_square_geometry_pads_to_imgsz():
+    geometry = LetterboxGeometry((720, 1280), 640)
+    assert geometry.ratio == 0.5
+    assert (geometry.new_w, geometry.new_h) == (640, 360)
+    assert (geometry.canvas_w, geometry.canvas_h) == (640, 640)
+    assert (geometry.left, geometry.top) == (0, 140)
+
+
+def test_rect_geometry_pads_to_the_stride():
+    geometry = LetterboxGeometry((720, 1280), 640, rect=True)
+    assert (geometry.canvas_w, geometry.canvas_h) == (640, 384)
+    assert geometry.top == 12
+
+
+def test_tensor_is_rgb_scaled_and_padded():
+    frame = np.empty((720, 1280, 3), np.uint8)
+    frame[:] = (10, 20, 30)  # BGR
+    tensor, geometry = LetterboxPreprocessor()(frame, 640)
+    assert tuple(tensor.shape) == (1, 3, 640, 640)
+    centre = tensor[0, :, 320, 320].numpy()
+    np.testing.assert_allclose(centre, np.array([30, 20, 10]) / 255, rtol=1e-6)
+    np.testing.assert_allclose(tensor[0, :, 0, 0].numpy(), PAD_VALUE / 255, rtol=1e-6)
+
+
+def test_buffers_are_reused_per_mode():
+    preprocessor = LetterboxPreprocessor(max_modes=1)
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    first, _ = preprocessor(frame, 640)
+    assert preprocessor(frame, 640)[0] is first
+    preprocessor(frame, 320)
+    assert preprocessor(frame, 640)[0] is not first
+
+
+def test_restore_maps_boxes_back_to_the_frame():
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    geometry = LetterboxGeometry((720, 1280), 640)
+    result = _Result([[100, 190, 200, 290, 0.9, 0]])
+    LetterboxPreprocessor.restore(result, frame, geometry)
+    np.testing.assert_allclose(result.boxes.data[0, :4].numpy(), [200, 100, 400, 300])
+    assert result.boxes.data[0, 4].item() == pytest.approx(0.9)
+    assert result.orig_shape == result.boxes.orig_shape == (720, 1280)
+    assert result.orig_img is frame
+
+
+def test_restore_clamps_boxes_reaching_into_the_padding():
+    geometry = LetterboxGeometry((720, 1280), 640)
+    result = _Result([[-5, 100, 660, 520, 0.5, 1]])
+    LetterboxPreprocessor.restore(result, np.zeros((720, 1280, 3), np.uint8), geometry)
+    np.testing.assert_allclose(result.boxes.data[0, :4].numpy(), [0, 0, 1280, 720])
+
+
+def test_restore_without_boxes():
+    frame = np.zeros((360, 640, 3), np.uint8)
+    result = LetterboxPreprocessor.restore(_Result(), frame, LetterboxGeometry((360, 640), 640))
+    assert result.boxes is None
+    assert result.orig_shape == (360, 640)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from perception.vision.range_estimator import RangeEstimator, SENSOR_SIGMA_MM
+
+FX = 1000.0
+
+
+def _estimator(**kwargs):
+    return RangeEstimator(FX, FX, image_size=(1280, 720), **kwargs)
+
+
+def test_pinhole_range_from_both_sides():
+    # an orange (75 mm) 100 px wide and tall is 750 mm away
+    distance, sigma = _estimator().estimate([[600, 300, 700, 400]], ['orange'])
+    assert distance[0] == pytest.approx(750.0)
+    assert sigma[0] == pytest.approx(750.0 * 0.15 / np.sqrt(2))
+
+
+def test_long_side_matches_long_box_side():
+    # a bottle (65 x 210 mm) standing or lying down gives the same range
+    standing, _ = _estimator().estimate([[600, 200, 665, 410]], ['bottle'])
+    lying, _ = _estimator().estimate([[500, 300, 710, 365]], ['bottle'])
+    assert standing[0] == pytest.approx(1000.0)
+    assert lying[0] == pytest.approx(1000.0)
+
+
+def test_cut_side_is_ignored():
+    # cut by the left border: only the height is used, the width would look far too small
+    distance, sigma = _estimator().estimate([[0, 300, 40, 400]], ['orange'])
+    assert distance[0] == pytest.approx(750.0)
+    assert sigma[0] == pytest.approx(750.0 * 0.15)
+
+
+def test_unknown_class_and_fully_cut_box_have_no_range():
+    distance, _ = _estimator().estimate([[600, 300, 700, 400], [0, 0, 1280, 720]], ['chair', 'orange'])
+    assert np.isnan(distance).all()
+
+
+def test_smaller_frames_rescale_the_focal_length():
+    full, _ = _estimator().estimate([[600, 300, 700, 400]], ['orange'])
+    half, _ = _estimator().estimate([[300, 150, 350, 200]], ['orange'], frame_size=(640, 360))
+    assert half[0] == pytest.approx(full[0])
+
+
+def test_offset_is_added():
+    distance, _ = _estimator(offset_mm=40.0).estimate([[600, 300, 700, 400]], ['orange'])
+    assert distance[0] == pytest.approx(790.0)
+
+
+def test_fuse_weights_by_inverse_variance():
+    fused, sigma = RangeEstimator.fuse([200.0], [SENSOR_SIGMA_MM], 100.0)
+    # equal uncertainty: halfway, with the spread reduced by sqrt(2)
+    assert fused[0] == pytest.approx(150.0)
+    assert sigma[0] == pytest.approx(SENSOR_SIGMA_MM / np.sqrt(2))
+
+
+def test_fuse_without_vision_uses_the_sensor():
+    fused, sigma = RangeEstimator.fuse([np.nan], [np.nan], 300.0)
+    assert fused[0] == pytest.approx(300.0)
+    assert sigma[0] == pytest.approx(SENSOR_SIGMA_MM)
+
+
+@pytest.mark.parametrize('sensor_mm', [None, 0.0, -5.0])
+def test_fuse_without_sensor_reading_keeps_vision(sensor_mm):
+    fused, sigma = RangeEstimator.fuse([500.0], [30.0], sensor_mm)
+    assert fused[0] == 500.0
+    assert sigma[0] == 30.0
@@ -0,0 +1,45 @@
+from control import robot_controller
+from control.reloj import RelojVirtual
+from control.robot_controller import ControladorRobotico, RobotController
+
+
+def test_move_base_mueve_el_stepper_y_consume_tiempo():
+    reloj = RelojVirtual()
+    robot = RobotController(reloj=reloj, simulado=True)
+    robot.move_base(0, speed=30)
+
+    # 180° ≈ 2 s hacia la izquierda a 0.3 × 1000 pasos/s
+    assert reloj.ahora() == 2.0
+    assert robot.controlador_stepper.posicion_actual == -600
+    assert robot.obtener_estado_tiempos()['base'] == -2.0
+
+
+def test_base_sin_stepper_no_acumula_tiempo():
+    reloj = RelojVirtual()
+    robot = ControladorRobotico(habilitar_stepper=False, reloj=reloj, simulado=True)
+
+    assert robot.mover_base_tiempo(1, 1.0) == 0.0
+    assert robot.obtener_estado_tiempos()['base'] == 0.0
+    assert reloj.ahora() == 0.0
+
+
+def test_enviar_movimiento_base_va_al_stepper():
+    reloj = RelojVirtual()
+    robot = ControladorRobotico(reloj=reloj, simulado=True)
+
+    # sin bucle iniciado: la base no pasa por el bucle de servos
+    assert robot.enviar_movimiento('base', 1, 0.5, velocidad=1.0) == 0.5
+    assert robot.controlador_stepper.posicion_actual == 500
+    assert robot.enviar_movimiento('base', 0, 0.5) == 0.0
+    assert robot.controlador_stepper.posicion_actual == 500
+
+
+def test_pulsos_ausentes_usan_el_valor_por_defecto_de_la_articulacion(monkeypatch):
+    # servo_config.json sin pulsos para el codo y sin hold para el hombro
+    config = {'shoulder': {'canal': 0, 'pulso_neutral': 1710}, 'elbow': {'canal': 1}}
+    monkeypatch.setattr(robot_controller, 'cargar_configuracion', lambda: config)
+    robot = ControladorRobotico(habilitar_stepper=False, reloj=RelojVirtual(), simulado=True)
+
+    pulsos = robot.controlador_servo.pulsos_neutrales
+    assert pulsos['elbow'] == {'neutral': 1720, 'hold': 1850}
+    assert pulsos['shoulder'] == {'neutral': 1710, 'hold': 1710}